@@ -5,14 +5,17 @@ Application multi-agents pour génération de code
 
 import streamlit as st
 import time
-import zipfile
-import io
 from pathlib import Path
 import traceback
 
 # Import du système CrewAI
 try:
-    from lunacore.crew_system import LunaCrewSystem
+    from lunacore.crew_system import LunaCrewSystem, get_crew_system
+    from lunacore.export import submit_run_archive
+    from lunacore.job_server import JobManager
+    from lunacore.run_catalog import get_run_catalog
+    from lunacore.file_index import RunFileIndex
+    from lunacore.run_manifest import diff_runs, unified_diff
 except ImportError as e:
     st.error(f"❌ Erreur d'import: {e}")
     st.stop()
@@ -54,6 +57,73 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Nombre de runs gardés en cache (résultats, index, archives) dans le processus Streamlit
+RESULT_CACHE_SIZE = 16
+# Poids constant d'une page: entrées d'arborescence, lignes de fichier et résultats de recherche bornés
+TREE_PAGE_SIZE = 30
+FILE_PAGE_LINES = 200
+SEARCH_LIMIT = 30
+
+
+@st.cache_resource(show_spinner="🔧 Initialisation du système CrewAI...")
+def get_system() -> LunaCrewSystem:
+    """Système unique du processus: LLM et agents initialisés une seule fois"""
+    return get_crew_system()
+
+
+@st.cache_resource(max_entries=RESULT_CACHE_SIZE, show_spinner=False)
+def load_run_result(run_id: str) -> dict:
+    """Ligne du catalogue d'un run encore présent sur disque, en cache par run id"""
+    row = get_run_catalog().get(run_id)
+    if not row or not row.get("output_directory") or not Path(row["output_directory"]).is_dir():
+        raise LookupError(run_id)  # exception: rien n'est mis en cache
+    return row
+
+
+@st.cache_resource(max_entries=RESULT_CACHE_SIZE, show_spinner="🗂️ Indexation des fichiers...")
+def get_file_index(run_id: str, output_directory: str) -> RunFileIndex:
+    """Index des fichiers du run (préconstruit en fin de génération, sinon construit ici)"""
+    index = RunFileIndex(output_directory)
+    index.build()
+    return index
+
+
+def _language(filename: str) -> str:
+    if filename.endswith('.py'):
+        return "python"
+    if filename.endswith('.md'):
+        return "markdown"
+    if filename.endswith(('.json', '.yaml', '.yml')):
+        return "json"
+    return "text"
+
+
+@st.cache_data(max_entries=RESULT_CACHE_SIZE * 32, show_spinner=False)
+def file_page(run_id: str, filename: str, page: int) -> str:
+    """Une page de FILE_PAGE_LINES lignes d'un fichier, lue à la demande puis mémoïsée"""
+    index = get_file_index(run_id, load_run_result(run_id)["output_directory"])
+    return "\n".join(index.read_lines(filename, page * FILE_PAGE_LINES, FILE_PAGE_LINES))
+
+
+@st.cache_resource(max_entries=RESULT_CACHE_SIZE, show_spinner=False)
+def run_archive(run_id: str, output_directory: str):
+    """Future de l'archive ZIP du run (construite une fois, en arrière-plan)"""
+    return submit_run_archive(output_directory)
+
+
+@st.cache_data(max_entries=RESULT_CACHE_SIZE, show_spinner=False)
+def run_changes(run_id: str, previous_id: str) -> dict:
+    """Fichiers ajoutés/supprimés/modifiés depuis le run précédent (empreintes, sans contenu)"""
+    return diff_runs(load_run_result(previous_id)["output_directory"], load_run_result(run_id)["output_directory"])
+
+
+@st.cache_data(max_entries=RESULT_CACHE_SIZE * 32, show_spinner=False)
+def run_file_diff(run_id: str, previous_id: str, path: str) -> str:
+    """Diff unifié d'un seul fichier changé, calculé à la demande puis mémoïsé"""
+    return unified_diff(load_run_result(previous_id)["output_directory"],
+                        load_run_result(run_id)["output_directory"], path)
+
+
 # Header principal
 st.markdown("""
 <div class="main-header">
@@ -70,9 +140,15 @@ with st.sidebar:
     if st.button("🔍 Vérifier les connexions", use_container_width=True):
         with st.spinner("Vérification en cours..."):
             try:
-                crew_system = LunaCrewSystem()
+                crew_system = get_system()
                 st.success(f"✅ {len(crew_system.agents)} agents initialisés")
-                st.success("✅ Llama3.1:8b connecté")
+                model = crew_system.warmup.status() if crew_system.warmup else None
+                if model is None or model["state"] == "unreachable":
+                    st.warning("⚠️ Ollama injoignable: OpenAI utilisé en fallback")
+                elif model["state"] == "loaded":
+                    st.success(f"✅ Llama3.1:8b chargé (jusqu'à {model['expires_at']})")
+                else:
+                    st.info("🧊 Llama3.1:8b à froid: premier appel plus lent (chargement)")
                 st.success("✅ OpenAI GPT-4 connecté")
                 
                 # Afficher les agents
@@ -131,6 +207,26 @@ with st.sidebar:
     st.write("• **Flask** - API web légère")
     st.write("• **CLI** - Application ligne de commande")
     st.write("• **Library** - Bibliothèque Python")
+    
+    st.divider()
+    
+    # Historique des runs (catalogue SQLite, pas de parcours de sandbox/crew_output)
+    st.subheader("🗂️ Derniers runs")
+    history_status = st.selectbox("Statut", ["tous", "success", "error"], key="history_status")
+    try:
+        recent_runs = get_run_catalog().list_runs(
+            status=None if history_status == "tous" else history_status,
+            limit=10
+        )
+        if recent_runs:
+            for run in recent_runs:
+                icon = "✅" if run['status'] == "success" else "❌"
+                st.caption(f"{icon} {run['project_name']} • {run['template']} • "
+                           f"{run['file_count']} fichiers • {run['duration'] or 0:.0f}s")
+        else:
+            st.caption("Aucun run enregistré.")
+    except Exception as e:
+        st.caption(f"Catalogue indisponible: {e}")
 
 # Onglets pour l'interface principale
 tab_generate, tab_logs = st.tabs(["🚀 Génération", "📊 Logs"])
@@ -226,147 +322,251 @@ with tab_generate:
 # Zone de génération
 st.divider()
 
-# Bouton de génération principal
-generate_button = st.button(
-    "🚀 Générer le projet avec CrewAI",
-    type="primary",
-    use_container_width=True,
-    disabled=not brief.strip()
-)
+# Jobs de génération exécutés hors du script Streamlit (pool et système partagés par le processus):
+# un rerun ou un rafraîchissement du navigateur retrouve le job via son id
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    return JobManager(get_crew_system, max_workers=2)
 
-if generate_button:
-    # Conteneurs pour l'affichage en temps réel
-    status_container = st.empty()
-    progress_container = st.empty()
-    logs_container = st.expander("📜 Logs détaillés des agents", expanded=True)
-    results_container = st.container()
+
+# Étapes de generate_project -> (progression en %, message de statut)
+STAGE_PROGRESS = {
+    "crew": (15, "🧠 Le superviseur analyse le brief et planifie..."),
+    "speculative_developer": (45, "💻 Génération spéculative des fichiers..."),
+    "validation": (85, "🔎 Validation du projet écrit sur disque..."),
+    "tests": (90, "🧪 Exécution des tests générés..."),
+    "repair": (93, "🩹 Réparation ciblée des fichiers en échec..."),
+    "budget_exceeded": (80, "⚠️ Budget dépassé: arrêt et validation des fichiers écrits..."),
+}
+
+
+def apply_event(state: dict, event: dict):
+    """Met à jour la progression affichée à partir d'un événement du job"""
+    stamp = time.strftime("%H:%M:%S", time.localtime(event.get("time", time.time())))
+    kind = event.get("event")
+    if kind == "running":
+        state["percent"], state["status"] = 5, "🔧 Initialisation du système CrewAI..."
+        state["logs"].append(f"[{stamp}] ℹ️ Démarrage de LunaCore CrewAI")
+    elif kind == "started":
+        state["percent"] = 10
+        state["logs"].append(f"[{stamp}] ℹ️ Dossier du run: {event.get('output_directory')}")
+    elif kind == "stage":
+        percent, status = STAGE_PROGRESS.get(event.get("stage"), (state["percent"], state["status"]))
+        state["percent"], state["status"] = max(state["percent"], percent), status
+        state["logs"].append(f"[{stamp}] ℹ️ Étape: {event.get('stage')}")
+    elif kind == "step":
+        action = f"outil {event['tool']}" if event.get("tool") else ("réponse finale" if event.get("kind") == "finish" else "réflexion")
+        state["logs"].append(f"[{stamp}] ℹ️ {event.get('agent')}: {action}")
+        state["status"] = f"💻 {event.get('agent')} travaille ({action})..."
+    elif kind == "task_completed":
+        done, total = event.get("index", 0) + 1, event.get("total") or 1
+        state["percent"] = max(state["percent"], 15 + int(65 * done / total))
+        state["logs"].append(f"[{stamp}] ✅ Tâche terminée: {event.get('agent')} ({done}/{total})")
+    elif kind == "finished":
+        state["percent"] = 100
+        icon = "✅" if event.get("status") == "success" else "❌"
+        state["logs"].append(f"[{stamp}] {icon} Génération terminée: {event.get('status')}")
+
+
+@st.fragment(run_every=1.0)
+def job_progress(job_id: str):
+    """Suivi incrémental: seuls les nouveaux événements sont traités à chaque tick"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return
+    state = st.session_state.setdefault(
+        f"progress_{job_id}", {"cursor": 0, "percent": 0, "status": "⏳ En file d'attente...", "logs": []}
+    )
+    events = job.events[state["cursor"]:]
+    for event in events:
+        apply_event(state, event)
+    state["cursor"] += len(events)
     
-    # Variables de suivi
-    logs = []
-    start_time = time.time()
+    st.info(state["status"])
+    st.progress(state["percent"])
+    with st.expander("📜 Logs détaillés des agents", expanded=True):
+        st.code("\n".join(state["logs"][-15:]) or "En attente du premier événement...", language=None)
+    if job.done:
+        st.rerun()  # rendu complet des résultats
+
+
+@st.fragment(run_every=1.0)
+def archive_pending(run_id: str, output_directory: str):
+    """Attente de l'archive ZIP sans bloquer le script: rendu complet dès qu'elle est prête"""
+    if run_archive(run_id, output_directory).done():
+        st.rerun()  # affiche le bouton de téléchargement
+    st.info("🗜️ Préparation de l'archive ZIP...")
+    st.button("🗜️ Télécharger tout le projet (ZIP)", disabled=True, use_container_width=True,
+              key=f"archive_pending_{run_id}")
+
+
+def open_file(run_id: str, path: str, line: int = 0):
+    """Ouvre un fichier dans la vue (à la page contenant la ligne demandée)"""
+    st.session_state[f"open_{run_id}"] = path
+    st.session_state[f"file_page_{run_id}"] = line // FILE_PAGE_LINES + 1
+
+
+def open_dir(run_id: str, path: str):
+    st.session_state[f"dir_{run_id}"] = path
+    st.session_state[f"tree_page_{run_id}"] = 1
+
+
+def render_file_tree(run_id: str, index: RunFileIndex):
+    """Arborescence paginée (un niveau à la fois) et recherche via l'index du run"""
+    query = st.text_input("🔍 Rechercher (noms et contenus)", key=f"search_{run_id}")
+    if query.strip():
+        hits = index.search(query, limit=SEARCH_LIMIT)
+        if not hits["files"] and not hits["lines"]:
+            st.caption("Aucun résultat")
+        for i, hit in enumerate(hits["files"]):
+            st.button(f"📄 {hit['path']}", key=f"hit_file_{run_id}_{i}",
+                      on_click=open_file, args=(run_id, hit['path']))
+        for i, hit in enumerate(hits["lines"]):
+            st.button(f"{hit['path']}:{hit['line'] + 1}  {hit['text'].strip()[:60]}",
+                      key=f"hit_line_{run_id}_{i}", on_click=open_file,
+                      args=(run_id, hit['path'], hit['line']))
+        if SEARCH_LIMIT in (len(hits["files"]), len(hits["lines"])):
+            st.caption(f"Résultats limités à {SEARCH_LIMIT}: affinez la recherche")
+        return
     
-    def add_log(message, level="info"):
-        """Ajoute un log avec timestamp"""
-        timestamp = time.strftime("%H:%M:%S")
-        icon = "ℹ️" if level == "info" else "✅" if level == "success" else "❌"
-        logs.append(f"[{timestamp}] {icon} {message}")
-        
-        with logs_container:
-            st.code("\n".join(logs[-15:]), language=None)
+    current = st.session_state.get(f"dir_{run_id}", "")
+    st.caption(f"📂 /{current}")
+    if current:
+        st.button("⬆️ Dossier parent", key=f"up_{run_id}", on_click=open_dir,
+                  args=(run_id, current.rsplit("/", 1)[0] if "/" in current else ""))
+    _, total = index.children(current, limit=0)
+    pages = max(1, -(-total // TREE_PAGE_SIZE))
+    page = st.session_state.get(f"tree_page_{run_id}", 1)
+    if pages > 1:
+        page = st.number_input(f"Page (sur {pages})", min_value=1, max_value=pages, key=f"tree_page_{run_id}")
+    entries, _ = index.children(current, limit=TREE_PAGE_SIZE, offset=(min(page, pages) - 1) * TREE_PAGE_SIZE)
+    for i, entry in enumerate(entries):
+        if entry["kind"] == "dir":
+            st.button(f"📁 {entry['name']}/", key=f"node_{run_id}_{i}", on_click=open_dir,
+                      args=(run_id, entry["path"]))
+        else:
+            st.button(f"📄 {entry['name']}", key=f"node_{run_id}_{i}", on_click=open_file,
+                      args=(run_id, entry["path"]), help=f"{entry['size']} octets, {entry['lines']} lignes")
+
+
+def render_file_view(run_id: str, index: RunFileIndex):
+    """Contenu du fichier ouvert, page par page (FILE_PAGE_LINES lignes)"""
+    path = st.session_state.get(f"open_{run_id}")
+    info_row = index.file_info(path) if path else None
+    if info_row is None:
+        st.info("Sélectionnez un fichier dans l'arborescence ou la recherche")
+        return
+    
+    st.markdown(f"**{path}** · {info_row['size']} octets · {info_row['lines']} lignes")
+    if info_row["binary"]:
+        st.caption("Fichier binaire: aperçu indisponible")
+    else:
+        pages = max(1, -(-info_row["lines"] // FILE_PAGE_LINES))
+        page_key = f"file_page_{run_id}"
+        if st.session_state.get(page_key, 1) > pages:
+            st.session_state[page_key] = pages
+        page = st.number_input(f"Page (sur {pages})", min_value=1, max_value=pages, key=page_key) if pages > 1 else 1
+        first = (page - 1) * FILE_PAGE_LINES
+        st.caption(f"Lignes {first + 1}–{min(first + FILE_PAGE_LINES, info_row['lines'])}")
+        st.code(file_page(run_id, path, page - 1), language=_language(path))
     
+    # Contenu lu au clic uniquement (pas embarqué dans la page)
+    st.download_button(
+        f"⬇️ Télécharger {Path(path).name}",
+        data=lambda: (index.run_dir / path).read_bytes(),
+        file_name=Path(path).name,
+        key=f"download_{run_id}"
+    )
+
+
+def render_changes(run_id: str):
+    """Changements depuis le run précédent du même brief: seuls les fichiers changés sont envoyés"""
+    previous = get_run_catalog().previous_run(run_id)
+    if previous is None:
+        return
     try:
-        # Phase 1: Initialisation
-        with status_container:
-            st.info("🔧 Initialisation du système CrewAI...")
-        
-        with progress_container:
-            progress_bar = st.progress(0)
-        
-        add_log("Démarrage de LunaCore CrewAI")
-        add_log("Initialisation des agents multi-agents")
-        
-        # Créer le système
-        crew_system = LunaCrewSystem()
-        progress_bar.progress(20)
-        add_log(f"Système initialisé avec {len(crew_system.agents)} agents", "success")
-        
-        # Phase 2: Planification
-        status_container.info("🧠 Le superviseur OpenAI analyse le brief...")
-        progress_bar.progress(30)
-        add_log("OpenAI Superviseur: Analyse du brief et conception de l'architecture")
-        
-        # Phase 3: Génération
-        status_container.info("💻 Les agents Llama génèrent le code...")
-        progress_bar.progress(50)
-        add_log("Llama Dev Principal: Implémentation du code principal")
-        add_log("Llama Dev Backend: Création des composants backend")
-        add_log("Llama Testeur: Génération des tests")
-        add_log("Llama Documentaliste: Rédaction de la documentation")
-        
-        # Lancement de la génération réelle
-        result = crew_system.generate_project(brief, template_type)
+        changes = run_changes(run_id, previous["run_id"])
+    except LookupError:
+        return  # run précédent supprimé du disque
+    changed = ([("➕", e["path"]) for e in changes["added"]] + [("➖", e["path"]) for e in changes["removed"]]
+               + [("✏️", e["path"]) for e in changes["modified"]])
+    st.subheader("🔁 Changements depuis la génération précédente")
+    st.caption(f"{len(changes['added'])} ajouté(s) · {len(changes['removed'])} supprimé(s) · "
+               f"{len(changes['modified'])} modifié(s) · {changes['unchanged']} inchangé(s) "
+               f"(run {previous['run_id']})")
+    if not changed:
+        return
+    choice = st.selectbox("Fichier", [f"{mark} {path}" for mark, path in changed], key=f"diff_{run_id}")
+    st.code(run_file_diff(run_id, previous["run_id"], choice.split(" ", 1)[1]), language="diff")
+
+
+def render_results(run_id: str, result: dict, project_name: str):
+    """Affiche le résultat d'une génération réussie (vues dérivées mémoïsées)"""
+    if result['status'] == "budget_exceeded":
+        st.warning(f"⚠️ {result['error']}: génération arrêtée, résultats partiels ci-dessous")
+    else:
+        st.success(f"✅ Projet généré en {result['duration'] or 0:.1f}s !")
+        st.subheader("🎉 Projet généré avec succès !")
+    
+    index = get_file_index(run_id, result['output_directory'])
+    stats = index.stats()
+    
+    # Métriques
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("📁 Fichiers", stats['files'])
+    with col2:
+        st.metric("🔎 Validation", result['validation_status'] or "-")
+    with col3:
+        st.metric("🧪 Tests", result['tests_status'] or "-")
+    with col4:
+        st.metric("⏱️ Temps", f"{result['duration'] or 0:.1f}s")
+    
+    # Explorateur des fichiers générés
+    if not stats['files']:
+        st.warning("Aucun fichier généré. Vérifiez le brief et réessayez.")
+        return
+    
+    st.subheader("📄 Fichiers générés")
+    tree_col, file_col = st.columns([1, 2])
+    with tree_col:
+        render_file_tree(run_id, index)
+    with file_col:
+        render_file_view(run_id, index)
+    
+    render_changes(run_id)
+    
+    # Bouton de téléchargement ZIP
+    st.subheader("📦 Téléchargement")
+    
+    # Archive construite en arrière-plan depuis le run_dir (cache disque par empreinte)
+    archive_future = run_archive(run_id, result['output_directory'])
+    project_name_final = project_name if project_name else f"lunacore_project_{int(time.time())}"
+    
+    if not archive_future.done():
+        archive_pending(run_id, result['output_directory'])
+    elif archive_future.exception() is not None:
+        run_archive.clear(run_id, result['output_directory'])  # nouvelle tentative au prochain rerun
+        st.error(f"❌ Archive ZIP indisponible: {archive_future.exception()}")
+    else:
+        archive_path = Path(archive_future.result())
         
-        # Phase 4: Finalisation
-        progress_bar.progress(100)
+        def open_archive(path=archive_path, run_id=run_id):
+            """Ouvre l'archive au clic: Streamlit la lit depuis le disque, hors du thread du script"""
+            get_run_catalog().touch(run_id)
+            return open(path, "rb")
         
-        if result["status"] == "success":
-            status_container.success(f"✅ Projet généré en {result['execution_time']}s !")
-            add_log(f"Génération terminée avec succès", "success")
-            add_log(f"Fichiers créés: {len(result['files'])}", "success")
-            add_log(f"Temps d'exécution: {result['execution_time']}s", "success")
-            
-            # Affichage des résultats
-            with results_container:
-                st.subheader("🎉 Projet généré avec succès !")
-                
-                # Métriques
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("📁 Fichiers", len(result['files']))
-                with col2:
-                    st.metric("🤖 Agents", result['agents_count'])
-                with col3:
-                    st.metric("📋 Tâches", result['tasks_count'])
-                with col4:
-                    st.metric("⏱️ Temps", f"{result['execution_time']}s")
-                
-                # Aperçu des fichiers générés
-                if result['files']:
-                    st.subheader("📄 Fichiers générés")
-                    
-                    # Créer des onglets pour les fichiers
-                    file_names = list(result['files'].keys())
-                    if file_names:
-                        # Limiter à 5 onglets pour l'affichage
-                        display_files = file_names[:5]
-                        tabs = st.tabs([f"📄 {name}" for name in display_files])
-                        
-                        for idx, (filename, content) in enumerate([(f, result['files'][f]) for f in display_files]):
-                            with tabs[idx]:
-                                # Déterminer le langage pour la coloration syntaxique
-                                if filename.endswith('.py'):
-                                    language = "python"
-                                elif filename.endswith('.md'):
-                                    language = "markdown"
-                                elif filename.endswith('.txt'):
-                                    language = "text"
-                                elif filename.endswith(('.json', '.yaml', '.yml')):
-                                    language = "json"
-                                else:
-                                    language = "text"
-                                
-                                st.code(content, language=language)
-                                
-                                # Bouton de téléchargement individuel
-                                st.download_button(
-                                    f"⬇️ Télécharger {filename}",
-                                    data=content,
-                                    file_name=filename,
-                                    key=f"download_{idx}"
-                                )
-                    
-                    # Bouton de téléchargement ZIP
-                    st.subheader("📦 Téléchargement")
-                    
-                    # Créer le ZIP
-                    zip_buffer = io.BytesIO()
-                    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                        for filename, content in result['files'].items():
-                            zipf.writestr(filename, content)
-                    
-                    project_name_final = project_name if project_name else f"lunacore_project_{int(time.time())}"
-                    
-                    st.download_button(
-                        "🗜️ Télécharger tout le projet (ZIP)",
-                        data=zip_buffer.getvalue(),
-                        file_name=f"{project_name_final}.zip",
-                        mime="application/zip",
-                        use_container_width=True
-                    )
-                    
-                    # Instructions de déploiement
-                    st.subheader("🚀 Instructions de déploiement")
-                    deploy_instructions = f"""
+        st.download_button(
+            "🗜️ Télécharger tout le projet (ZIP)",
+            data=open_archive,
+            file_name=f"{project_name_final}.zip",
+            mime="application/zip",
+            use_container_width=True
+        )
+    
+    # Instructions de déploiement
+    st.subheader("🚀 Instructions de déploiement")
+    deploy_instructions = f"""
 **1. Extraire le projet :**
 ```bash
 # Décompresser le fichier ZIP
@@ -397,26 +597,61 @@ streamlit run app.py
 # Pour CLI
 python main.py --help
 ```
-                    """
-                    st.markdown(deploy_instructions)
-                
-                else:
-                    st.warning("Aucun fichier généré. Vérifiez le brief et réessayez.")
-        
-        else:
-            status_container.error("❌ Erreur lors de la génération")
-            add_log(f"Erreur: {result.get('error', 'Erreur inconnue')}", "error")
-            st.error(f"Détails: {result.get('error', 'Erreur inconnue')}")
-    
-    except Exception as e:
-        status_container.error("❌ Erreur critique")
-        add_log(f"Erreur critique: {str(e)}", "error")
-        st.error(f"Erreur: {str(e)}")
+    """
+    st.markdown(deploy_instructions)
+
+
+# Job courant (ou run terminé): session, sinon paramètres d'URL (rafraîchissement du navigateur)
+job_id = st.session_state.get("job_id") or st.query_params.get("job")
+run_id = st.session_state.get("run_id") or st.query_params.get("run")
+active_job = get_job_manager().get(job_id) if job_id else None
+
+# Bouton de génération principal
+generate_button = st.button(
+    "🚀 Générer le projet avec CrewAI",
+    type="primary",
+    use_container_width=True,
+    disabled=not brief.strip() or (active_job is not None and not active_job.done)
+)
+
+if generate_button:
+    active_job = get_job_manager().submit(brief, template=template_type)
+    st.session_state["job_id"] = active_job.id
+    st.session_state[f"project_name_{active_job.id}"] = project_name
+    st.query_params["job"] = active_job.id
+    run_id = None
+    st.session_state.pop("run_id", None)
+    st.query_params.pop("run", None)
+
+# Job réussi: la suite est servie par run id (cache de résultats, indépendant du job)
+if active_job is not None and active_job.status in ("success", "budget_exceeded") and active_job.output_directory:
+    run_id = Path(active_job.output_directory).name
+    st.session_state["run_id"] = run_id
+    st.session_state[f"project_name_{run_id}"] = st.session_state.pop(f"project_name_{active_job.id}", "")
+    st.query_params["run"] = run_id
+    st.query_params.pop("job", None)
+    st.session_state.pop("job_id", None)
+    active_job = None
+
+if active_job is not None:
+    if not active_job.done:
+        job_progress(active_job.id)
+    else:
+        error_message = (active_job.result or {}).get('error', 'Erreur inconnue')
+        st.error("❌ Erreur lors de la génération")
+        st.error(f"Détails: {error_message}")
         st.error("Vérifiez que Ollama est démarré et que votre clé OpenAI est configurée")
-        
-        # Affichage de la stack trace en mode debug
-        with st.expander("🔍 Détails techniques (debug)"):
-            st.code(traceback.format_exc())
+elif run_id:
+    try:
+        render_results(run_id, load_run_result(run_id), st.session_state.get(f"project_name_{run_id}", ""))
+    except LookupError:
+        st.warning("Ce run n'est plus disponible (supprimé par la rétention ?).")
+        st.query_params.pop("run", None)
+        st.session_state.pop("run_id", None)
+elif job_id:
+    st.warning("Ce job n'existe plus (serveur redémarré ?). Relancez la génération.")
+    st.query_params.pop("job", None)
+    st.session_state.pop("job_id", None)
 
 # Onglet des logs
 with tab_logs:
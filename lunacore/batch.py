@@ -0,0 +1,157 @@
+"""
+LunaCore Batch
+Génération par lots de briefs JSONL avec un LunaCrewSystem partagé, reprise et statistiques
+"""
+
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from lunacore.logger import info, warning, success
+
+
+def brief_key(item: Dict) -> str:
+    """Identifiant de reprise: champ id, sinon hash du brief et du template"""
+    if item.get("id") not in (None, ""):
+        return str(item["id"])
+    raw = f"{item.get('template', 'fastapi')}\n{item['brief']}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def load_briefs(path: Path) -> List[Dict]:
+    """Lit les briefs (une ligne JSON {brief, template?, id?} par brief, lignes invalides ignorées)"""
+    items = []
+    with Path(path).open(encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                warning(f"Ligne {lineno} ignorée: JSON invalide", "batch")
+                continue
+            if not isinstance(item, dict) or not item.get("brief"):
+                warning(f"Ligne {lineno} ignorée: champ 'brief' manquant", "batch")
+                continue
+            item.setdefault("template", "fastapi")
+            item["key"] = brief_key(item)
+            items.append(item)
+    return items
+
+
+def completed_keys(output: Path) -> set:
+    """Clés déjà présentes dans le fichier de sortie (reprise d'un lot interrompu)"""
+    keys = set()
+    if not Path(output).exists():
+        return keys
+    with Path(output).open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                keys.add(json.loads(line)["key"])
+            except (ValueError, KeyError, TypeError):
+                continue  # ligne tronquée par un arrêt brutal: le brief sera rejoué
+    return keys
+
+
+def _result_line(item: Dict, result: Dict, latency: float) -> Dict:
+    return {
+        "key": item["key"],
+        "id": item.get("id"),
+        "brief": item["brief"],
+        "template": item["template"],
+        "status": result.get("status", "error"),
+        "latency": round(latency, 3),
+        "execution_time": result.get("execution_time"),
+        "output_directory": result.get("output_directory"),
+        "files_count": len(result.get("files") or {}),
+        "validation": (result.get("validation") or {}).get("status"),
+        "tests": (result.get("tests") or {}).get("status"),
+        "total_tokens": (result.get("token_usage") or {}).get("total_tokens", 0),
+        "error": result.get("error"),
+        "finished_at": time.time(),
+    }
+
+
+def summarize(lines: List[Dict], wall_time: float) -> Dict:
+    """Débit, taux de succès et percentiles de latence des briefs traités"""
+    latencies = np.array([line["latency"] for line in lines], dtype=float)
+    successes = sum(1 for line in lines if line["status"] == "success")
+    summary = {
+        "processed": len(lines),
+        "succeeded": successes,
+        "success_rate": successes / len(lines) if lines else 0.0,
+        "wall_time": round(wall_time, 2),
+        "throughput_per_min": len(lines) / wall_time * 60 if wall_time > 0 else 0.0,
+    }
+    for q in (50, 90, 99):
+        summary[f"latency_p{q}"] = float(np.percentile(latencies, q)) if len(latencies) else 0.0
+    return summary
+
+
+def run_batch(system, items: List[Dict], output: Path, concurrency: int = 2,
+              generate_kwargs: Optional[Dict] = None) -> Dict:
+    """
+    Exécute les briefs avec un seul système partagé et écrit chaque résultat dès sa fin
+
+    Args:
+        system: Instance LunaCrewSystem (ou tout objet exposant generate_project)
+        items: Briefs chargés par load_briefs
+        output: Fichier JSONL de sortie (ouvert en ajout: les briefs déjà présents sont sautés)
+        concurrency: Nombre de briefs traités en parallèle
+        generate_kwargs: Arguments supplémentaires de generate_project (run_tests, memory_mode...)
+
+    Returns:
+        Résumé (summarize) avec le nombre de briefs sautés
+    """
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    done = completed_keys(output)
+    pending, seen = [], set(done)
+    for item in items:
+        if item["key"] not in seen:
+            seen.add(item["key"])
+            pending.append(item)
+    skipped = len(items) - len(pending)
+    info(f"📦 Lot: {len(pending)} brief(s) à traiter, {skipped} déjà fait(s)", "batch")
+
+    generate_kwargs = generate_kwargs or {}
+    lines: List[Dict] = []
+
+    def run_one(item: Dict) -> Dict:
+        start = time.perf_counter()
+        try:
+            result = system.generate_project(item["brief"], template=item["template"], **generate_kwargs)
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+        return _result_line(item, result, time.perf_counter() - start)
+
+    # Dernière ligne tronquée (arrêt brutal): la terminer pour ne pas la fusionner avec la suivante
+    if output.exists() and output.stat().st_size:
+        with output.open("rb") as f:
+            f.seek(-1, 2)
+            if f.read(1) != b"\n":
+                with output.open("a", encoding="utf-8") as out:
+                    out.write("\n")
+
+    start = time.perf_counter()
+    with output.open("a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(run_one, item) for item in pending]
+        for future in as_completed(futures):
+            # Écriture depuis le seul thread principal, ligne complète puis flush
+            line = future.result()
+            out.write(json.dumps(line, ensure_ascii=False) + "\n")
+            out.flush()
+            lines.append(line)
+            info(f"[{len(lines)}/{len(pending)}] {line['status']} {line['latency']:.1f}s {line['key']}", "batch")
+
+    summary = summarize(lines, time.perf_counter() - start)
+    summary["skipped"] = skipped
+    success(f"Lot terminé: {summary['succeeded']}/{summary['processed']} succès, "
+            f"{summary['throughput_per_min']:.2f} brief(s)/min", "batch")
+    return summary
@@ -0,0 +1,161 @@
+"""
+LunaCore Brief Index
+Index MinHash/LSH des briefs passés et de leur plan.json pour réutiliser les plans proches
+"""
+
+import json
+import re
+import threading
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from lunacore.logger import info
+
+BRIEF_INDEX_FILE = Path("sandbox/brief_index.jsonl")
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+_PRIME = np.uint64(4294967311)  # premier > 2^32: a*x reste < 2^63 avec a < 2^31
+
+# Seuils de similarité (Jaccard estimée) pour la planification
+REUSE_THRESHOLD = 0.95   # plan réutilisé tel quel, pas d'appel superviseur
+REVISE_THRESHOLD = 0.75  # le superviseur révise le plan le plus proche
+
+_rng = np.random.RandomState(20250903)
+_PERM_A = _rng.randint(1, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+
+
+def normalize_brief(text: str) -> str:
+    """Minuscules, sans accents ni ponctuation, espaces compactés"""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9]+", " ", text)).strip()
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Hashes 32 bits des n-grammes de caractères du brief normalisé"""
+    text = normalize_brief(text)
+    if len(text) <= size:
+        grams = {text}
+    else:
+        grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(text: str) -> np.ndarray:
+    """Signature MinHash (NUM_PERM valeurs uint64)"""
+    hashes = shingle_hashes(text)
+    # (NUM_PERM, n) permutations universelles, minimum par ligne
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+
+def _band_keys(signature: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [(b, signature[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+
+class BriefIndex:
+    """
+    Index persistant (JSONL append-only) des briefs et de leur plan
+
+    Les candidats viennent des buckets LSH (BANDS bandes de ROWS lignes), puis la
+    similarité est estimée sur les signatures: la recherche ne parcourt jamais tout l'index.
+    """
+
+    def __init__(self, path: Path = BRIEF_INDEX_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: List[Dict] = []
+        self._signatures = np.zeros((0, NUM_PERM), dtype=np.uint64)
+        self._size = 0
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        rows = []
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                rows.append(np.array([int(v, 16) for v in entry.pop("signature")], dtype=np.uint64))
+                self._entries.append(entry)
+        if rows:
+            self._signatures = np.vstack(rows)
+            self._size = len(rows)
+            for idx, row in enumerate(self._signatures):
+                for key in _band_keys(row):
+                    self._buckets.setdefault(key, []).append(idx)
+
+    def _append_signature(self, signature: np.ndarray):
+        if self._size == len(self._signatures):
+            grown = np.zeros((max(16, 2 * self._size), NUM_PERM), dtype=np.uint64)
+            grown[:self._size] = self._signatures[:self._size]
+            self._signatures = grown
+        self._signatures[self._size] = signature
+        self._size += 1
+
+    def add(self, brief: str, template: str, plan, run_dir: Optional[str] = None):
+        """Indexe un brief et le plan produit pour lui"""
+        signature = minhash(brief)
+        entry = {"brief": brief, "template": template, "plan": plan, "run_dir": run_dir}
+        with self._lock:
+            idx = self._size
+            self._append_signature(signature)
+            self._entries.append(entry)
+            for key in _band_keys(signature):
+                self._buckets.setdefault(key, []).append(idx)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                record = dict(entry, signature=[format(int(v), "x") for v in signature])
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _candidates(self, signature: np.ndarray, template: Optional[str] = None) -> Set[int]:
+        """Entrées partageant au moins une bande LSH avec la signature (seules comparées)"""
+        candidates = set()
+        for key in _band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        if template is not None:
+            candidates = {i for i in candidates if self._entries[i]["template"] == template}
+        return candidates
+
+    def lookup(self, brief: str, template: Optional[str] = None) -> Optional[Tuple[float, Dict]]:
+        """
+        Retourne (similarité, entrée) du brief indexé le plus proche, ou None
+
+        Seuls les briefs du même template sont considérés si template est donné.
+        """
+        signature = minhash(brief)
+        with self._lock:
+            candidates = self._candidates(signature, template)
+            if not candidates:
+                return None
+            ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            scores = (self._signatures[ids] == signature).mean(axis=1)
+            best = int(scores.argmax())
+            return float(scores[best]), self._entries[int(ids[best])]
+
+
+_default_index: Optional[BriefIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_brief_index() -> BriefIndex:
+    """Retourne l'index de briefs global (chargé à la première utilisation)"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = BriefIndex()
+            info(f"Index de briefs: {len(_default_index)} entrée(s)", "brief_index")
+        return _default_index
@@ -0,0 +1,239 @@
+"""
+LunaCore Cassette
+Enregistrement et rejeu des échanges LLM d'un run (JSONL compressé dans le run_dir)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from crewai.llms.base_llm import BaseLLM
+from crewai.types.usage_metrics import UsageMetrics
+from pydantic import ConfigDict
+
+from lunacore.logger import info, success, warning
+from lunacore.run_files import RUN_META_DIR
+
+CASSETTE_NAME = "cassette.jsonl.gz"
+CASSETTE_VERSION = 1
+_USAGE_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens", "cached_prompt_tokens", "successful_requests")
+
+
+class CassetteMismatch(RuntimeError):
+    """Rejeu strict: requête différente de l'enregistrement, ou cassette épuisée"""
+
+
+def _jsonable(value: Any) -> Any:
+    """Réponse LLM sérialisable (texte, ou appels d'outils natifs en dicts)"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if hasattr(value, "model_dump"):
+        return _jsonable(value.model_dump())
+    if hasattr(value, "__dict__"):
+        return _jsonable({k: v for k, v in vars(value).items() if not k.startswith("_")})
+    return str(value)
+
+
+def request_hash(messages: Any, tools: Optional[List] = None) -> str:
+    """Empreinte d'une requête (messages et noms des outils proposés)"""
+    tool_names = sorted(str((t.get("function") or t).get("name", "")) if isinstance(t, dict) else str(t)
+                        for t in (tools or []))
+    payload = json.dumps([_jsonable(messages), tool_names], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Échanges LLM d'un run, par canal (clé d'agent, ou candidat spéculatif)
+
+    record: chaque appel est exécuté puis ajouté (requête, réponse, durée, tokens).
+    replay: chaque canal sert ses réponses dans l'ordre enregistré, sans appel réseau;
+    une requête différente est signalée (erreur si strict), la latence d'origine est
+    rejouée si realtime.
+    """
+
+    def __init__(self, path: Path, mode: str, realtime: bool = False, strict: bool = False,
+                 header: Optional[Dict] = None, export_to: Optional[Path] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode de cassette inconnu: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.realtime = realtime
+        self.strict = strict
+        self.header = dict(header or {})
+        self.export_to = Path(export_to) if export_to else None
+        self.entries: List[Dict] = []
+        self.mismatches = 0
+        self._lock = threading.Lock()
+        self._cursor: Dict[str, int] = {}
+        self._started = time.monotonic()
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if not lines or lines[0].get("version") != CASSETTE_VERSION:
+            raise ValueError(f"cassette illisible ou de version inconnue: {self.path}")
+        self.header = lines[0]
+        self.entries = lines[1:]
+        self._by_channel: Dict[str, List[Dict]] = {}
+        for entry in self.entries:
+            self._by_channel.setdefault(entry["channel"], []).append(entry)
+        for recorded in self._by_channel.values():
+            recorded.sort(key=lambda e: e["seq"])
+        info(f"📼 Rejeu de {len(self.entries)} échange(s) LLM depuis {self.path}", "cassette")
+
+    def wrap(self, channel: str, llm: Optional[BaseLLM]) -> "CassetteLLM":
+        """LLM d'un canal: enregistre les appels de llm, ou les rejoue (llm ignoré, peut être None)"""
+        if self.replaying:
+            profile = self.header.get("llms", {}).get(channel, {})
+            return CassetteLLM(model=profile.get("model", "cassette"), cassette=self, channel=channel,
+                               profile=profile, stop=list(llm.stop) if llm is not None else [])
+        profile = {"model": llm.model, "function_calling": llm.supports_function_calling(),
+                   "stop_words": llm.supports_stop_words()}
+        with self._lock:
+            self.header.setdefault("llms", {})[channel] = profile
+        return CassetteLLM(model=llm.model, inner=llm, cassette=self, channel=channel,
+                           profile=profile, stop=list(llm.stop))
+
+    def record(self, channel: str, digest: str, messages: Any, response: Any, duration: float, usage: Dict):
+        with self._lock:
+            seq = self._cursor.get(channel, 0)
+            self._cursor[channel] = seq + 1
+            self.entries.append({
+                "channel": channel, "seq": seq, "request": digest, "messages": _jsonable(messages),
+                "response": _jsonable(response), "duration": round(duration, 4),
+                "offset": round(time.monotonic() - self._started - duration, 4), "usage": usage,
+            })
+
+    def next(self, channel: str, digest: str) -> Dict:
+        """Prochaine réponse enregistrée du canal"""
+        with self._lock:
+            seq = self._cursor.get(channel, 0)
+            recorded = self._by_channel.get(channel, [])
+            if seq >= len(recorded):
+                raise CassetteMismatch(f"cassette épuisée pour le canal {channel} (appel {seq + 1})")
+            self._cursor[channel] = seq + 1
+            entry = recorded[seq]
+            if entry["request"] != digest:
+                self.mismatches += 1
+                if self.strict:
+                    raise CassetteMismatch(f"requête {channel}#{seq} différente de l'enregistrement")
+                warning(f"Rejeu {channel}#{seq}: requête différente de l'enregistrement", "cassette")
+        if self.realtime:
+            time.sleep(entry["duration"])
+        return entry
+
+    def save(self) -> Optional[Path]:
+        """Écrit la cassette (mode record); retourne son chemin"""
+        if self.replaying:
+            return None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = dict(self.header, version=CASSETTE_VERSION, created_at=time.time())
+        tmp = self.path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for line in [header] + sorted(self.entries, key=lambda e: e["offset"]):
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        if self.export_to is not None:
+            self.export_to.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self.path, self.export_to)
+        success(f"📼 {len(self.entries)} échange(s) LLM enregistrés dans {self.path}", "cassette")
+        return self.path
+
+    def report(self) -> Dict:
+        report = {"mode": self.mode, "path": str(self.path), "calls": sum(self._cursor.values())}
+        if self.replaying:
+            report.update(recorded=len(self.entries), mismatches=self.mismatches, realtime=self.realtime)
+        return report
+
+
+class CassetteLLM(BaseLLM):
+    """LLM enregistré (délègue à inner) ou rejoué (réponses et tokens de la cassette)"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Any = None
+    cassette: Any = None
+    channel: str = ""
+    profile: Dict[str, Any] = {}
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        digest = request_hash(messages, tools)
+        if self.cassette.replaying:
+            entry = self.cassette.next(self.channel, digest)
+            for key in _USAGE_KEYS:
+                self._token_usage[key] = self._token_usage.get(key, 0) + entry["usage"].get(key, 0)
+            return entry["response"]
+
+        before = self.inner.get_token_usage_summary()
+        start = time.perf_counter()
+        response = self.inner.call(messages, tools=tools, callbacks=callbacks,
+                                   available_functions=available_functions, from_task=from_task,
+                                   from_agent=from_agent, response_model=response_model)
+        duration = time.perf_counter() - start
+        delta = self.inner.get_token_usage_summary().delta_since(before)
+        self.cassette.record(self.channel, digest, messages, response, duration,
+                             {key: getattr(delta, key, 0) for key in _USAGE_KEYS})
+        return response
+
+    def supports_function_calling(self) -> bool:
+        return bool(self.profile.get("function_calling", False))
+
+    def supports_stop_words(self) -> bool:
+        return bool(self.profile.get("stop_words", True))
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size() if self.inner is not None else super().get_context_window_size()
+
+    def get_token_usage_summary(self) -> UsageMetrics:
+        if self.inner is not None and not self.cassette.replaying:
+            return self.inner.get_token_usage_summary()
+        return UsageMetrics(**self._token_usage)
+
+
+def cassette_mode_from_env() -> Optional[str]:
+    """LUNACORE_CASSETTE: record, replay ou vide (appels LLM directs)"""
+    mode = os.getenv("LUNACORE_CASSETTE", "").strip().lower()
+    return mode or None
+
+
+def cassette_from_env(run_dir: Path, header: Optional[Dict] = None) -> Optional[Cassette]:
+    """
+    Cassette du run selon l'environnement
+
+    record: écrite dans run_dir/.lunacore/cassette.jsonl.gz en fin de run (et copiée vers
+    LUNACORE_CASSETTE_PATH si défini, ex. fixture de test).
+    replay: lue depuis LUNACORE_CASSETTE_PATH (fichier, ou run_dir d'un run enregistré);
+    LUNACORE_CASSETTE_REALTIME=1 rejoue les latences d'origine, LUNACORE_CASSETTE_STRICT=1
+    échoue sur toute requête différente de l'enregistrement.
+    """
+    mode = cassette_mode_from_env()
+    if mode is None:
+        return None
+    path = os.getenv("LUNACORE_CASSETTE_PATH")
+    if mode == "record":
+        return Cassette(Path(run_dir) / RUN_META_DIR / CASSETTE_NAME, "record", header=header, export_to=path)
+    source = Path(path or "")
+    if source.is_dir():
+        source = source / RUN_META_DIR / CASSETTE_NAME
+    if not source.is_file():
+        raise FileNotFoundError(f"LUNACORE_CASSETTE_PATH: cassette introuvable ({source})")
+    return Cassette(source, "replay", realtime=os.getenv("LUNACORE_CASSETTE_REALTIME") == "1",
+                    strict=os.getenv("LUNACORE_CASSETTE_STRICT") == "1")
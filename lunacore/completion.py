@@ -0,0 +1,157 @@
+"""
+LunaCore Completion
+Contrats de fin de tâche vérifiés sur le run_dir: l'agent s'arrête dès que le sien est rempli
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from crewai.tools import tool
+
+from lunacore.logger import info
+from lunacore.speculative import planned_python_files
+from lunacore.tools_runtime import make_write_file_tool
+from lunacore.validation import check_python_source
+from lunacore.verification import collect_test_files
+
+
+def _valid_python(path: Path) -> bool:
+    try:
+        source = path.read_bytes()
+    except OSError:
+        return False
+    return check_python_source((path.name, source))["status"] == "ok"
+
+
+def _read_plan(run_dir: Path):
+    try:
+        plan = json.loads((Path(run_dir) / "plan.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return plan if isinstance(plan, dict) and plan else None
+
+
+def plan_ready(run_dir: Path, written: Set[str], scaffold: Set[str]) -> bool:
+    """Superviseur: plan.json écrit, JSON valide et non vide"""
+    return "plan.json" in written and _read_plan(run_dir) is not None
+
+
+def code_ready(run_dir: Path, written: Set[str], scaffold: Set[str]) -> bool:
+    """
+    Développeur: tous les fichiers .py du plan présents et compilables, dont au moins un
+    écrit par l'agent (un squelette seul ne remplit pas le contrat)
+
+    Les fichiers du squelette n'ont pas à être réécrits: scaffold_note demande aux agents
+    de ne pas les régénérer, présents et compilables ils comptent comme prêts.
+    """
+    plan = _read_plan(run_dir)
+    planned = planned_python_files(plan) if plan else []
+    if not planned or not written - scaffold:
+        return False
+    return all(_valid_python(Path(run_dir) / rel) for rel in planned)
+
+
+def tests_ready(run_dir: Path, written: Set[str], scaffold: Set[str]) -> bool:
+    """Testeur: au moins un fichier de tests écrit par l'agent, tous les tests compilables"""
+    tests = collect_test_files(run_dir)
+    rels = {p.relative_to(run_dir).as_posix() for p in tests}
+    return bool(rels & written) and all(_valid_python(p) for p in tests)
+
+
+# Contrat de la tâche de chaque agent (clés d'AGENT_TEMPLATES)
+TASK_CONTRACTS: Dict[str, Callable[[Path, Set[str], Set[str]], bool]] = {
+    "supervisor": plan_ready,
+    "developer": code_ready,
+    "tester": tests_ready,
+}
+
+
+class CompletionGuard:
+    """
+    Suivi des contrats d'un run: un outil write_file par agent, contrat réévalué après chaque écriture
+
+    Dès que le contrat est rempli, la sortie de l'outil devient la réponse finale de l'agent
+    (result_as_answer, lu par CrewAI après l'appel d'outil natif; pour le mode ReAct, le
+    step_callback marque le ToolResult via mark_final). Aucun tour de LLM de confirmation.
+    """
+
+    def __init__(self, run_dir: Path, scaffold_files: Optional[List[str]] = None,
+                 contracts: Optional[Dict[str, Callable]] = None):
+        self.run_dir = Path(run_dir)
+        self.scaffold = set(scaffold_files or [])
+        self.contracts = TASK_CONTRACTS if contracts is None else contracts
+        self._lock = threading.Lock()
+        self._written: Dict[str, Set[str]] = {}
+        self._met: Dict[str, bool] = {}
+        self._tools: Dict[str, object] = {}
+        self.tasks: Dict[str, Dict] = {}
+
+    def write_tool(self, agent_key: str):
+        """Outil write_file propre à un agent (même interface que make_write_file_tool)"""
+        write = make_write_file_tool(self.run_dir).func
+
+        @tool("write_file")
+        def write_file(filename: str, content: str) -> str:
+            """Écrit un fichier dans le projet"""
+            message = write(filename, content)
+            if self._record_write(agent_key, Path(filename).as_posix()):
+                message += "\nContrat de la tâche rempli: travail terminé."
+            return message
+
+        self._tools[agent_key] = write_file
+        return write_file
+
+    def _record_write(self, agent_key: str, rel: str) -> bool:
+        with self._lock:
+            self._written.setdefault(agent_key, set()).add(rel)
+            written = set(self._written[agent_key])
+        contract = self.contracts.get(agent_key)
+        met = bool(contract and contract(self.run_dir, written, self.scaffold))
+        with self._lock:
+            self._met[agent_key] = met
+        tool_obj = self._tools.get(agent_key)
+        if tool_obj is not None:
+            tool_obj.result_as_answer = met
+        return met
+
+    def owners(self) -> Dict[str, str]:
+        """Manifeste d'écriture: fichier -> agent qui l'a écrit en dernier (ordre des tâches)"""
+        with self._lock:
+            written = {key: set(files) for key, files in self._written.items()}
+        owners = {rel: "scaffold" for rel in self.scaffold}
+        for key in list(self.contracts) + [k for k in written if k not in self.contracts]:
+            for rel in written.get(key, ()):
+                owners[rel] = key
+        return owners
+
+    def is_met(self, agent_key: str) -> bool:
+        with self._lock:
+            return self._met.get(agent_key, False)
+
+    def mark_final(self, agent_key: str, step) -> bool:
+        """
+        step_callback (mode ReAct): le ToolResult reçu avant le test de finalité devient
+        la réponse finale si le contrat de l'agent est rempli
+        """
+        if hasattr(step, "result_as_answer") and self.is_met(agent_key):
+            step.result_as_answer = True
+            return True
+        return False
+
+    def record_task(self, agent_key: str, agent, max_iter: int):
+        """Fin de tâche: itérations consommées et économisées (sur max_iter) si arrêt anticipé"""
+        executor = getattr(agent, "agent_executor", None)
+        used = getattr(executor, "iterations", None)
+        met = self.is_met(agent_key)
+        report = {"contract_met": met, "iterations": used, "max_iter": max_iter, "iterations_saved": 0}
+        if met and used is not None:
+            report["iterations_saved"] = max(0, max_iter - used)
+            info(f"⏹️ {agent.role}: contrat rempli en {used} itération(s), "
+                 f"{report['iterations_saved']} économisée(s)", "completion")
+        self.tasks[agent_key] = report
+
+    def report(self) -> Dict:
+        return {"tasks": dict(self.tasks),
+                "iterations_saved": sum(t["iterations_saved"] for t in self.tasks.values())}
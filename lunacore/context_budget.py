@@ -0,0 +1,167 @@
+"""
+LunaCore Context Budget
+Sélection déterministe du contexte (plan.json, interfaces) sous un budget de tokens
+"""
+
+import ast
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from lunacore.run_files import iter_project_files
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Budget par défaut du contexte injecté (hors persona et consignes) pour Llama 3.1 8B
+DEFAULT_CONTEXT_TOKENS = 3000
+# Sections de plan.json toujours utiles, quel que soit le fichier
+GENERAL_SECTIONS = ("project", "name", "description", "stack", "template", "dependencies", "conventions")
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Nombre de tokens (tiktoken cl100k si disponible, sinon ~4 caractères par token)"""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _encoding = False
+        if _encoding:
+            return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _target_keys(target_file: str) -> List[str]:
+    """Termes identifiant un fichier: chemin, nom, module pointé, stem"""
+    path = target_file.replace("\\", "/")
+    stem = path.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    module = path.rsplit(".", 1)[0].replace("/", ".")
+    keys = [path, path.rsplit("/", 1)[-1], module]
+    if stem not in ("__init__", "main", "app"):
+        keys.append(stem)
+    return [k.lower() for k in keys if k]
+
+
+def summarize_section(value, depth: int = 0) -> object:
+    """Résumé structurel d'une section: clés et noms conservés, textes longs coupés"""
+    if isinstance(value, dict):
+        if depth >= 2:
+            return sorted(str(k) for k in value)
+        return {k: summarize_section(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, list):
+        if depth >= 2:
+            return f"[{len(value)} éléments]"
+        return [summarize_section(v, depth + 1) for v in value[:20]]
+    if isinstance(value, str) and len(value) > 120:
+        return value[:117] + "..."
+    return value
+
+
+def extract_interface(source: str) -> str:
+    """Signatures publiques (classes, fonctions, constantes) d'un module Python"""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return ""
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_"):
+            prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+            returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+            lines.append(f"{prefix} {node.name}({ast.unparse(node.args)}){returns}: ...")
+        elif isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+            bases = f"({', '.join(ast.unparse(b) for b in node.bases)})" if node.bases else ""
+            lines.append(f"class {node.name}{bases}:")
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and (
+                        not item.name.startswith("_") or item.name == "__init__"):
+                    returns = f" -> {ast.unparse(item.returns)}" if item.returns else ""
+                    lines.append(f"    def {item.name}({ast.unparse(item.args)}){returns}: ...")
+                elif isinstance(item, ast.AnnAssign) and isinstance(item.target, ast.Name):
+                    lines.append(f"    {item.target.id}: {ast.unparse(item.annotation)}")
+        elif isinstance(node, ast.Assign) and all(
+                isinstance(t, ast.Name) and t.id.isupper() for t in node.targets):
+            lines.append(ast.unparse(node).split("\n")[0][:120])
+    return "\n".join(lines)
+
+
+class ContextBudget:
+    """
+    Construit le contexte d'un appel développeur/testeur sous un budget de tokens
+
+    Ordre de priorité déterministe: sections du plan qui citent le fichier cible, sections
+    générales, interfaces déjà écrites, puis le reste du plan. Une pièce qui dépasse est
+    d'abord résumée, puis abandonnée.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_CONTEXT_TOKENS):
+        self.max_tokens = max_tokens
+
+    def _plan_pieces(self, plan, target_file: Optional[str]) -> List[Tuple[int, int, str, object]]:
+        sections = plan.items() if isinstance(plan, dict) else [("plan", plan)]
+        keys = _target_keys(target_file) if target_file else []
+        pieces = []
+        for order, (name, value) in enumerate(sections):
+            text = json.dumps(value, ensure_ascii=False).lower()
+            if keys and any(k in text for k in keys):
+                rank = 0
+            elif str(name).lower() in GENERAL_SECTIONS:
+                rank = 1
+            else:
+                rank = 3
+            pieces.append((rank, order, f"plan.json › {name}", value))
+        return pieces
+
+    def _interface_pieces(self, run_dir: Optional[Path], target_file: Optional[str]) -> List[Tuple[int, int, str, object]]:
+        if run_dir is None:
+            return []
+        run_dir = Path(run_dir)
+        pieces = []
+        for order, path in enumerate(iter_project_files(run_dir)):
+            rel = path.relative_to(run_dir).as_posix()
+            if path.suffix != ".py" or rel == target_file:
+                continue
+            interface = extract_interface(path.read_text(encoding="utf-8", errors="replace"))
+            if interface:
+                pieces.append((2, order, f"interface › {rel}", interface))
+        return pieces
+
+    def build(self, plan, target_file: Optional[str] = None, run_dir: Optional[Path] = None) -> Dict:
+        """
+        Assemble le contexte pour un fichier cible
+
+        Returns:
+            {"text", "tokens", "included", "summarized", "dropped"}
+        """
+        pieces = sorted(self._plan_pieces(plan, target_file) + self._interface_pieces(run_dir, target_file),
+                        key=lambda p: (p[0], p[1]))
+        used = 0
+        blocks = []
+        report = {"included": [], "summarized": [], "dropped": []}
+        for _, _, label, value in pieces:
+            full = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, indent=1)
+            block = f"### {label}\n{full}"
+            cost = count_tokens(block)
+            if used + cost <= self.max_tokens:
+                blocks.append(block)
+                used += cost
+                report["included"].append(label)
+                continue
+            if not isinstance(value, str):
+                block = f"### {label} (résumé)\n{json.dumps(summarize_section(value), ensure_ascii=False)}"
+                cost = count_tokens(block)
+                if used + cost <= self.max_tokens:
+                    blocks.append(block)
+                    used += cost
+                    report["summarized"].append(label)
+                    continue
+            report["dropped"].append(label)
+        report["text"] = "\n\n".join(blocks)
+        report["tokens"] = used
+        return report
@@ -0,0 +1,430 @@
+"""
+LunaCore Crew Memory
+Mémoire de crew configurable par run (off, éphémère, persistante bornée) avec embeddings locaux
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from lunacore.logger import info
+
+MEMORY_MODES = ("off", "ephemeral", "persistent")
+DEFAULT_MEMORY_MODE = "ephemeral"
+CREW_MEMORY_FILE = Path("sandbox/.cache/crew_memory.sqlite3")
+DEFAULT_MAX_RECORDS = 2000
+EMBEDDING_DIM = 384
+# Analyse locale des souvenirs: faits extraits d'une sortie de tâche, sans appel LLM
+MAX_EXTRACTED_MEMORIES = 8
+MIN_MEMORY_CHARS = 20
+MAX_MEMORY_CHARS = 400
+DEFAULT_IMPORTANCE = 0.5
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _timestamp(moment: datetime) -> float:
+    """Horodatage d'un datetime; naïf = UTC (convention des MemoryRecord CrewAI)"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class HashedNgramEmbedder:
+    """
+    Embeddings locaux par hachage (mots + trigrammes de caractères), sans appel réseau
+
+    Remplace le fournisseur d'embeddings externe de CrewAI: déterministe, L2-normalisé,
+    suffisant pour retrouver des sorties de tâches qui partagent noms de fichiers et termes.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        features = []
+        for word in _WORD_RE.findall(text.lower()):
+            features.append(("w:" + word, 1.0))
+            padded = f"#{word}#"
+            for i in range(max(1, len(padded) - self.ngram + 1)):
+                features.append(("c:" + padded[i:i + self.ngram], 0.5))
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        features = self._features(text)
+        if not features:
+            return vector
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f, _ in features), dtype=np.uint64, count=len(features))
+        weights = np.fromiter((w for _, w in features), dtype=np.float32, count=len(features))
+        # Bit de poids fort du hash = signe: les collisions se compensent en moyenne
+        signs = np.where((hashes >> np.uint64(31)) & np.uint64(1), -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, (hashes % np.uint64(self.dim)).astype(np.int64), signs * weights)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __call__(self, texts: List[str]) -> List[np.ndarray]:
+        return [self.embed(t) for t in texts]
+
+
+def _scope_matches(scope: str, scope_prefix: Optional[str]) -> bool:
+    if scope_prefix is None or not scope_prefix.strip("/"):
+        return True
+    return scope.startswith(scope_prefix.rstrip("/"))
+
+
+class BoundedMemoryStore:
+    """
+    Stockage de mémoire CrewAI borné, avec éviction LRU sur le dernier accès
+
+    Sans chemin, le store est éphémère (en mémoire du processus). Avec un chemin, chaque
+    écriture est aussi persistée dans SQLite et le store est rechargé au démarrage.
+    Implémente le protocole StorageBackend de crewai.memory.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_records: int = DEFAULT_MAX_RECORDS):
+        self.path = Path(path) if path else None
+        self.max_records = max_records
+        self.evicted = 0
+        self._lock = threading.RLock()
+        # Ordre LRU: le moins récemment utilisé en tête
+        self._records: "OrderedDict[str, Any]" = OrderedDict()
+        self._conn = None
+        if self.path:
+            self._open()
+
+    def _open(self):
+        from crewai.memory.types import MemoryRecord
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS memories (id TEXT PRIMARY KEY, last_accessed REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_accessed ON memories(last_accessed)")
+        for record_id, data in self._conn.execute("SELECT id, data FROM memories ORDER BY last_accessed"):
+            try:
+                self._records[record_id] = MemoryRecord.model_validate_json(data)
+            except ValueError:
+                continue
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    # --- écriture -----------------------------------------------------------------
+
+    def _persist(self, records: List[Any]):
+        if self._conn is None or not records:
+            return
+        rows = [(r.id, _timestamp(r.last_accessed), r.model_dump_json()) for r in records]
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO memories (id, last_accessed, data) VALUES (?, ?, ?)", rows)
+
+    def _forget(self, record_ids: List[str]):
+        for record_id in record_ids:
+            self._records.pop(record_id, None)
+        if self._conn is not None and record_ids:
+            with self._conn:
+                self._conn.executemany("DELETE FROM memories WHERE id = ?", [(i,) for i in record_ids])
+
+    def _evict(self):
+        overflow = len(self._records) - self.max_records
+        if overflow > 0:
+            self._forget(list(self._records)[:overflow])
+            self.evicted += overflow
+            info(f"🧠 Mémoire: {overflow} souvenir(s) évincé(s) (LRU, plafond {self.max_records})", "memory")
+
+    def save(self, records: List[Any]) -> None:
+        with self._lock:
+            for record in records:
+                self._records[record.id] = record
+                self._records.move_to_end(record.id)
+            self._persist(records)
+            self._evict()
+
+    def update(self, record: Any) -> None:
+        self.save([record])
+
+    def touch_records(self, record_ids: List[str]) -> None:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            touched = []
+            for record_id in record_ids:
+                record = self._records.get(record_id)
+                if record is not None:
+                    record.last_accessed = now
+                    self._records.move_to_end(record_id)
+                    touched.append(record)
+            if self._conn is not None and touched:
+                with self._conn:
+                    self._conn.executemany("UPDATE memories SET last_accessed = ? WHERE id = ?",
+                                           [(now.timestamp(), r.id) for r in touched])
+
+    def delete(self, scope_prefix: Optional[str] = None, categories: Optional[List[str]] = None,
+               record_ids: Optional[List[str]] = None, older_than: Optional[datetime] = None,
+               metadata_filter: Optional[Dict[str, Any]] = None) -> int:
+        with self._lock:
+            doomed = [
+                r.id for r in self._filter(scope_prefix, categories, metadata_filter)
+                if (record_ids is None or r.id in record_ids)
+                and (older_than is None or r.created_at < older_than)
+            ]
+            self._forget(doomed)
+            return len(doomed)
+
+    def reset(self, scope_prefix: Optional[str] = None) -> None:
+        self.delete(scope_prefix=scope_prefix)
+
+    # --- lecture ------------------------------------------------------------------
+
+    def _filter(self, scope_prefix: Optional[str] = None, categories: Optional[List[str]] = None,
+                metadata_filter: Optional[Dict[str, Any]] = None) -> List[Any]:
+        return [
+            r for r in self._records.values()
+            if _scope_matches(r.scope, scope_prefix)
+            and (not categories or any(c in r.categories for c in categories))
+            and (not metadata_filter or all(r.metadata.get(k) == v for k, v in metadata_filter.items()))
+        ]
+
+    def search(self, query_embedding: List[float], scope_prefix: Optional[str] = None,
+               categories: Optional[List[str]] = None, metadata_filter: Optional[Dict[str, Any]] = None,
+               limit: int = 10, min_score: float = 0.0) -> List[Tuple[Any, float]]:
+        """Similarité cosinus (bornée à [0, 1]) sur les souvenirs filtrés"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        with self._lock:
+            candidates = [r for r in self._filter(scope_prefix, categories, metadata_filter)
+                          if r.embedding and len(r.embedding) == len(query)]
+        if not candidates or not query.any():
+            return []
+        matrix = np.asarray([r.embedding for r in candidates], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        scores = np.clip(matrix @ query / np.where(norms == 0, 1, norms), 0.0, 1.0)
+        order = np.argsort(-scores)[:limit]
+        return [(candidates[i], float(scores[i])) for i in order if scores[i] >= min_score]
+
+    def get_record(self, record_id: str) -> Optional[Any]:
+        with self._lock:
+            return self._records.get(record_id)
+
+    def list_records(self, scope_prefix: Optional[str] = None, limit: int = 200, offset: int = 0) -> List[Any]:
+        with self._lock:
+            records = sorted(self._filter(scope_prefix), key=lambda r: r.created_at, reverse=True)
+        return records[offset:offset + limit]
+
+    def get_scope_info(self, scope: str):
+        from crewai.memory.types import ScopeInfo
+
+        scope = scope.rstrip("/") or "/"
+        with self._lock:
+            records = self._filter(scope)
+        child_prefix = (scope if scope != "/" else "") + "/"
+        children = {
+            child_prefix + r.scope[len(child_prefix):].split("/", 1)[0]
+            for r in records
+            if r.scope.startswith(child_prefix) and r.scope[len(child_prefix):]
+        }
+        dates = [r.created_at for r in records]
+        return ScopeInfo(
+            path=scope,
+            record_count=len(records),
+            categories=sorted({c for r in records for c in r.categories}),
+            oldest_record=min(dates) if dates else None,
+            newest_record=max(dates) if dates else None,
+            child_scopes=sorted(children),
+        )
+
+    def list_scopes(self, parent: str = "/") -> List[str]:
+        return self.get_scope_info(parent).child_scopes
+
+    def list_categories(self, scope_prefix: Optional[str] = None) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for record in self._filter(scope_prefix):
+                for category in record.categories:
+                    counts[category] = counts.get(category, 0) + 1
+        return counts
+
+    def count(self, scope_prefix: Optional[str] = None) -> int:
+        with self._lock:
+            return len(self._filter(scope_prefix))
+
+    def close(self):
+        """Libère un store éphémère; le store persistant reste ouvert pour le processus"""
+        if self.path is None:
+            with self._lock:
+                self._records.clear()
+
+    # --- variantes asynchrones du protocole (les opérations sont locales et rapides) ---
+
+    async def asave(self, records: List[Any]) -> None:
+        self.save(records)
+
+    async def asearch(self, query_embedding: List[float], scope_prefix: Optional[str] = None,
+                      categories: Optional[List[str]] = None, metadata_filter: Optional[Dict[str, Any]] = None,
+                      limit: int = 10, min_score: float = 0.0) -> List[Tuple[Any, float]]:
+        return self.search(query_embedding, scope_prefix, categories, metadata_filter, limit, min_score)
+
+    async def adelete(self, scope_prefix: Optional[str] = None, categories: Optional[List[str]] = None,
+                      record_ids: Optional[List[str]] = None, older_than: Optional[datetime] = None,
+                      metadata_filter: Optional[Dict[str, Any]] = None) -> int:
+        return self.delete(scope_prefix, categories, record_ids, older_than, metadata_filter)
+
+
+def memory_mode_from_env() -> str:
+    """Mode par défaut (LUNACORE_MEMORY_MODE), éphémère si absent"""
+    return (os.getenv("LUNACORE_MEMORY_MODE") or DEFAULT_MEMORY_MODE).strip().lower()
+
+
+_persistent_store: Optional[BoundedMemoryStore] = None
+_persistent_store_lock = threading.Lock()
+
+
+def get_persistent_store() -> BoundedMemoryStore:
+    """Retourne le store persistant partagé (plafond LUNACORE_MEMORY_MAX_RECORDS)"""
+    global _persistent_store
+    with _persistent_store_lock:
+        if _persistent_store is None:
+            max_records = int(os.getenv("LUNACORE_MEMORY_MAX_RECORDS") or DEFAULT_MAX_RECORDS)
+            _persistent_store = BoundedMemoryStore(CREW_MEMORY_FILE, max_records=max_records)
+            info(f"Mémoire persistante: {len(_persistent_store)} souvenir(s)", "memory")
+        return _persistent_store
+
+
+def extract_local_memories(content: str, limit: int = MAX_EXTRACTED_MEMORIES) -> List[str]:
+    """
+    Faits à retenir d'une sortie de tâche, sans LLM
+
+    Seul le résultat est analysé (la description de la tâche est déjà dans le prompt):
+    lignes significatives, débarrassées des puces, tronquées et dédupliquées.
+    """
+    _, marker, result = content.rpartition("Result:")
+    facts, seen = [], set()
+    for line in (result if marker else content).splitlines():
+        text = line.strip(" \t-*#>`")
+        if len(text) < MIN_MEMORY_CHARS:
+            continue
+        text = text[:MAX_MEMORY_CHARS]
+        if text.lower() in seen:
+            continue
+        seen.add(text.lower())
+        facts.append(text)
+        if len(facts) >= limit:
+            break
+    return facts
+
+
+@lru_cache(maxsize=None)
+def _local_memory_class():
+    """Sous-classe de crewai Memory sans analyse LLM (import de crewai différé)"""
+    from crewai.memory.types import embed_text
+    from crewai.memory.unified_memory import Memory
+
+    class LocalMemory(Memory):
+        """
+        Mémoire analysée localement: extraction heuristique, scope/catégorie/importance
+        par défaut, rappel par recherche vectorielle seule. Un souvenir déjà stocké
+        (similarité >= consolidation_threshold) est ignoré au lieu d'être consolidé:
+        EncodingFlow n'a ainsi jamais besoin d'un LLM.
+        """
+
+        @property
+        def _llm(self):
+            # Aucun LLM d'analyse (pas même le modèle par défaut de CrewAI, ni sa clé d'API)
+            return None
+
+        def _encode_batch(self, contents, scope=None, categories=None, metadata=None, importance=None,
+                          source=None, private=False, root_scope=None):
+            # Exécuté dans le pool de sauvegarde sérialisé: les lots précédents sont déjà stockés
+            novel = []
+            for content in contents:
+                hits = self._storage.search(embed_text(self._embedder, content), limit=1)
+                if not hits or hits[0][1] < self.consolidation_threshold - 1e-6:
+                    novel.append(content)
+            if not novel:
+                return []
+            return super()._encode_batch(novel, scope=scope, categories=categories, metadata=metadata,
+                                         importance=importance, source=source, private=private,
+                                         root_scope=root_scope)
+
+        def extract_memories(self, content: str) -> List[str]:
+            return extract_local_memories(content)
+
+        def _defaults(self, scope, categories, importance, agent_role) -> Dict[str, Any]:
+            return {"scope": scope if scope is not None else "/",
+                    "categories": categories if categories is not None else [agent_role or "crew"],
+                    "importance": importance if importance is not None else DEFAULT_IMPORTANCE}
+
+        def remember(self, content, scope=None, categories=None, metadata=None, importance=None,
+                     source=None, private=False, agent_role=None, root_scope=None):
+            return super().remember(content, metadata=metadata, source=source, private=private,
+                                    agent_role=agent_role, root_scope=root_scope,
+                                    **self._defaults(scope, categories, importance, agent_role))
+
+        def remember_many(self, contents, scope=None, categories=None, metadata=None, importance=None,
+                          source=None, private=False, agent_role=None, root_scope=None):
+            return super().remember_many(contents, metadata=metadata, source=source, private=private,
+                                         agent_role=agent_role, root_scope=root_scope,
+                                         **self._defaults(scope, categories, importance, agent_role))
+
+        def recall(self, query, scope=None, categories=None, limit=10, depth="shallow", source=None,
+                   include_private=False):
+            # Le mode deep (RecallFlow) interroge le LLM: toujours shallow
+            return super().recall(query, scope=scope, categories=categories, limit=limit, depth="shallow",
+                                  source=source, include_private=include_private)
+
+    return LocalMemory
+
+
+def build_crew_memory(mode: str, llm=None, store: Optional[BoundedMemoryStore] = None,
+                      root_scope: str = "/crew/lunacore", **memory_kwargs):
+    """
+    Construit la mémoire d'un crew pour un run
+
+    Sans llm, les souvenirs sont analysés localement (extraction heuristique, rappel
+    vectoriel): ni la sauvegarde après chaque tâche ni le rappel n'appellent de LLM.
+
+    Args:
+        mode: off, ephemeral ou persistent
+        llm: LLM d'analyse des souvenirs (analyse CrewAI complète, un appel par sauvegarde)
+        store: Store à utiliser à la place du store du mode (benchmarks, tests)
+        memory_kwargs: Réglages supplémentaires de crewai Memory (seuils, poids)
+
+    Returns:
+        Instance crewai Memory, ou None pour le mode off
+    """
+    if mode not in MEMORY_MODES:
+        raise ValueError(f"Mode mémoire inconnu: {mode} (attendu: {', '.join(MEMORY_MODES)})")
+    if mode == "off":
+        return None
+
+    if store is None:
+        store = get_persistent_store() if mode == "persistent" else BoundedMemoryStore()
+    kwargs = dict(memory_kwargs, storage=store, embedder=HashedNgramEmbedder(), root_scope=root_scope)
+    if llm is not None:
+        from crewai.memory.unified_memory import Memory
+
+        return Memory(llm=llm, **kwargs)
+    # Au-delà de ce seuil, un souvenir est un doublon ignoré (pas de consolidation par LLM)
+    kwargs.setdefault("consolidation_threshold", 1.0)
+    return _local_memory_class()(**kwargs)
+
+
+def memory_report(mode: str, memory) -> Dict:
+    """Résumé du store d'un run (mode, souvenirs, évictions)"""
+    store = getattr(memory, "_storage", None) if memory is not None else None
+    if not isinstance(store, BoundedMemoryStore):
+        return {"mode": mode}
+    return {"mode": mode, "records": len(store), "max_records": store.max_records, "evicted": store.evicted}
@@ -6,9 +6,11 @@ Multi-agent code generation with CrewAI framework
 import os
 import re
 import ast
+import json
 import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from dotenv import load_dotenv
 
 # Import du module de journalisation amélioré
@@ -25,7 +27,26 @@ from crewai import Agent, Task, Crew, Process, LLM
 from crewai.tools import tool
 
 # Import des tools runtime
-from lunacore.tools_runtime import make_write_file_tool, validate_python_syntax
+from lunacore.tools_runtime import validate_python_syntax
+from lunacore.run_files import iter_project_files
+from lunacore.validation import validate_run_dir
+from lunacore.file_index import build_file_index
+from lunacore.verification import get_verification_pool
+from lunacore.speculative import SpeculativeDeveloper
+from lunacore.context_budget import ContextBudget
+from lunacore.brief_index import get_brief_index, REUSE_THRESHOLD, REVISE_THRESHOLD
+from lunacore.scaffolds import materialize_scaffold, scaffold_note
+from lunacore.run_catalog import get_run_catalog, run_entry
+from lunacore.retention import mark_run_active, clear_run_active, start_retention_from_env
+from lunacore.crew_memory import build_crew_memory, memory_mode_from_env, memory_report
+from lunacore.completion import CompletionGuard
+from lunacore.run_budget import USAGE_KEYS, BudgetConfig, BudgetExceeded, RunBudget, budget_for_template
+from lunacore.ollama_warmup import get_ollama_warmup
+from lunacore.hedging import HedgedLLM, HedgePolicy
+from lunacore.repair import RepairStage, failing_files, repair_rounds_from_env
+from lunacore.cassette import Cassette, cassette_from_env, cassette_mode_from_env
+from lunacore.run_metrics import ResourceSampler, metrics_interval_from_env
+from lunacore.run_manifest import write_manifest
 
 # OpenAI client pour fallback
 try:
@@ -36,6 +57,46 @@ except ImportError:
 # Load environment variables
 load_dotenv()
 
+
+@dataclass(frozen=True)
+class AgentTemplate:
+    """Définition immuable d'un agent, instanciée à chaque run (tools, LLM et callbacks du run)"""
+
+    role: str
+    goal: str
+    backstory: str
+    llm: str  # "openai" (planification) ou "llama" (implémentation)
+    max_iter: int
+
+
+AGENT_TEMPLATES: Dict[str, AgentTemplate] = {
+    # SUPERVISEUR - Architecte et Planificateur
+    "supervisor": AgentTemplate(
+        role="Superviseur",
+        goal="Élaborer un plan exécutable, figer les interfaces, découper le travail.",
+        backstory="Architecte senior, rigoureux, privilégie robustesse et lisibilité.",
+        llm="openai",
+        max_iter=3,
+    ),
+    # DÉVELOPPEUR - Code et implémentation
+    "developer": AgentTemplate(
+        role="Développeur",
+        goal="Implémenter tout le code selon plan.json sans dévier du contrat.",
+        backstory="Ingénieur fullstack, TDD, docstrings, type hints, code clair.",
+        llm="llama",
+        max_iter=4,
+    ),
+    # TESTEUR - Tests et qualité
+    "tester": AgentTemplate(
+        role="Testeur",
+        goal="Générer tests Pytest, smoke tests, README d'exécution.",
+        backstory="Test d'abord, coverage et cas limites.",
+        llm="llama",
+        max_iter=3,
+    ),
+}
+
+
 class LunaCrewSystem:
     """
     Système multi-agents avec CrewAI pour génération de projets complets
@@ -56,12 +117,21 @@ class LunaCrewSystem:
         # Initialiser les LLMs
         self._init_llms()
         
-        # Variable pour stocker le dossier du projet courant
+        # Dernier run démarré (information seulement: chaque run a ses propres agents et tools)
         self.current_project_folder = None
         
-        # Créer les agents (sans tools pour l'instant)
+        # Budget de contexte des prompts développeur/testeur
+        self.context_budget = ContextBudget()
+        
+        # Couverture des appels Llama par OpenAI (rôles opt-in via LUNACORE_HEDGE_ROLES)
+        self.hedge_policy = HedgePolicy.from_env()
+        
+        # Agents de référence (test des connexions, affichage); chaque run instancie les siens
         self.agents = self._create_agents()
         
+        # Rétention des runs en arrière-plan (si configurée via LUNACORE_RETENTION_*)
+        safe_execute(start_retention_from_env, get_run_catalog(), error_msg="démarrage de la rétention")
+        
         success(f"LunaCrewSystem initialisé avec {len(self.agents)} agents", "system")
     
     def _init_llms(self):
@@ -69,14 +139,18 @@ class LunaCrewSystem:
         try:
             # Initialiser OpenAI avec CrewAI LLM
             openai_key = os.getenv("OPENAI_API_KEY")
-            if not openai_key or openai_key == "your_openai_api_key_here":
+            replaying = cassette_mode_from_env() == "replay"
+            if replaying:
+                # Rejeu d'une cassette: aucun appel réseau, la clé n'est pas nécessaire
+                openai_key = openai_key or "cassette-replay"
+            elif not openai_key or openai_key == "your_openai_api_key_here":
                 raise ValueError("OPENAI_API_KEY non configurée dans .env")
             
-            self.openai = LLM(model="openai/gpt-4o-mini")
+            self.openai = LLM(model="openai/gpt-4o-mini", api_key=openai_key)
             print(f"✅ OpenAI gpt-4o-mini connecté (CrewAI LLM)")
             
             # Initialiser client OpenAI direct pour fallback tools
-            if OpenAI:
+            if OpenAI and not replaying:
                 self.openai_client = OpenAI(api_key=openai_key)
             else:
                 self.openai_client = None
@@ -93,55 +167,81 @@ class LunaCrewSystem:
                 self.llama_available = True
                 print(f"✅ Ollama llama3.1:8b connecté (CrewAI LLM)")
                 
+                # Préchargement en arrière-plan: le premier appel du développeur ne paie pas le chargement
+                self.warmup = None if replaying else safe_execute(
+                    get_ollama_warmup, ollama_base_url, self.llama_model, error_msg="préchargement Ollama")
+                
             except Exception as e:
                 print(f"⚠️ Ollama non disponible: {e}")
                 self.llama = self.openai  # Fallback vers OpenAI
                 self.llama_available = False
+                self.warmup = None
                 print("🔄 Utilisation d'OpenAI comme fallback pour le développement")
                 
         except Exception as e:
             print(f"❌ Erreur d'initialisation LLM: {e}")
             raise
-    def _create_agents(self) -> Dict[str, Agent]:
-        """Crée les 3 agents essentiels selon les spécifications LunaCore refactorisées"""
-        agents = {}
-        
-        # SUPERVISEUR - Architecte et Planificateur
-        agents['supervisor'] = Agent(
-            role="Superviseur",
-            goal="Élaborer un plan exécutable, figer les interfaces, découper le travail.",
-            backstory="Architecte senior, rigoureux, privilégie robustesse et lisibilité.",
-            llm=self.openai,  # Assignation directe OpenAI pour superviseur
-            tools=[],  # Tools seront assignés dans generate_project
-            allow_delegation=False,
-            verbose=True,
-            max_iter=3,
-        )
-        
-        # DÉVELOPPEUR - Code et implémentation 
-        agents['developer'] = Agent(
-            role="Développeur",
-            goal="Implémenter tout le code selon plan.json sans dévier du contrat.",
-            backstory="Ingénieur fullstack, TDD, docstrings, type hints, code clair.",
-            llm=self.llama,  # Assignation directe Llama pour développeur
-            tools=[],  # Tools seront assignés dans generate_project
-            allow_delegation=False,
-            verbose=True,
-            max_iter=4,
-        )
+    def _bind_llm(self, kind: str) -> LLM:
+        """
+        Copie du LLM (openai ou llama) propre à un agent d'un run
         
-        # TESTEUR - Tests et qualité
-        agents['tester'] = Agent(
-            role="Testeur",
-            goal="Générer tests Pytest, smoke tests, README d'exécution.",
-            backstory="Test d'abord, coverage et cas limites.",
-            llm=self.llama,  # Assignation directe Llama pour testeur
-            tools=[],  # Tools seront assignés dans generate_project
-            allow_delegation=False,
-            verbose=True,
-            max_iter=3,
-        )
+        Le client HTTP est partagé, mais pas les compteurs de tokens: l'usage d'un run
+        ne cumule plus celui des runs précédents (ni des agents partageant un modèle).
+        """
+        llm = (self.openai if kind == "openai" else self.llama).model_copy()
+        llm._token_usage = dict.fromkeys(llm._token_usage, 0)
+        return llm
+    
+    def _create_agents(self, tools: Optional[List] = None,
+                       on_event: Optional[Callable[[Dict], None]] = None,
+                       budget: Optional[RunBudget] = None,
+                       completion: Optional[CompletionGuard] = None,
+                       cassette: Optional[Cassette] = None) -> Dict[str, Agent]:
+        """
+        Instancie les 3 agents essentiels depuis AGENT_TEMPLATES
         
+        Args:
+            tools: Tools communs du run; aucun pour les agents de référence
+            on_event: Callback de progression branché sur les étapes des agents
+            budget: Budget du run: suit les LLM des agents et se vérifie à chaque étape
+            completion: Contrats de tâche: chaque agent reçoit son write_file (lié au run_dir)
+                et s'arrête dès que le contrat de sa tâche est rempli
+            cassette: Enregistre les appels LLM des agents, ou les rejoue sans réseau
+        """
+        agents = {}
+        for key, template in AGENT_TEMPLATES.items():
+            llm = self._bind_llm(template.llm)
+            tracked = [llm]
+            if template.llm == "llama" and self.llama_available and key in self.hedge_policy.roles:
+                backup = self._bind_llm("openai")
+                tracked.append(backup)
+                llm = HedgedLLM.wrap(llm, backup, self.hedge_policy, template.role)
+            if cassette is not None:
+                llm = cassette.wrap(key, llm)
+                if cassette.replaying:
+                    tracked = [llm]  # tokens servis par la cassette
+            for tracked_llm in tracked if budget is not None else []:
+                budget.track(key, tracked_llm)
+            agent_tools = list(tools or [])
+            if completion is not None:
+                agent_tools.insert(0, completion.write_tool(key))
+            agents[key] = Agent(
+                role=template.role,
+                goal=template.goal,
+                backstory=template.backstory,
+                llm=llm,
+                tools=agent_tools,
+                allow_delegation=False,
+                verbose=True,
+                max_iter=template.max_iter,
+            )
+            if on_event is not None or budget is not None or completion is not None:
+                agents[key].step_callback = self._make_step_callback(
+                    template.role, on_event,
+                    check=(lambda key=key: budget.check(key)) if budget is not None else None,
+                    on_tool_result=(lambda step, key=key: completion.mark_final(key, step))
+                    if completion is not None else None,
+                )
         return agents
     
     def test_agents(self) -> Dict:
@@ -154,6 +254,7 @@ class LunaCrewSystem:
             'llm_backend': {
                 'model': os.getenv("LUNACORE_PLANNER_MODEL", "gpt-4o-mini"),
                 'ollama_available': self.llama_available,
+                'ollama_model': self.warmup.status() if self.warmup else None,
             },
         }
         test_prompt = "Réponds simplement: OK."
@@ -179,13 +280,190 @@ class LunaCrewSystem:
             results['status'] = 'partial'
         return results
     
-    def generate_project(self, brief: str, template: str = "fastapi") -> Dict:
+    @staticmethod
+    def _create_run_dir(project_name: str) -> Path:
+        """Crée un dossier de run unique (seconde suivante si le nom est déjà pris)"""
+        root = Path("sandbox/crew_output")
+        root.mkdir(parents=True, exist_ok=True)
+        moment = time.time()
+        while True:
+            run_dir = root / f"{project_name}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(moment))}"
+            try:
+                run_dir.mkdir()
+                return run_dir
+            except FileExistsError:
+                moment += 1
+    
+    def _make_developer_llm(self, temperature: float) -> LLM:
+        """Crée un LLM développeur dédié à une température (mode spéculatif)"""
+        if self.llama_available:
+            return LLM(
+                model=f"ollama/{self.llama_model}",
+                base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+                temperature=temperature,
+            )
+        return LLM(model=f"openai/{self.openai_model}", temperature=temperature)
+    
+    def _speculative_llm(self, temperature: float, cassette: Optional[Cassette] = None):
+        """LLM d'un candidat spéculatif, enregistré ou rejoué sur son propre canal de cassette"""
+        if cassette is None:
+            return self._make_developer_llm(temperature)
+        return cassette.wrap(f"developer@{temperature}",
+                             None if cassette.replaying else self._make_developer_llm(temperature))
+    
+    def _make_crew(self, tasks: List[Task], memory=None) -> Crew:
+        """Crée un crew séquentiel pour les tâches données (memory: Memory du run ou None)"""
+        agents = []
+        for task in tasks:
+            if task.agent not in agents:
+                agents.append(task.agent)
+        return Crew(
+            agents=agents,
+            tasks=tasks,
+            process=Process.sequential,
+            verbose=True,
+            memory=memory if memory is not None else False
+        )
+    
+    def _inject_plan_context(self, task: Task, base_description: str, run_dir: Path,
+                             focus: Optional[str] = None) -> Dict:
+        """Réécrit la description d'une tâche avec un extrait budgété de plan.json"""
+        plan_path = Path(run_dir) / "plan.json"
+        try:
+            plan = json.loads(plan_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            warning(f"Contexte budgété indisponible ({e}), plan.json à relire via les outils", "context")
+            return {"status": "no_plan"}
+        context = self.context_budget.build(plan, focus, run_dir)
+        task.description = f"{base_description}\n\nContexte utile (extraits de plan.json et interfaces):\n{context['text']}"
+        info(f"📐 Contexte {task.agent.role}: {context['tokens']} tokens, "
+             f"{len(context['summarized'])} résumé(s), {len(context['dropped'])} écarté(s)", "context")
+        return {key: context[key] for key in ("tokens", "included", "summarized", "dropped")}
+    
+    def _attach_context_budget(self, tasks: List[Task], run_dir: Path, report: Dict):
+        """Branche l'injection de contexte budgété après le plan puis après le développement"""
+        _, developer_task, tester_task = tasks
+        developer_base = developer_task.description
+        tester_base = tester_task.description
+        
+        def after_plan(_output):
+            report["developer"] = self._inject_plan_context(developer_task, developer_base, run_dir)
+        
+        def after_development(_output):
+            report["tester"] = self._inject_plan_context(tester_task, tester_base, run_dir, focus="tests")
+        
+        tasks[0].callback = after_plan
+        developer_task.callback = after_development
+    
+    def _attach_progress(self, tasks: List[Task], on_event: Optional[Callable[[Dict], None]]):
+        """
+        Branche les événements task_completed du run
+        
+        Les callbacks existants des tâches (contexte budgété) sont chaînés: le task_callback
+        du Crew ne s'appliquerait qu'aux tâches sans callback. Les étapes (step) sont branchées
+        à l'instanciation des agents du run (_create_agents).
+        """
+        for index, task in enumerate(tasks):
+            previous = task.callback
+            
+            def on_task_done(output, task=task, previous=previous, index=index):
+                if previous is not None:
+                    previous(output)
+                self._emit(on_event, "task_completed", agent=task.agent.role, index=index, total=len(tasks),
+                           summary=getattr(output, "summary", None))
+            
+            task.callback = on_task_done
+    
+    def _attach_completion(self, tasks: List[Task], agents: Dict[str, Agent], completion: CompletionGuard):
+        """Chaîne l'enregistrement du contrat (itérations économisées) à la fin de chaque tâche"""
+        keys = {id(agent): key for key, agent in agents.items()}
+        for task in tasks:
+            previous = task.callback
+            key = keys[id(task.agent)]
+            
+            def on_task_done(output, task=task, previous=previous, key=key):
+                if previous is not None:
+                    previous(output)
+                completion.record_task(key, task.agent, AGENT_TEMPLATES[key].max_iter)
+            
+            task.callback = on_task_done
+    
+    def _make_step_callback(self, role: str, on_event: Optional[Callable[[Dict], None]],
+                            check: Optional[Callable[[], None]] = None,
+                            on_tool_result: Optional[Callable] = None):
+        """
+        Étape d'agent CrewAI (AgentAction ou AgentFinish) -> événement step, puis contrôle
+        du budget (BudgetExceeded interrompt la boucle de l'agent sans retry)
+        
+        En mode ReAct, CrewAI passe aussi le ToolResult de chaque outil avant de décider
+        s'il est final: il est transmis à on_tool_result (contrat de tâche), sans événement.
+        """
+        def on_step(step):
+            if hasattr(step, "result_as_answer"):
+                if on_tool_result is not None:
+                    on_tool_result(step)
+                return
+            self._emit(on_event, "step", agent=role,
+                       kind="finish" if hasattr(step, "output") else "action",
+                       tool=getattr(step, "tool", None),
+                       thought=(getattr(step, "thought", "") or "")[:200])
+            if check is not None:
+                check()
+        return on_step
+    
+    def _apply_prior_plan(self, tasks: List[Task], brief: str, template: str, run_dir: Path) -> Dict:
+        """
+        Cherche un brief quasi identique déjà planifié et adapte la tâche du superviseur
+        
+        Au-dessus de REUSE_THRESHOLD le plan est recopié tel quel (pas d'appel superviseur);
+        au-dessus de REVISE_THRESHOLD le superviseur part du plan existant et le révise.
+        """
+        match = safe_execute(get_brief_index().lookup, brief, template, error_msg="recherche de brief similaire")
+        if not match or match[0] < REVISE_THRESHOLD:
+            return {"mode": "fresh"}
+        similarity, entry = match
+        report = {"similarity": round(similarity, 3), "source_run": entry.get("run_dir")}
+        prior_plan = json.dumps(entry["plan"], ensure_ascii=False, indent=2)
+        
+        if similarity >= REUSE_THRESHOLD:
+            (Path(run_dir) / "plan.json").write_text(prior_plan, encoding="utf-8")
+            info(f"♻️ Plan réutilisé (similarité {similarity:.2f})", "planning")
+            report["mode"] = "reuse"
+            return report
+        
+        tasks[0].description += (
+            "\n\nUn plan existe déjà pour un brief très proche:\n"
+            f"{prior_plan}\n\n"
+            "- Révise ce plan uniquement là où le brief diffère; conserve le reste à l'identique.\n"
+            "- Écris le plan.json révisé (pas de nouveau plan depuis zéro)."
+        )
+        info(f"♻️ Plan existant à réviser (similarité {similarity:.2f})", "planning")
+        report["mode"] = "revise"
+        return report
+    
+    def generate_project(self, brief: str, template: str = "fastapi", run_tests: bool = True,
+                         speculative_k: int = 0, memory_mode: Optional[str] = None,
+                         on_event: Optional[Callable[[Dict], None]] = None,
+                         budget: Optional[BudgetConfig] = None,
+                         repair_rounds: Optional[int] = None) -> Dict:
         """
         Génère un projet complet avec le crew multi-agents et tools runtime
         
         Args:
             brief: Description du projet à générer
             template: Type de template (fastapi, streamlit, cli, etc.)
+            run_tests: Exécuter la suite pytest générée dans des sous-processus isolés
+            speculative_k: Si > 0, le développeur génère chaque fichier du plan avec
+                K candidats concurrents (premier valide retenu) au lieu de la tâche CrewAI
+            memory_mode: Mémoire du crew: off, ephemeral (en processus, libérée après le run)
+                ou persistent (store local borné, LRU); LUNACORE_MEMORY_MODE par défaut
+            on_event: Appelé avec un dict {event, time, ...} à chaque étape (started, stage,
+                task_completed, finished); ses erreurs n'interrompent jamais la génération
+            budget: Plafonds de tokens, coût et temps (run et agents); par défaut ceux du
+                template (TEMPLATE_BUDGETS). Au dépassement le run s'arrête avec le statut
+                "budget_exceeded" et les fichiers déjà écrits sont conservés et validés
+            repair_rounds: Passes de réparation ciblée des fichiers en échec (validation, tests);
+                LUNACORE_REPAIR_ROUNDS par défaut, 0 désactive
         
         Returns:
             Dictionnaire avec les résultats de génération
@@ -194,105 +472,313 @@ class LunaCrewSystem:
         info(f"📋 Template: {template}", "generation")
         
         start_time = time.time()
+        project_name = self._extract_project_name(brief)
+        run_dir = None
+        token_usage = {}
+        memory_mode = memory_mode or memory_mode_from_env()
+        crew_memory = None
+        cassette = None
+        run_budget = RunBudget(budget or budget_for_template(template))
+        budget_stop = None
+        # Ressources du processus pendant le run (LUNACORE_METRICS_INTERVAL, 0 désactive)
+        sampler = ResourceSampler(metrics_interval_from_env())
+        if sampler.available:
+            on_event = sampler.observe(on_event)
+            sampler.start()
+        if self.warmup is not None:
+            self.warmup.acquire()  # keep-alive du modèle Llama tant que le run tourne
         
         try:
             # Créer le répertoire de travail pour cette exécution
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            project_name = self._extract_project_name(brief)
-            run_dir = Path("sandbox/crew_output") / f"{project_name}_{timestamp}"
-            run_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Stocker le répertoire de travail actuel
+            run_dir = self._create_run_dir(project_name)
+            mark_run_active(run_dir)  # protège le run de la rétention pendant l'écriture
             self.current_project_folder = run_dir
+            self._emit(on_event, "started", run_id=run_dir.name, output_directory=str(run_dir))
             
-            # LLM déjà assignés directement dans _create_agents (pas de routeur)
+            # Squelette du template posé avant le crew: les agents n'écrivent que la logique du projet
+            scaffold_files = materialize_scaffold(template, run_dir, project_name)
+            completion = CompletionGuard(run_dir, scaffold_files)
+            # Cassette (LUNACORE_CASSETTE): enregistrement des appels LLM, ou rejeu hors ligne
+            cassette = cassette_from_env(run_dir, header={"brief": brief, "template": template})
+            # Agents propres au run: tools liés au run_dir, LLM et callbacks du run. Rien
+            # de partagé n'est modifié, les runs concurrents sur une instance sont isolés
+            agents = self._create_agents(tools=[validate_python_syntax], on_event=on_event,
+                                         budget=run_budget, completion=completion, cassette=cassette)
             info(f"🤖 LLM Assignés:", "llm")
-            info(f"  - Superviseur: openai", "llm")
-            info(f"  - Développeur: ollama", "llm")
-            info(f"  - Testeur: ollama", "llm")
-            
-            # Durcir: s'assurer que run_dir existe systématiquement avant création des outils
-            self.current_project_folder.mkdir(parents=True, exist_ok=True)
+            for agent_template in AGENT_TEMPLATES.values():
+                info(f"  - {agent_template.role}: {agent_template.llm}", "llm")
             
-            # Créer les tools simplifiés
-            write_tool = make_write_file_tool(self.current_project_folder)
+            # Mémoire partagée par les crews du run (embeddings et analyse locaux, store borné):
+            # aucun appel LLM à la sauvegarde des souvenirs ni au rappel
+            crew_memory = build_crew_memory(memory_mode)
             
-            # Assigner les tools aux agents (tous ont les mêmes tools simplifiés)
-            for agent in self.agents.values():
-                agent.tools = [write_tool, validate_python_syntax]
+            self._emit(on_event, "stage", stage="crew")
             
             # Créer les tâches avec brief injecté
-            tasks = self._create_project_tasks_with_brief(brief, template)
+            tasks = self._create_project_tasks_with_brief(brief, template, scaffold_files, agents)
             
-            # Créer le crew avec processus séquentiel et paramètres simples
-            crew = Crew(
-                agents=list(self.agents.values()),
-                tasks=tasks,
-                process=Process.sequential,
-                verbose=True,
-                memory=True
-            )
+            # Contexte des tâches développeur/testeur: extraits de plan.json sous budget
+            context_report = {}
+            self._attach_context_budget(tasks, run_dir, context_report)
             
-            # Exécuter la génération
-            result = crew.kickoff(inputs={
-                "brief": brief,
-                "template": template,
-                "project_name": self._extract_project_name(brief)
-            })
+            # Briefs quasi identiques: réutiliser ou réviser un plan existant
+            if cassette is not None and cassette.replaying:
+                # Le rejeu suit le run enregistré: pas de plan antérieur qui changerait les prompts
+                planning_report = {"mode": "fresh"}
+            else:
+                planning_report = self._apply_prior_plan(tasks, brief, template, run_dir)
+            planner_task, developer_task, tester_task = tasks
+            if planning_report["mode"] == "reuse":
+                planner_task.callback(None)  # plan.json déjà en place: contexte du développeur
+                tasks = [developer_task, tester_task]
+            
+            # Fin de tâche: itérations consommées/économisées, puis progression réelle
+            self._attach_completion(tasks, agents, completion)
+            self._attach_progress(tasks, on_event)
+            sampler.follow([task.agent.role for task in tasks])
+            
+            # Le brief et le contexte sont injectés directement dans les descriptions: pas
+            # d'inputs au kickoff, sinon CrewAI réinterpole les accolades ({id}, JSON du plan)
+            speculative_report = None
+            result = None
+            try:
+                if speculative_k > 0:
+                    # Mode spéculatif: plan via CrewAI, code fichier par fichier en K candidats, puis tests
+                    if planning_report["mode"] != "reuse":
+                        self._add_usage(token_usage, self._make_crew([planner_task], crew_memory).kickoff())
+                    developer_template = AGENT_TEMPLATES["developer"]
+                    developer = SpeculativeDeveloper(
+                        lambda temperature: run_budget.track("developer", self._speculative_llm(temperature, cassette)),
+                        k=speculative_k,
+                        persona=f"{developer_template.role}. {developer_template.goal} {developer_template.backstory}",
+                        budget=self.context_budget,
+                    )
+                    self._emit(on_event, "stage", stage="speculative_developer")
+                    speculative_report = developer.develop(run_dir, brief)
+                    run_budget.check("developer")
+                    context_report["tester"] = self._inject_plan_context(
+                        tester_task, tester_task.description, run_dir, focus="tests"
+                    )
+                    tasks = [t for t in tasks if t is not developer_task]
+                    result = self._make_crew([tester_task], crew_memory).kickoff()
+                else:
+                    # Exécuter la génération (crew séquentiel complet)
+                    result = self._make_crew(tasks, crew_memory).kickoff()
+                self._add_usage(token_usage, result)
+            except BudgetExceeded as e:
+                # Arrêt volontaire: les fichiers déjà écrits restent dans le run_dir et sont validés
+                budget_stop = e
+                self._emit(on_event, "stage", stage="budget_exceeded", reason=str(e))
+                usage = run_budget.usage()["run"]
+                token_usage = {key: usage[key] for key in USAGE_KEYS}
+            
+            # Indexer le plan produit pour les prochains briefs proches
+            if planning_report["mode"] != "reuse" and budget_stop is None:
+                safe_execute(self._index_plan, brief, template, run_dir,
+                             error_msg="indexation du brief")
             
             # Analyser les résultats
             execution_time = time.time() - start_time
-            generated_files = list(self.current_project_folder.rglob("*")) if self.current_project_folder else {}
             
-            return {
-                "status": "success",
+            # Valider le projet réellement écrit sur disque
+            self._emit(on_event, "stage", stage="validation")
+            validation = safe_execute(
+                validate_run_dir,
+                run_dir,
+                scaffold_files=scaffold_files,
+                fallback={"status": "skipped"},
+                error_msg="validation du projet",
+            )
+            
+            # Exécuter les tests générés (shards isolés sur le pool partagé)
+            tests_report = {"status": "skipped"}
+            if run_tests and budget_stop is None:
+                self._emit(on_event, "stage", stage="tests")
+                tests_report = safe_execute(
+                    get_verification_pool().verify,
+                    run_dir,
+                    fallback={"status": "error"},
+                    error_msg="exécution des tests générés",
+                )
+            
+            # Réparation ciblée: seuls les fichiers en échec sont régénérés, par leur auteur
+            repair_report = {"status": "skipped"}
+            if budget_stop is None and failing_files(run_dir, validation, tests_report):
+                self._emit(on_event, "stage", stage="repair")
+                usage_before = run_budget.usage()["run"]
+                repair = RepairStage(
+                    lambda owner: agents[owner].llm,
+                    lambda owner: (f"{AGENT_TEMPLATES[owner].role}. {AGENT_TEMPLATES[owner].goal} "
+                                   f"{AGENT_TEMPLATES[owner].backstory}"),
+                    owners=completion.owners(),
+                    max_rounds=repair_rounds_from_env() if repair_rounds is None else repair_rounds,
+                    budget=self.context_budget,
+                    check=run_budget.check,
+                )
+                verify = (lambda: get_verification_pool().verify(run_dir)) if run_tests else None
+                try:
+                    repaired = repair.run(run_dir, lambda: validate_run_dir(run_dir, scaffold_files=scaffold_files),
+                                          verify, validation, tests_report)
+                    repair_report, validation, tests_report = (
+                        repaired["report"], repaired["validation"], repaired["tests"])
+                except BudgetExceeded as e:
+                    # Fichiers peut-être réécrits: nouvelle validation, tests antérieurs périmés
+                    budget_stop = e
+                    self._emit(on_event, "stage", stage="budget_exceeded", reason=str(e))
+                    repair_report = {"status": "budget_exceeded"}
+                    validation = safe_execute(validate_run_dir, run_dir, scaffold_files=scaffold_files,
+                                              fallback={"status": "skipped"},
+                                              error_msg="validation du projet")
+                    tests_report = {"status": "skipped"}
+                except Exception as e:
+                    warning(f"Réparation interrompue: {e}", "repair")
+                    repair_report = {"status": "error", "error": str(e)}
+                # Appels directs aux LLM des agents: hors usage du crew, comptés via le budget
+                usage_after = run_budget.usage()["run"]
+                for key in USAGE_KEYS:
+                    token_usage[key] = token_usage.get(key, 0) + usage_after[key] - usage_before[key]
+            
+            # Index des fichiers (arborescence, pages, recherche) pour l'explorateur de l'UI
+            safe_execute(build_file_index, run_dir, error_msg="index des fichiers du run")
+            generated_files = iter_project_files(run_dir)
+            # Manifeste (chemin, taille, sha256): comparaison avec un autre run sans relire les fichiers
+            manifest = safe_execute(write_manifest, run_dir, fallback=[], error_msg="manifeste du run")
+            
+            outcome = {
+                "status": "success" if budget_stop is None else "budget_exceeded",
                 "execution_time": round(execution_time, 2),
-                "files": {str(f.relative_to(self.current_project_folder)): f.read_text(encoding='utf-8') 
-                         for f in generated_files if f.is_file()} if self.current_project_folder else {},
+                "files": {str(f.relative_to(run_dir)): f.read_text(encoding='utf-8')
+                         for f in generated_files},
+                "manifest": manifest,
                 "agents_count": len(self.agents),
                 "tasks_count": len(tasks),
-                "result": str(result),
-                "output_directory": str(self.current_project_folder)
+                "result": str(result) if result is not None else "",
+                "output_directory": str(run_dir),
+                "validation": validation,
+                "tests": tests_report,
+                "speculative": speculative_report,
+                "context": context_report,
+                "planning": planning_report,
+                "memory": memory_report(memory_mode, crew_memory),
+                "budget": run_budget.report(),
+                "completion": completion.report(),
+                "repair": repair_report,
+                "cassette": cassette.report() if cassette is not None else None,
+                "hedging": self._hedging_report(agents),
+                "token_usage": token_usage
             }
+            if budget_stop is not None:
+                outcome["error"] = str(budget_stop)
             
         except Exception as e:
             print(f"❌ Erreur lors de la génération: {e}")
-            return {
+            outcome = {
                 "status": "error",
                 "error": str(e),
-                "execution_time": time.time() - start_time
+                "execution_time": time.time() - start_time,
+                "budget": run_budget.report(),
+                "token_usage": token_usage
             }
+        finally:
+            if cassette is not None:
+                safe_execute(cassette.save, error_msg="enregistrement de la cassette")
+            if self.warmup is not None:
+                self.warmup.release()
+            sampler.stop()
+            if run_dir is not None:
+                safe_execute(sampler.write, run_dir, error_msg="métriques de ressources du run")
+                safe_execute(clear_run_active, run_dir, error_msg="marqueur de run actif")
+            if crew_memory is not None:
+                safe_execute(crew_memory.close, error_msg="fermeture de la mémoire du crew")
+        
+        outcome["metrics"] = sampler.summary()
+        
+        # Catalogue SQLite des runs (listing et tableaux de bord sans parcours disque)
+        safe_execute(self._record_run, run_dir, project_name, template, brief, start_time, outcome,
+                     error_msg="catalogue des runs")
+        self._emit(on_event, "finished", status=outcome["status"], execution_time=outcome["execution_time"],
+                   error=outcome.get("error"))
+        return outcome
+    
+    def _hedging_report(self, agents: Dict[str, Agent]) -> Dict:
+        """Appels couverts du run par agent, et taux global de la politique (processus)"""
+        per_agent = {key: dict(agent.llm.stats) for key, agent in agents.items()
+                     if isinstance(agent.llm, HedgedLLM)}
+        return {"agents": per_agent, "policy": self.hedge_policy.report()}
+    
+    @staticmethod
+    def _emit(on_event: Optional[Callable[[Dict], None]], event: str, **data):
+        """Notifie une étape de génération au callback de progression (s'il est fourni)"""
+        if on_event is not None:
+            safe_execute(on_event, dict(data, event=event, time=time.time()),
+                         error_msg="callback de progression")
+    
+    @staticmethod
+    def _add_usage(token_usage: Dict, crew_output) -> Dict:
+        """Cumule les métriques de tokens d'une sortie de crew"""
+        usage = getattr(crew_output, "token_usage", None)
+        if usage is not None:
+            for key, value in usage.model_dump().items():
+                if isinstance(value, (int, float)):
+                    token_usage[key] = token_usage.get(key, 0) + value
+        return token_usage
     
-    def _create_project_tasks_with_brief(self, brief: str, template: str) -> List[Task]:
-        """Crée les 3 tâches séquentielles simplifiées avec brief explicitement injecté"""
+    def _record_run(self, run_dir: Optional[Path], project_name: str, template: str, brief: str,
+                    started_at: float, outcome: Dict):
+        """Écrit la ligne du run dans le catalogue"""
+        get_run_catalog().record(run_entry(run_dir, project_name, template, brief, started_at, outcome))
+    
+    def _index_plan(self, brief: str, template: str, run_dir: Path):
+        """Ajoute le brief et son plan.json (s'il est valide) à l'index de briefs"""
+        plan_path = Path(run_dir) / "plan.json"
+        if plan_path.exists():
+            plan = json.loads(plan_path.read_text(encoding="utf-8"))
+            get_brief_index().add(brief, template, plan, run_dir=str(run_dir))
+    
+    def _create_project_tasks_with_brief(self, brief: str, template: str,
+                                         scaffold_files: Optional[List[str]] = None,
+                                         agents: Optional[Dict[str, Agent]] = None) -> List[Task]:
+        """
+        Crée les 3 tâches séquentielles simplifiées avec brief explicitement injecté (agents du run)
+        
+        Ordre des prompts pour le cache de préfixe (OpenAI, KV-cache Ollama): persona et
+        schémas d'outils (message système, identiques d'un run à l'autre), consignes de la
+        tâche, squelette du template, puis seulement le contenu propre au run (brief, contexte).
+        """
+        agents = agents or self.agents
         tasks = []
+        existing = scaffold_note(scaffold_files or [])
         
-        # TÂCHE 1: PLANNER (Superviseur) avec brief injecté
+        # TÂCHE 1: PLANNER (Superviseur), brief en fin de description
         tasks.append(Task(
             description=(
-                "En te basant STRICTEMENT sur ce brief (ne pas inventer autre chose):\n"
-                f"'''{brief}'''\n\n"
+                "Planifie le projet décrit par le brief en fin de tâche, en te basant STRICTEMENT "
+                "sur ce brief (ne pas inventer autre chose):\n"
                 "- Produis un plan.json exhaustif: modules, fichiers, interfaces/endpoints, schémas DB, plan de tests.\n"
                 "- Écris directement le fichier 'plan.json' via l'outil write_file_tool.\n"
                 "- Utilise le dossier de projet déjà créé (ne pas créer de nouveau dossier).\n"
                 "- Pas de code ici; seulement la structure et les contrats testables."
+                f"{existing}\n\n"
+                f"Brief:\n'''{brief}'''"
             ),
             expected_output="Fichier 'plan.json' créé à la racine du run_dir.",
-            agent=self.agents["supervisor"]
+            agent=agents["supervisor"]
         ))
         
         # TÂCHE 2: DÉVELOPPEMENT (Développeur)
         tasks.append(Task(
-            description="Implémenter TOUT le code (backend, frontend, API, DB, UI) strictement selon plan.json sans écart du contrat.",
+            description="Implémenter TOUT le code (backend, frontend, API, DB, UI) strictement selon plan.json sans écart du contrat." + existing,
             expected_output="Tous les fichiers de code implémentés selon plan.json.",
-            agent=self.agents["developer"]
+            agent=agents["developer"],
+            context=[]  # Pas de sorties brutes chaînées: contexte budgété injecté après le plan
         ))
         
         # TÂCHE 3: TESTS (Testeur)
         tasks.append(Task(
-            description="Générer tests Pytest et script smoke-tests ; vérifier toutes les fonctionnalités principales.",
+            description="Générer tests Pytest et script smoke-tests ; vérifier toutes les fonctionnalités principales." + existing,
             expected_output="tests/*.py, scripts/smoke_test.sh, rapport minimal.",
-            agent=self.agents["tester"]
+            agent=agents["tester"],
+            context=[]
         ))
         
         return tasks
@@ -0,0 +1,143 @@
+"""
+LunaCore Export
+Archives ZIP des runs, streamées depuis le disque et mises en cache par empreinte
+"""
+
+import glob
+import os
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from lunacore.logger import info, warning
+from lunacore.run_files import iter_project_files, run_fingerprint
+
+CHUNK_SIZE = 64 * 1024
+EXPORT_CACHE_DIR = Path("sandbox/exports")
+
+# Un seul worker: les archives se construisent hors de la boucle de rerun Streamlit
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lunacore-export")
+_build_locks: Dict[str, threading.Lock] = {}
+_build_locks_guard = threading.Lock()
+
+
+class _ChunkSink:
+    """Flux non-seekable qui accumule les octets écrits par zipfile jusqu'au prochain drain"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self._chunks = self._chunks, []
+        if chunks:
+            yield b"".join(chunks)
+
+
+def stream_zip(run_dir: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Produit une archive ZIP du run par morceaux, en lisant chaque fichier depuis le disque
+
+    La mémoire utilisée reste de l'ordre de chunk_size, quelle que soit la taille du projet.
+    """
+    run_dir = Path(run_dir)
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for path in iter_project_files(run_dir):
+            zinfo = zipfile.ZipInfo.from_file(path, path.relative_to(run_dir).as_posix())
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            with path.open("rb") as src, zipf.open(zinfo, "w") as dst:
+                while True:
+                    block = src.read(chunk_size)
+                    if not block:
+                        break
+                    dst.write(block)
+                    yield from sink.drain()
+            yield from sink.drain()
+    # Le répertoire central est écrit à la fermeture
+    yield from sink.drain()
+
+
+def _lock_for(key: str) -> threading.Lock:
+    with _build_locks_guard:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def archive_path(run_dir: Path, cache_dir: Path = EXPORT_CACHE_DIR) -> Path:
+    """Chemin de l'archive en cache correspondant à l'état actuel du run"""
+    run_dir = Path(run_dir)
+    return Path(cache_dir) / f"{run_dir.name}-{run_fingerprint(run_dir)[:16]}.zip"
+
+
+def build_run_archive(run_dir: Path, cache_dir: Path = EXPORT_CACHE_DIR) -> Path:
+    """
+    Construit (ou réutilise) l'archive ZIP du run sur disque
+
+    L'archive est indexée par l'empreinte du run: tant que les fichiers ne changent pas,
+    elle n'est jamais reconstruite.
+    """
+    run_dir = Path(run_dir)
+    if not run_dir.is_dir():
+        raise FileNotFoundError(f"run_dir introuvable: {run_dir}")
+
+    target = archive_path(run_dir, cache_dir)
+    with _lock_for(str(target)):
+        if target.exists():
+            return target
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with tmp.open("wb") as out:
+                for chunk in stream_zip(run_dir):
+                    out.write(chunk)
+            os.replace(tmp, target)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+        # Les archives d'états précédents du même run sont obsolètes
+        for stale in target.parent.glob(f"{run_dir.name}-*.zip"):
+            if stale != target:
+                try:
+                    stale.unlink()
+                except OSError as e:
+                    warning(f"Archive obsolète non supprimée {stale}: {e}", "export")
+
+        info(f"📦 Archive créée: {target} ({target.stat().st_size} octets)", "export")
+        return target
+
+
+def submit_run_archive(run_dir: Path, cache_dir: Path = EXPORT_CACHE_DIR) -> Future:
+    """Lance la construction de l'archive en arrière-plan et retourne le Future"""
+    return _executor.submit(build_run_archive, Path(run_dir), Path(cache_dir))
+
+
+def cached_run_archive(run_dir: Path, cache_dir: Path = EXPORT_CACHE_DIR) -> Optional[Path]:
+    """Retourne l'archive déjà construite pour l'état actuel du run, sinon None"""
+    target = archive_path(run_dir, cache_dir)
+    return target if target.exists() else None
+
+
+def evict_run_archives(run_id: str, cache_dir: Path = EXPORT_CACHE_DIR) -> int:
+    """Supprime les archives en cache d'un run (après sa suppression); retourne leur nombre"""
+    removed = 0
+    for archive in Path(cache_dir).glob(f"{glob.escape(run_id)}-*.zip"):
+        with _lock_for(str(archive)):
+            try:
+                archive.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                warning(f"Archive non supprimée {archive}: {e}", "export")
+    return removed
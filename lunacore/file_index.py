@@ -0,0 +1,219 @@
+"""
+LunaCore File Index
+Index SQLite d'un run_dir: manifeste, arborescence, pages de lignes et recherche plein texte
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from lunacore.logger import info
+from lunacore.run_files import RUN_META_DIR, iter_project_files, run_fingerprint
+
+FILE_INDEX_NAME = "file_index.sqlite3"
+
+# Une position d'octet mémorisée toutes les CHECKPOINT_LINES lignes: lecture d'une page sans relire le fichier
+CHECKPOINT_LINES = 500
+# Au-delà, le contenu n'est pas indexé pour la recherche (le fichier reste consultable par pages)
+MAX_INDEXED_BYTES = 2 * 1024 * 1024
+MAX_LINE_CHARS = 500
+BINARY_SNIFF_BYTES = 8192
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    binary INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_parent ON files(parent);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_dirs_parent ON dirs(parent);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    path TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    PRIMARY KEY (path, line)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS content USING fts5(
+    text, path UNINDEXED, line UNINDEXED, tokenize = 'trigram'
+);
+"""
+
+
+def _parent(rel: str) -> str:
+    return rel.rsplit("/", 1)[0] if "/" in rel else ""
+
+
+def _is_binary(path: Path) -> bool:
+    with path.open("rb") as f:
+        return b"\0" in f.read(BINARY_SNIFF_BYTES)
+
+
+class RunFileIndex:
+    """
+    Index d'un run (run_dir/.lunacore/file_index.sqlite3), reconstruit si l'empreinte change
+
+    Toutes les lectures sont bornées: un niveau d'arborescence paginé, une plage de lignes
+    (repositionnée via les checkpoints), un nombre limité de résultats de recherche.
+    """
+
+    def __init__(self, run_dir: Path):
+        self.run_dir = Path(run_dir)
+        self.path = self.run_dir / RUN_META_DIR / FILE_INDEX_NAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _fingerprint(self) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        return row["value"] if row else None
+
+    def build(self, force: bool = False) -> bool:
+        """Indexe le run_dir; retourne False si l'index était déjà à jour"""
+        fingerprint = run_fingerprint(self.run_dir)
+        with self._lock:
+            if not force and self._fingerprint() == fingerprint:
+                return False
+            with self._conn:
+                for table in ("files", "dirs", "checkpoints", "content"):
+                    self._conn.execute(f"DELETE FROM {table}")
+                dirs = set()
+                for path in iter_project_files(self.run_dir):
+                    rel = path.relative_to(self.run_dir).as_posix()
+                    parent = _parent(rel)
+                    while parent and parent not in dirs:
+                        dirs.add(parent)
+                        parent = _parent(parent)
+                    self._index_file(path, rel)
+                self._conn.executemany("INSERT INTO dirs (path, parent) VALUES (?, ?)",
+                                       [(d, _parent(d)) for d in dirs])
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)",
+                                   (fingerprint,))
+        info(f"🗂️ Index des fichiers construit: {self.run_dir.name}", "files")
+        return True
+
+    def _index_file(self, path: Path, rel: str):
+        size = path.stat().st_size
+        binary = _is_binary(path)
+        lines = 0
+        if not binary:
+            searchable = size <= MAX_INDEXED_BYTES
+            checkpoints, rows = [(rel, 0, 0)], []
+            offset = 0
+            with path.open("rb") as f:
+                for raw in f:
+                    if searchable and raw.strip():
+                        text = raw.decode("utf-8", errors="replace").rstrip("\r\n")[:MAX_LINE_CHARS]
+                        rows.append((text, rel, lines))
+                    lines += 1
+                    offset += len(raw)
+                    if lines % CHECKPOINT_LINES == 0:
+                        checkpoints.append((rel, lines, offset))
+            self._conn.executemany("INSERT INTO checkpoints (path, line, offset) VALUES (?, ?, ?)", checkpoints)
+            self._conn.executemany("INSERT INTO content (text, path, line) VALUES (?, ?, ?)", rows)
+        self._conn.execute("INSERT INTO files (path, parent, size, lines, binary) VALUES (?, ?, ?, ?, ?)",
+                           (rel, _parent(rel), size, lines, int(binary)))
+
+    def stats(self) -> Dict:
+        """Nombre de fichiers, de dossiers et taille totale du run"""
+        with self._lock:
+            files, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+            dirs = self._conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+        return {"files": files, "dirs": dirs, "total_bytes": size}
+
+    def manifest(self, limit: int = 1000, offset: int = 0) -> List[Dict]:
+        """Fichiers du run (chemin, taille, lignes) triés par chemin, paginés"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM files ORDER BY path LIMIT ? OFFSET ?",
+                                      (limit, offset)).fetchall()
+        return [dict(r) for r in rows]
+
+    def file_info(self, rel: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM files WHERE path = ?", (rel,)).fetchone()
+        return dict(row) if row else None
+
+    def children(self, parent: str = "", limit: int = 100, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Un niveau de l'arborescence (dossiers puis fichiers), paginé
+
+        Returns:
+            (entrées {path, name, kind, size, lines}, nombre total d'entrées du niveau)
+        """
+        parent = parent.strip("/")
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM dirs WHERE parent = ?) + (SELECT COUNT(*) FROM files WHERE parent = ?)",
+                (parent, parent)).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT path, 'dir' AS kind, NULL AS size, NULL AS lines FROM dirs WHERE parent = ? "
+                "UNION ALL SELECT path, 'file', size, lines FROM files WHERE parent = ? "
+                "ORDER BY kind, path LIMIT ? OFFSET ?",
+                (parent, parent, limit, offset)).fetchall()
+        return [dict(r, name=r["path"].rsplit("/", 1)[-1]) for r in rows], total
+
+    def read_lines(self, rel: str, start: int = 0, count: int = 200) -> List[str]:
+        """Lignes [start, start + count) d'un fichier, lues depuis le checkpoint le plus proche"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT line, offset FROM checkpoints WHERE path = ? AND line <= ? ORDER BY line DESC LIMIT 1",
+                (rel, max(0, start))).fetchone()
+        if row is None:
+            raise KeyError(rel)
+        line, lines = row["line"], []
+        with (self.run_dir / rel).open("rb") as f:
+            f.seek(row["offset"])
+            for raw in f:
+                if line >= start + count:
+                    break
+                if line >= start:
+                    lines.append(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+                line += 1
+        return lines
+
+    def search(self, query: str, limit: int = 50) -> Dict[str, List[Dict]]:
+        """
+        Recherche dans les noms de fichiers et les contenus indexés
+
+        Returns:
+            {"files": [{path, size, lines}], "lines": [{path, line, text}]}
+        """
+        query = query.strip()
+        if not query:
+            return {"files": [], "lines": []}
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._lock:
+            files = self._conn.execute(
+                "SELECT path, size, lines FROM files WHERE path LIKE ? ESCAPE '\\' ORDER BY path LIMIT ?",
+                (pattern, limit)).fetchall()
+            if len(query) >= 3:
+                # Tokenizer trigram: la sous-chaîne est servie par l'index FTS5
+                lines = self._conn.execute(
+                    "SELECT path, line, text FROM content WHERE content MATCH ? ORDER BY path, line LIMIT ?",
+                    ('"' + query.replace('"', '""') + '"', limit)).fetchall()
+            else:
+                lines = self._conn.execute(
+                    "SELECT path, line, text FROM content WHERE text LIKE ? ESCAPE '\\' ORDER BY path, line LIMIT ?",
+                    (pattern, limit)).fetchall()
+        return {"files": [dict(r) for r in files], "lines": [dict(r) for r in lines]}
+
+
+def build_file_index(run_dir: Path) -> Dict:
+    """Construit (ou valide) l'index d'un run et retourne ses statistiques"""
+    index = RunFileIndex(run_dir)
+    try:
+        index.build()
+        return index.stats()
+    finally:
+        index.close()
@@ -0,0 +1,270 @@
+"""
+LunaCore Hedging
+Requêtes couvertes Ollama -> OpenAI: si le premier token de Llama tarde au-delà de son p90
+observé, la même requête part vers OpenAI; la première réponse l'emporte et le flux du
+perdant est interrompu (taux de couverture plafonné)
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Optional
+
+from crewai.events.event_bus import crewai_event_bus
+from crewai.events.types.llm_events import LLMStreamChunkEvent
+from crewai.llms.base_llm import BaseLLM, call_stop_override
+from crewai.types.usage_metrics import UsageMetrics
+from pydantic import ConfigDict
+
+from lunacore.logger import info
+
+LATENCY_WINDOW = 200
+
+
+class LatencyTracker:
+    """Latences récentes d'un backend (fenêtre glissante), quantiles à la demande"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(model: str) -> LatencyTracker:
+    """Tracker partagé par modèle dans le processus (le seuil s'adapte sur tous les runs)"""
+    with _trackers_lock:
+        return _trackers.setdefault(model, LatencyTracker())
+
+
+@dataclass
+class HedgePolicy:
+    """
+    Politique de couverture: rôles concernés (clés d'AGENT_TEMPLATES), quantile du seuil,
+    seuil par défaut tant que l'historique est trop court, plafond du taux de couverture
+    """
+
+    roles: FrozenSet[str] = frozenset()
+    quantile: float = 0.9
+    min_samples: int = 10
+    default_seconds: float = 30.0
+    min_seconds: float = 1.0
+    max_rate: float = 0.2
+    calls: int = 0
+    hedges: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        """
+        LUNACORE_HEDGE_ROLES (ex. "developer,tester"; vide = désactivé), LUNACORE_HEDGE_QUANTILE,
+        LUNACORE_HEDGE_DEFAULT_SECONDS, LUNACORE_HEDGE_MAX_RATE
+        """
+        roles = frozenset(r.strip() for r in os.getenv("LUNACORE_HEDGE_ROLES", "").split(",") if r.strip())
+        return cls(
+            roles=roles,
+            quantile=float(os.getenv("LUNACORE_HEDGE_QUANTILE", 0.9)),
+            default_seconds=float(os.getenv("LUNACORE_HEDGE_DEFAULT_SECONDS", 30)),
+            max_rate=float(os.getenv("LUNACORE_HEDGE_MAX_RATE", 0.2)),
+        )
+
+    def threshold(self, tracker: LatencyTracker) -> float:
+        """Délai avant couverture: quantile des latences du backend, défaut si historique court"""
+        if len(tracker) < self.min_samples:
+            return self.default_seconds
+        return max(self.min_seconds, tracker.quantile(self.quantile))
+
+    def start_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def allow_hedge(self) -> bool:
+        """Réserve une couverture si le taux (couvertures / appels) reste sous max_rate"""
+        with self._lock:
+            if self.hedges + 1 > self.max_rate * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {"roles": sorted(self.roles), "calls": self.calls, "hedges": self.hedges,
+                    "hedge_rate": round(self.hedges / self.calls, 3) if self.calls else 0.0,
+                    "max_rate": self.max_rate}
+
+
+class StreamAborted(BaseException):
+    """
+    Interrompt le flux du perdant depuis le gestionnaire de chunks
+
+    BaseException: traverse les except Exception de CrewAI et du client HTTP, qui ferment
+    alors le flux en sortant de leur boucle de lecture.
+    """
+
+
+class _Attempt:
+    """Appel en cours sur un backend: premier token reçu, abandon demandé"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.started = time.perf_counter()
+        self.first_token = threading.Event()
+        self.cancelled = threading.Event()
+
+    def mark_first_token(self):
+        """Premier chunk (ou réponse complète si le backend ne streame pas): latence enregistrée"""
+        if not self.first_token.is_set():
+            self.first_token.set()
+            get_latency_tracker(self.model).record(time.perf_counter() - self.started)
+
+
+# Tentative de l'appel en cours dans ce thread: _timed_call la pose dans le contexte copié
+# par _submit, le gestionnaire de chunks (synchrone, même thread) la relit. Chaque appel
+# garde ainsi ses chunks, même si le flux perdant d'un appel précédent du même LLM se
+# termine encore pendant l'appel suivant
+_current_attempt: contextvars.ContextVar[Optional[_Attempt]] = contextvars.ContextVar(
+    "lunacore_hedge_attempt", default=None)
+_listener_lock = threading.Lock()
+_listener_registered = False
+
+
+def _on_stream_chunk(source, event):
+    """Gestionnaire synchrone des chunks (exécuté dans le thread qui lit le flux)"""
+    attempt = _current_attempt.get()
+    if attempt is None:
+        return
+    attempt.mark_first_token()
+    if attempt.cancelled.is_set():
+        raise StreamAborted(attempt.model)
+
+
+def _ensure_listener():
+    global _listener_registered
+    with _listener_lock:
+        if not _listener_registered:
+            crewai_event_bus.register_handler(LLMStreamChunkEvent, _on_stream_chunk)
+            _listener_registered = True
+
+
+def _submit(fn, *args, **kwargs) -> Future:
+    """Exécute fn dans un thread démon (contexte CrewAI copié: hooks, stop, événements)"""
+    future: Future = Future()
+    context = contextvars.copy_context()
+
+    def runner():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(fn, *args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=runner, name="lunacore-hedge", daemon=True).start()
+    return future
+
+
+class HedgedLLM(BaseLLM):
+    """
+    LLM d'un agent: appel au backend principal (Ollama), couvert par le secours (OpenAI)
+    si aucun token n'est arrivé au seuil de la politique
+
+    Les deux backends sont streamés: le seuil porte sur le premier chunk, pas sur la réponse
+    complète. Dès qu'un backend l'emporte, le flux de l'autre est interrompu à son chunk
+    suivant (StreamAborted); un backend qui ne streame pas ne peut pas être interrompu et
+    ses tokens restent comptés sur le LLM qui les a consommés (primary / backup).
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    primary: Any
+    backup: Any
+    policy: Any
+    role: str = ""
+    stats: Dict[str, int] = {}
+
+    @classmethod
+    def wrap(cls, primary: BaseLLM, backup: BaseLLM, policy: HedgePolicy, role: str) -> "HedgedLLM":
+        """Enveloppe deux LLM propres à l'agent (copies de _bind_llm), passés en streaming"""
+        _ensure_listener()
+        primary.stream = backup.stream = True
+        return cls(model=primary.model, primary=primary, backup=backup, policy=policy, role=role,
+                   stop=list(primary.stop), stats={"calls": 0, "hedges": 0, "backup_wins": 0})
+
+    @staticmethod
+    def _timed_call(llm: BaseLLM, attempt: _Attempt, stop, args, kwargs):
+        token = _current_attempt.set(attempt)
+        try:
+            with call_stop_override(llm, stop):
+                return llm.call(*args, **kwargs)
+        finally:
+            _current_attempt.reset(token)
+            attempt.mark_first_token()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        args = (messages,)
+        kwargs = dict(tools=tools, callbacks=callbacks, available_functions=available_functions,
+                      from_task=from_task, from_agent=from_agent, response_model=response_model)
+        stop = self.stop_sequences
+        self.policy.start_call()
+        self.stats["calls"] += 1
+        threshold = self.policy.threshold(get_latency_tracker(self.primary.model))
+
+        primary_attempt = _Attempt(self.primary.model)
+        primary = _submit(self._timed_call, self.primary, primary_attempt, stop, args, kwargs)
+        if primary_attempt.first_token.wait(threshold) or not self.policy.allow_hedge():
+            return primary.result()
+
+        self.stats["hedges"] += 1
+        info(f"🪁 {self.role}: aucun token de {self.primary.model} après {threshold:.1f}s, "
+             f"requête couverte par {self.backup.model}", "hedging")
+        backup_attempt = _Attempt(self.backup.model)
+        backup = _submit(self._timed_call, self.backup, backup_attempt, stop, args, kwargs)
+        attempts = {primary: primary_attempt, backup: backup_attempt}
+        pending = {primary, backup}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        attempts[loser].cancelled.set()  # flux coupé à son prochain chunk
+                    if future is backup:
+                        self.stats["backup_wins"] += 1
+                    return future.result()
+        return primary.result()  # les deux ont échoué: erreur du backend principal
+
+    def supports_function_calling(self) -> bool:
+        return self.primary.supports_function_calling() and self.backup.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.primary.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return min(self.primary.get_context_window_size(), self.backup.get_context_window_size())
+
+    def get_token_usage_summary(self) -> UsageMetrics:
+        """Usage cumulé des deux backends (les tokens du perdant sont payés aussi)"""
+        usage = self.primary.get_token_usage_summary()
+        usage.add_usage_metrics(self.backup.get_token_usage_summary())
+        return usage
@@ -0,0 +1,370 @@
+"""
+LunaCore Job Server
+API HTTP headless: soumission de jobs de génération, progression en SSE, manifeste et archive
+
+Usage:
+    python -m lunacore.job_server --host 127.0.0.1 --port 8765 --workers 2
+
+Endpoints:
+    POST /jobs                  {"brief": ..., "template": ..., "run_tests": ...} -> {"id": ...}
+    GET  /jobs                  jobs connus (les plus récents d'abord)
+    GET  /jobs/<id>             état du job
+    GET  /jobs/<id>/events      progression en server-sent events (reprise via Last-Event-ID)
+    GET  /jobs/<id>/manifest    fichiers du projet généré (chemin, taille, sha256)
+    GET  /jobs/<id>/diff?against=<id>[&diff=<chemin>...]
+                                fichiers ajoutés/supprimés/modifiés depuis un autre job,
+                                diffs unifiés des seuls chemins demandés
+    GET  /jobs/<id>/archive     archive ZIP streamée depuis le disque
+    GET  /ollama                état du modèle Ollama préchargé (loaded / cold / unreachable)
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from lunacore.crew_memory import MEMORY_MODES
+from lunacore.export import stream_zip
+from lunacore.logger import info, success, warning
+from lunacore.run_manifest import diff_runs, load_manifest
+
+TERMINAL_STATUSES = ("success", "error", "budget_exceeded")
+MAX_FINISHED_JOBS = 500
+HEARTBEAT_SECONDS = 15
+MAX_BODY_BYTES = 64 * 1024
+# Paramètres de generate_project acceptés dans le corps de POST /jobs, et leur type JSON
+JOB_OPTION_TYPES = {"template": str, "run_tests": bool, "speculative_k": int, "memory_mode": str,
+                    "repair_rounds": int}
+JOB_OPTIONS = tuple(JOB_OPTION_TYPES)
+
+
+def parse_job_options(payload: Dict) -> Dict:
+    """
+    Options de generate_project lues dans le corps de POST /jobs
+
+    null vaut absence (valeur par défaut), 3.0 vaut 3; une chaîne là où un entier ou un
+    booléen est attendu ("3", "true") est refusée. ValueError si une option est invalide.
+    """
+    options = {}
+    for key, expected in JOB_OPTION_TYPES.items():
+        value = payload.get(key)
+        if value is None:
+            continue
+        if expected is int and isinstance(value, float) and value.is_integer():
+            value = int(value)
+        # bool est un int en Python: true n'est pas un nombre de candidats
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise ValueError(f"option '{key}': {expected.__name__} attendu, {type(value).__name__} reçu")
+        if expected is int and value < 0:
+            raise ValueError(f"option '{key}': entier positif attendu")
+        if expected is str and not value.strip():
+            raise ValueError(f"option '{key}': chaîne vide")
+        options[key] = value
+    if options.get("memory_mode", "off") not in MEMORY_MODES:
+        raise ValueError(f"option 'memory_mode': {' / '.join(MEMORY_MODES)} attendu")
+    return options
+
+
+class Job:
+    """État d'un job et journal de ses événements (rejouable pour chaque abonné SSE)"""
+
+    def __init__(self, brief: str, options: Dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.brief = brief
+        self.options = options
+        self.status = "queued"
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.output_directory: Optional[str] = None
+        self.result: Optional[Dict] = None
+        self.events: List[Dict] = []
+        self._cond = threading.Condition()
+
+    def add_event(self, event: Dict):
+        with self._cond:
+            self.events.append(event)
+            if event.get("event") == "started":
+                self.output_directory = event.get("output_directory")
+            self._cond.notify_all()
+
+    def finish(self, result: Dict):
+        with self._cond:
+            # Les contenus de fichiers restent sur disque (manifeste, archive): pas en mémoire
+            self.result = {key: value for key, value in result.items() if key != "files"}
+            self.status = result.get("status") if result.get("status") in TERMINAL_STATUSES else "error"
+            self.finished_at = time.time()
+            self.output_directory = result.get("output_directory") or self.output_directory
+            self.events.append({"event": "done", "status": self.status, "time": self.finished_at})
+            self._cond.notify_all()
+
+    def wait_events(self, after: int, timeout: float) -> List[Dict]:
+        """Événements d'index >= after, en attendant au plus timeout s'il n'y en a pas"""
+        with self._cond:
+            if len(self.events) <= after and self.status not in TERMINAL_STATUSES:
+                self._cond.wait(timeout)
+            return self.events[after:]
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self) -> Dict:
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "brief": self.brief,
+            "options": self.options,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "output_directory": self.output_directory,
+            "events": len(self.events),
+        }
+        if self.result is not None:
+            data.update({key: self.result.get(key) for key in ("execution_time", "error", "token_usage")})
+            data["validation"] = (self.result.get("validation") or {}).get("status")
+            data["tests"] = (self.result.get("tests") or {}).get("status")
+        return data
+
+
+class JobManager:
+    """
+    File de jobs exécutés sur un pool partagé avec un seul système de génération
+
+    Le système est créé à la première soumission (system_factory), puis réutilisé par
+    tous les jobs: LLM, caches et pools ne sont initialisés qu'une fois; chaque job
+    instancie ses propres agents (runs concurrents isolés).
+    """
+
+    def __init__(self, system_factory: Callable, max_workers: int = 2):
+        self._system_factory = system_factory
+        self._system = None
+        self._system_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lunacore-job")
+        self._jobs: Dict[str, Job] = {}
+        self._jobs_lock = threading.Lock()
+
+    def _get_system(self):
+        with self._system_lock:
+            if self._system is None:
+                self._system = self._system_factory()
+                warmup = getattr(self._system, "warmup", None)
+                if warmup is not None:
+                    warmup.add_demand(self.pending)  # keep-alive du modèle tant que des jobs attendent
+            return self._system
+
+    def pending(self) -> int:
+        """Nombre de jobs en file ou en cours"""
+        with self._jobs_lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def model_status(self) -> Optional[Dict]:
+        """État du modèle Ollama préchargé (None si le système n'est pas démarré ou sans Ollama)"""
+        warmup = getattr(self._system, "warmup", None)
+        return warmup.status() if warmup is not None else None
+
+    def submit(self, brief: str, **options) -> Job:
+        job = Job(brief, options)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job)
+        info(f"📥 Job {job.id} en file: {brief[:50]}", "jobs")
+        return job
+
+    def _run(self, job: Job):
+        job.status = "running"
+        job.add_event({"event": "running", "time": time.time()})
+        try:
+            result = self._get_system().generate_project(job.brief, on_event=job.add_event, **job.options)
+        except Exception as e:
+            warning(f"Job {job.id} en erreur: {e}", "jobs")
+            result = {"status": "error", "error": str(e)}
+        job.finish(result)
+        success(f"Job {job.id} terminé: {job.status}", "jobs")
+
+    def _prune(self):
+        """Oublie les jobs terminés les plus anciens au-delà de MAX_FINISHED_JOBS"""
+        finished = sorted((j for j in self._jobs.values() if j.done), key=lambda j: j.finished_at)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._jobs_lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]+)(?:/(events|manifest|diff|archive))?/?$")
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """Routes HTTP du service de jobs (le JobManager est porté par le serveur)"""
+
+    server_version = "LunaCoreJobs/1.0"
+
+    @property
+    def manager(self) -> JobManager:
+        return self.server.manager
+
+    def log_message(self, format, *args):
+        info(f"{self.address_string()} {format % args}", "http")
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        self._send_json(status, {"error": message})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._error(404, "route inconnue")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            return self._error(413, "corps trop volumineux")
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._error(400, "JSON invalide")
+        brief = payload.get("brief") if isinstance(payload, dict) else None
+        if not isinstance(brief, str) or not brief.strip():
+            return self._error(400, "champ 'brief' requis")
+        try:
+            options = parse_job_options(payload)
+        except ValueError as e:
+            return self._error(400, str(e))
+        job = self.manager.submit(brief, **options)
+        self._send_json(202, {"id": job.id, "status": job.status, "events": f"/jobs/{job.id}/events"})
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path.rstrip("/") == "/jobs":
+            return self._send_json(200, [job.to_dict() for job in self.manager.list()])
+        if path.rstrip("/") == "/ollama":
+            return self._send_json(200, {"pending_jobs": self.manager.pending(),
+                                         "model": self.manager.model_status()})
+        match = _JOB_PATH.match(path)
+        job = self.manager.get(match.group(1)) if match else None
+        if job is None:
+            return self._error(404, "job inconnu")
+        action = match.group(2)
+        if action is None:
+            return self._send_json(200, job.to_dict())
+        if action == "events":
+            return self._stream_events(job)
+        if not job.done or not job.output_directory:
+            return self._error(409, f"job {job.status}: résultat pas encore disponible")
+        run_dir = Path(job.output_directory)
+        if not run_dir.is_dir():
+            return self._error(410, "dossier du run supprimé")
+        if action == "manifest":
+            return self._send_json(200, {"id": job.id, "run_id": run_dir.name, "files": load_manifest(run_dir)})
+        if action == "diff":
+            return self._send_diff(job, run_dir, parse_qs(query))
+        self._stream_archive(run_dir)
+
+    def _send_diff(self, job: Job, run_dir: Path, params: Dict[str, List[str]]):
+        """Différences avec le run d'un autre job (empreintes des manifestes, diffs à la demande)"""
+        other = self.manager.get((params.get("against") or [""])[0])
+        if other is None or not other.done or not other.output_directory:
+            return self._error(404, "paramètre 'against': job terminé requis")
+        other_dir = Path(other.output_directory)
+        if not other_dir.is_dir():
+            return self._error(410, "dossier du run de référence supprimé")
+        report = diff_runs(other_dir, run_dir, diffs=params.get("diff", []))
+        self._send_json(200, dict(report, id=job.id, against=other.id))
+
+    def _stream_events(self, job: Job):
+        """Server-sent events: rejoue le journal puis suit le job jusqu'à l'événement done"""
+        try:
+            position = int(self.headers.get("Last-Event-ID")) + 1
+        except (TypeError, ValueError):
+            position = 0
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                events = job.wait_events(position, HEARTBEAT_SECONDS)
+                if not events:
+                    self.wfile.write(b": keep-alive\n\n")  # commentaire SSE: garde la connexion ouverte
+                for event in events:
+                    data = json.dumps(event, ensure_ascii=False, default=str)
+                    self.wfile.write(f"id: {position}\nevent: {event.get('event', 'message')}\ndata: {data}\n\n".encode("utf-8"))
+                    position += 1
+                self.wfile.flush()
+                if job.done and position >= len(job.events):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            return  # client parti: le job continue
+
+    def _stream_archive(self, run_dir: Path):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", f'attachment; filename="{run_dir.name}.zip"')
+        self.end_headers()
+        try:
+            for chunk in stream_zip(run_dir):
+                self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+class JobServer(ThreadingHTTPServer):
+    """Serveur HTTP multi-thread (un thread par connexion, flux SSE compris)"""
+
+    daemon_threads = True
+
+    def __init__(self, address, manager: JobManager):
+        super().__init__(address, JobRequestHandler)
+        self.manager = manager
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8765, workers: int = 2,
+                  system_factory: Optional[Callable] = None) -> JobServer:
+    """Construit le serveur (system_factory par défaut: instance globale LunaCrewSystem)"""
+    if system_factory is None:
+        from lunacore.crew_system import get_crew_system
+        system_factory = get_crew_system
+    return JobServer((host, port), JobManager(system_factory, max_workers=workers))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP de jobs de génération LunaCore")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="Jobs exécutés en parallèle")
+    args = parser.parse_args(argv)
+
+    server = create_server(args.host, args.port, args.workers)
+    info(f"🌐 API de jobs sur http://{args.host}:{args.port}", "jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.manager.shutdown(wait=False)
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
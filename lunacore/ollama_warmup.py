@@ -0,0 +1,256 @@
+"""
+LunaCore Ollama Warmup
+Préchargement du modèle Llama, pings keep-alive pendant l'activité et épinglage aux heures ouvrées
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lunacore.logger import info, success, warning
+
+DEFAULT_KEEP_ALIVE = "30m"
+DEFAULT_PING_SECONDS = 240
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def _weekday(name: str) -> int:
+    """Numéro du jour (0 = lundi) d'après ses trois premières lettres anglaises"""
+    key = name.strip().lower()[:3]
+    if key not in _WEEKDAYS:
+        raise ValueError(f"Jour inconnu: {name!r} (attendu: {', '.join(_WEEKDAYS)})")
+    return _WEEKDAYS.index(key)
+
+
+def _parse_days(part: str) -> Tuple[int, ...]:
+    """"mon" ou plage "fri-mon" (qui peut enjamber le week-end)"""
+    if "-" not in part:
+        return (_weekday(part),)
+    first, last = (_weekday(day) for day in part.split("-", 1))
+    return tuple((first + i) % 7 for i in range((last - first) % 7 + 1))
+
+
+@dataclass(frozen=True)
+class PinWindow:
+    """
+    Plage horaire locale (heures [start, end)) et jours de semaine où le modèle reste chargé
+
+    Une plage de nuit (start > end, ex. 22-6) déborde sur le lendemain: les jours
+    désignent le jour où elle commence (lundi 22h -> mardi 6h pour "mon").
+    """
+
+    start_hour: int
+    end_hour: int
+    weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4)
+
+    @classmethod
+    def parse(cls, hours: str, days: Optional[str] = None) -> "PinWindow":
+        """"8-19" ou "22-6" et "mon-fri" (ou "mon,wed,fri", "fri-mon", "sat-sun,mon"); jours ouvrés par défaut"""
+        start, end = (int(part) for part in hours.split("-", 1))
+        if not (0 <= start <= 23 and 0 <= end <= 24) or start == end:
+            raise ValueError(f"Plage horaire invalide: {hours} (attendu: début 0-23, fin 0-24, différents)")
+        weekdays = (0, 1, 2, 3, 4)
+        if days:
+            weekdays = tuple(sorted({day for part in days.split(",") for day in _parse_days(part)}))
+        return cls(start, end, weekdays)
+
+    def seconds_left(self, moment: float) -> float:
+        """Secondes restantes dans la plage à l'instant donné (0 hors plage)"""
+        local = time.localtime(moment)
+        if self.start_hour < self.end_hour:
+            inside = local.tm_wday in self.weekdays and self.start_hour <= local.tm_hour < self.end_hour
+            end_day = local.tm_mday
+        elif local.tm_hour >= self.start_hour:
+            # Début d'une plage de nuit: fin le lendemain
+            inside = local.tm_wday in self.weekdays
+            end_day = local.tm_mday + 1
+        else:
+            # Fin d'une plage de nuit commencée la veille
+            inside = (local.tm_wday - 1) % 7 in self.weekdays and local.tm_hour < self.end_hour
+            end_day = local.tm_mday
+        if not inside:
+            return 0.0
+        # mktime normalise le lendemain en fin de mois
+        end = time.mktime((local.tm_year, local.tm_mon, end_day, self.end_hour, 0, 0, 0, 0, -1))
+        return max(0.0, end - moment)
+
+
+class OllamaWarmup:
+    """
+    Gestionnaire de chargement d'un modèle Ollama
+
+    - preload(): requête /api/generate sans prompt (charge le modèle, keep_alive transmis)
+    - status(): état loaded / cold / unreachable d'après /api/ps
+    - thread de fond: préchargement au démarrage puis ping tant qu'il y a de la demande
+      (runs en cours, jobs en file) ou pendant la plage d'épinglage
+    """
+
+    def __init__(self, base_url: str, model: str, keep_alive: str = DEFAULT_KEEP_ALIVE,
+                 ping_seconds: float = DEFAULT_PING_SECONDS, pin: Optional[PinWindow] = None,
+                 timeout: float = 120.0, clock: Callable[[], float] = time.time):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.ping_seconds = ping_seconds
+        self.pin = pin
+        self.timeout = timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._active = 0
+        self._demand: List[Callable[[], int]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_load_seconds: Optional[float] = None
+        self.last_ping: Optional[float] = None
+        self.pings = 0
+        self.last_error: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, base_url: str, model: str) -> "OllamaWarmup":
+        """LUNACORE_OLLAMA_KEEP_ALIVE, LUNACORE_OLLAMA_PING_SECONDS, LUNACORE_OLLAMA_PIN_HOURS/_DAYS"""
+        hours = os.getenv("LUNACORE_OLLAMA_PIN_HOURS")
+        return cls(
+            base_url,
+            model,
+            keep_alive=os.getenv("LUNACORE_OLLAMA_KEEP_ALIVE", DEFAULT_KEEP_ALIVE),
+            ping_seconds=float(os.getenv("LUNACORE_OLLAMA_PING_SECONDS", DEFAULT_PING_SECONDS)),
+            pin=PinWindow.parse(hours, os.getenv("LUNACORE_OLLAMA_PIN_DAYS")) if hours else None,
+        )
+
+    def _request(self, path: str, payload: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(f"{self.base_url}{path}", data=data,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+            return json.loads(response.read() or b"{}")
+
+    def _keep_alive_for(self, moment: float):
+        """Durée transmise à Ollama: jusqu'à la fin de la plage épinglée si elle est plus longue"""
+        pinned = self.pin.seconds_left(moment) if self.pin else 0
+        return int(pinned + self.ping_seconds) if pinned > self.ping_seconds else self.keep_alive
+
+    def preload(self) -> bool:
+        """Charge (ou maintient) le modèle; retourne False si Ollama est injoignable"""
+        start = time.perf_counter()
+        try:
+            self._request("/api/generate", {"model": self.model, "prompt": "", "stream": False,
+                                            "keep_alive": self._keep_alive_for(self.clock())})
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            self.last_error = str(e)
+            return False
+        with self._lock:
+            self.last_load_seconds = round(time.perf_counter() - start, 3)
+            self.last_ping = self.clock()
+            self.pings += 1
+            self.last_error = None
+        return True
+
+    def status(self) -> Dict:
+        """État du modèle d'après /api/ps: loaded, cold (pas en mémoire) ou unreachable"""
+        report = {"model": self.model, "state": "unreachable", "expires_at": None,
+                  "last_load_seconds": self.last_load_seconds, "pings": self.pings,
+                  "pinned": bool(self.pin and self.pin.seconds_left(self.clock()))}
+        try:
+            loaded = self._request("/api/ps", timeout=5).get("models") or []
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            report["error"] = str(e)
+            return report
+        entry = next((m for m in loaded if self.model in (m.get("name"), m.get("model"))), None)
+        report["state"] = "loaded" if entry else "cold"
+        if entry:
+            report["expires_at"] = entry.get("expires_at")
+        return report
+
+    def acquire(self):
+        """Début d'un run: le modèle est maintenu chargé jusqu'au release() correspondant"""
+        with self._lock:
+            self._active += 1
+
+    def release(self):
+        with self._lock:
+            self._active = max(0, self._active - 1)
+
+    @contextmanager
+    def hold(self):
+        """acquire()/release() autour d'un bloc"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def add_demand(self, source: Callable[[], int]):
+        """Source de demande supplémentaire (ex. nombre de jobs en file ou en cours)"""
+        with self._lock:
+            self._demand.append(source)
+
+    def demand(self) -> int:
+        with self._lock:
+            sources, active = list(self._demand), self._active
+        total = active
+        for source in sources:
+            try:
+                total += int(source())
+            except Exception:
+                continue
+        return total
+
+    def should_ping(self) -> bool:
+        return self.demand() > 0 or bool(self.pin and self.pin.seconds_left(self.clock()))
+
+    def tick(self) -> bool:
+        """Un cycle du thread de fond: ping si nécessaire; retourne True si un ping a été envoyé"""
+        if not self.should_ping():
+            return False
+        if not self.preload():
+            warning(f"Keep-alive Ollama impossible: {self.last_error}", "ollama")
+            return False
+        return True
+
+    def _loop(self):
+        if self.preload():
+            success(f"Modèle {self.model} préchargé en {self.last_load_seconds:.1f}s", "ollama")
+        else:
+            warning(f"Préchargement de {self.model} impossible: {self.last_error}", "ollama")
+        while not self._stop.wait(self.ping_seconds):
+            self.tick()
+
+    def start(self):
+        """Préchargement puis keep-alive en arrière-plan (thread démon)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="lunacore-ollama-warmup", daemon=True)
+            self._thread.start()
+            info(f"🔥 Préchargement de {self.model} en arrière-plan", "ollama")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+_warmups: Dict[Tuple[str, str], OllamaWarmup] = {}
+_warmups_lock = threading.Lock()
+
+
+def get_ollama_warmup(base_url: str, model: str, start: bool = True) -> Optional[OllamaWarmup]:
+    """
+    Gestionnaire partagé par (serveur, modèle), démarré une fois par processus
+
+    LUNACORE_OLLAMA_WARMUP=0 désactive le préchargement (retourne None).
+    """
+    if os.getenv("LUNACORE_OLLAMA_WARMUP", "1") == "0":
+        return None
+    with _warmups_lock:
+        warmup = _warmups.get((base_url, model))
+        if warmup is None:
+            warmup = _warmups[(base_url, model)] = OllamaWarmup.from_env(base_url, model)
+        if start:
+            warmup.start()
+        return warmup
@@ -0,0 +1,229 @@
+"""
+LunaCore Repair
+Réparation ciblée après validation et tests: seuls les fichiers en échec sont régénérés
+"""
+
+import ast
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from lunacore.context_budget import ContextBudget
+from lunacore.logger import info, success, warning
+from lunacore.speculative import extract_code, quick_check
+
+DEFAULT_REPAIR_ROUNDS = 2
+# Plafond de régénérations par run (toutes passes confondues)
+DEFAULT_MAX_GENERATIONS = 12
+# Taille maximale du fichier courant recopié dans le prompt
+MAX_SOURCE_CHARS = 12_000
+
+# "app/models.py:12: in create" (pytest) ou 'File "/.../app/models.py", line 12' (traceback)
+_TRACE_RE = re.compile(r'(?:File "([^"]+\.py)", line (\d+)|([\w./\\-]+\.py):(\d+))')
+
+
+def repair_rounds_from_env() -> int:
+    """LUNACORE_REPAIR_ROUNDS (0 désactive la réparation)"""
+    return int(os.getenv("LUNACORE_REPAIR_ROUNDS", DEFAULT_REPAIR_ROUNDS))
+
+
+def _is_test_file(rel: str) -> bool:
+    name = rel.rsplit("/", 1)[-1]
+    return rel.startswith("tests/") or name.startswith("test_") or name == "conftest.py"
+
+
+def _project_files_in_trace(run_dir: Path, text: str) -> List[str]:
+    """Fichiers du projet cités dans une trace, dans l'ordre d'apparition"""
+    root = Path(run_dir).resolve()
+    found = []
+    for match in _TRACE_RE.finditer(text or ""):
+        raw = (match.group(1) or match.group(3)).replace("\\", "/")
+        path = Path(raw) if Path(raw).is_absolute() else root / raw
+        try:
+            rel = path.resolve().relative_to(root).as_posix()
+        except ValueError:
+            continue  # bibliothèque ou stdlib
+        if (root / rel).is_file() and rel not in found:
+            found.append(rel)
+    return found
+
+
+def _tested_modules(run_dir: Path, test_rel: str, text: str) -> List[str]:
+    """
+    Modules du projet importés par un fichier de tests et mis en cause par l'échec
+
+    Une assertion qui échoue ne laisse dans la trace que le fichier de tests: le code testé
+    est le module local dont un nom importé apparaît dans la trace (code du test compris).
+    """
+    try:
+        tree = ast.parse((Path(run_dir) / test_rel).read_text(encoding="utf-8"))
+    except (OSError, SyntaxError, ValueError):
+        return []
+    imported: Dict[str, List[str]] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            entries = [(node.module, [a.asname or a.name for a in node.names])]
+        elif isinstance(node, ast.Import):
+            entries = [(a.name, [a.asname or a.name.split(".")[-1]]) for a in node.names]
+        else:
+            continue
+        for module, names in entries:
+            base = module.replace(".", "/")
+            for rel in (f"{base}.py", f"{base}/__init__.py"):
+                if (Path(run_dir) / rel).is_file():
+                    imported.setdefault(rel, []).extend(names)
+                    break
+    return sorted(rel for rel, names in imported.items()
+                  if any(re.search(rf"\b{re.escape(name)}\b", text) for name in names))
+
+
+def failing_files(run_dir: Path, validation: Optional[Dict], tests: Optional[Dict]) -> Dict[str, List[str]]:
+    """
+    Associe chaque échec au fichier qui en est la source
+
+    Validation: le fichier en erreur. Tests: le fichier du projet (hors tests) le plus profond
+    de la trace; pour une assertion, le module testé; à défaut, le fichier de tests lui-même.
+    """
+    errors: Dict[str, List[str]] = {}
+    for rel, report in ((validation or {}).get("files") or {}).items():
+        if report.get("status") != "ok":
+            errors.setdefault(rel, []).extend(f"{report['status']}: {e}" for e in report.get("errors", []))
+    for failure in (tests or {}).get("failures") or []:
+        text = f"{failure.get('details', '')}\n{failure.get('message', '')}"
+        cited = _project_files_in_trace(run_dir, text)
+        sources = [rel for rel in cited if not _is_test_file(rel)]
+        if sources:
+            targets = sources[-1:]
+        elif cited:
+            targets = _tested_modules(run_dir, cited[0], text) or cited[:1]
+        else:
+            continue
+        for target in targets:
+            errors.setdefault(target, []).append(
+                f"test {failure['test']} en échec: {failure.get('message', '')}\n{failure.get('details', '')[-1200:]}")
+    return errors
+
+
+class RepairStage:
+    """
+    Boucle de réparation bornée
+
+    À chaque passe: échecs -> fichiers responsables -> une régénération par fichier, par
+    l'agent propriétaire d'après le manifeste d'écriture (testeur pour ses fichiers de tests,
+    développeur sinon), puis nouvelle validation et nouveaux tests. Arrêt quand tout passe,
+    quand une passe ne corrige plus rien ou quand le budget de passes / régénérations est épuisé.
+    """
+
+    def __init__(self, llm_for: Callable[[str], object], persona_for: Callable[[str], str],
+                 owners: Optional[Dict[str, str]] = None, max_rounds: int = DEFAULT_REPAIR_ROUNDS,
+                 max_generations: int = DEFAULT_MAX_GENERATIONS, budget: Optional[ContextBudget] = None,
+                 check: Optional[Callable[[str], None]] = None):
+        self.llm_for = llm_for
+        self.persona_for = persona_for
+        self.owners = owners or {}
+        self.max_rounds = max_rounds
+        self.max_generations = max_generations
+        self.budget = budget
+        self.check = check
+
+    def owner(self, rel: str) -> str:
+        """Agent qui a écrit le fichier (manifeste), développeur par défaut (squelette, inconnu)"""
+        owner = self.owners.get(rel)
+        if owner in ("developer", "tester"):
+            return owner
+        return "tester" if _is_test_file(rel) else "developer"
+
+    def _context(self, run_dir: Path, rel: str) -> str:
+        """Contexte minimal: extraits de plan.json et interfaces utiles au fichier"""
+        try:
+            plan = json.loads((run_dir / "plan.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return ""
+        if self.budget is not None:
+            return self.budget.build(plan, rel, run_dir)["text"]
+        return json.dumps(plan, ensure_ascii=False)[:4000]
+
+    def _messages(self, run_dir: Path, rel: str, errors: List[str], owner: str) -> List[Dict]:
+        try:
+            source = (run_dir / rel).read_text(encoding="utf-8", errors="replace")[:MAX_SOURCE_CHARS]
+        except OSError:
+            source = ""
+        # Consignes fixes en tête (cache de préfixe), puis contexte, fichier et erreurs propres à l'appel
+        return [
+            {"role": "system", "content": self.persona_for(owner)},
+            {"role": "user", "content": (
+                "Un fichier du projet est en échec. Corrige ses erreurs et renvoie son contenu "
+                "COMPLET corrigé, en conservant ses interfaces publiques.\n"
+                "Réponds uniquement avec le code Python dans un bloc ```python```.\n\n"
+                f"Contexte (plan.json et interfaces existantes):\n{self._context(run_dir, rel)}\n\n"
+                f"Fichier en échec: '{rel}'\n\n"
+                f"Contenu actuel:\n```python\n{source}\n```\n\n"
+                "Erreurs:\n" + "\n\n".join(errors)
+            )},
+        ]
+
+    def _regenerate(self, run_dir: Path, rel: str, errors: List[str]) -> Dict:
+        owner = self.owner(rel)
+        attempt = {"owner": owner, "written": False}
+        try:
+            code = extract_code(self.llm_for(owner).call(self._messages(run_dir, rel, errors, owner)))
+        except Exception as e:
+            attempt["reason"] = f"erreur LLM: {e}"
+            return attempt
+        reason = quick_check(code, rel) if rel.endswith(".py") else None
+        if reason is not None:
+            attempt["reason"] = reason
+            return attempt
+        (run_dir / rel).write_text(code, encoding="utf-8")
+        attempt["written"] = True
+        return attempt
+
+    def run(self, run_dir: Path, validate: Callable[[], Dict], verify: Optional[Callable[[], Dict]],
+            validation: Dict, tests: Dict) -> Dict:
+        """
+        Répare run_dir à partir des rapports de validation et de tests
+
+        Returns:
+            {"report": ..., "validation": ..., "tests": ...}: rapport de réparation et derniers rapports
+        """
+        run_dir = Path(run_dir)
+        report = {"status": "clean", "rounds": [], "generations": 0, "files": {}}
+        failing = failing_files(run_dir, validation, tests)
+        if not failing:
+            return {"report": report, "validation": validation, "tests": tests}
+        if self.max_rounds <= 0:
+            report["status"] = "skipped"
+            report["failing"] = sorted(failing)
+            return {"report": report, "validation": validation, "tests": tests}
+
+        for round_index in range(1, self.max_rounds + 1):
+            remaining = self.max_generations - report["generations"]
+            if remaining <= 0:
+                break
+            targets = sorted(failing)[:remaining]
+            info(f"🩹 Réparation passe {round_index}: {len(targets)} fichier(s) sur "
+                 f"{len(failing)} en échec", "repair")
+            for rel in targets:
+                attempt = self._regenerate(run_dir, rel, failing[rel])
+                report["generations"] += 1
+                report["files"].setdefault(rel, []).append(attempt)
+                if self.check is not None:
+                    self.check(attempt["owner"])  # BudgetExceeded remonte à generate_project
+            validation = validate()
+            if verify is not None:
+                tests = verify()
+            previous, failing = failing, failing_files(run_dir, validation, tests)
+            report["rounds"].append({"round": round_index, "targets": targets, "failing_after": sorted(failing)})
+            if not failing or failing == previous:
+                break  # tout passe, ou mêmes erreurs qu'avant la passe
+
+        if not failing:
+            report["status"] = "repaired"
+            success(f"Projet réparé en {report['generations']} régénération(s)", "repair")
+        else:
+            report["status"] = "partial"
+            report["failing"] = sorted(failing)
+            warning(f"Réparation incomplète: {len(failing)} fichier(s) encore en échec", "repair")
+        return {"report": report, "validation": validation, "tests": tests}
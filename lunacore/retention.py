@@ -0,0 +1,244 @@
+"""
+LunaCore Retention
+Politique de rétention et éviction par quota des runs de sandbox/crew_output
+"""
+
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lunacore.export import EXPORT_CACHE_DIR, evict_run_archives
+from lunacore.logger import info, warning
+from lunacore.run_files import RUN_META_DIR
+
+RUNS_ROOT = Path("sandbox/crew_output")
+ACTIVE_MARKER = "ACTIVE"
+PINNED_MARKER = "PINNED"
+# Un marqueur ACTIVE plus vieux que ceci vient d'un processus mort
+STALE_ACTIVE_SECONDS = 24 * 3600
+
+
+@dataclass
+class RetentionPolicy:
+    """Politique de rétention (None = critère désactivé)"""
+
+    max_total_bytes: Optional[int] = None
+    max_age_days: Optional[float] = None
+    keep_last_per_project: Optional[int] = None
+    # Un run modifié récemment n'est jamais évincé, même sans marqueur ACTIVE
+    grace_seconds: float = 600
+    interval_seconds: float = 300
+    # Pause entre deux suppressions pour ne pas saturer le disque
+    pause_between_deletes: float = 0.2
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        def read(name, cast):
+            value = os.getenv(name)
+            return cast(value) if value else None
+        return cls(
+            max_total_bytes=read("LUNACORE_RETENTION_MAX_BYTES", int),
+            max_age_days=read("LUNACORE_RETENTION_MAX_AGE_DAYS", float),
+            keep_last_per_project=read("LUNACORE_RETENTION_KEEP_LAST", int),
+        )
+
+    def is_enabled(self) -> bool:
+        return any(v is not None for v in (self.max_total_bytes, self.max_age_days, self.keep_last_per_project))
+
+
+def _marker(run_dir: Path, name: str) -> Path:
+    return Path(run_dir) / RUN_META_DIR / name
+
+
+def mark_run_active(run_dir: Path):
+    """Signale un run en cours d'écriture (jamais évincé tant que le marqueur existe)"""
+    marker = _marker(run_dir, ACTIVE_MARKER)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text(str(os.getpid()), encoding="utf-8")
+
+
+def clear_run_active(run_dir: Path):
+    marker = _marker(run_dir, ACTIVE_MARKER)
+    if marker.exists():
+        marker.unlink()
+
+
+def pin_run(run_dir: Path, pinned: bool = True):
+    """Épingle (ou désépingle) un run: il n'est alors jamais évincé"""
+    marker = _marker(run_dir, PINNED_MARKER)
+    if pinned:
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+    elif marker.exists():
+        marker.unlink()
+
+
+def is_run_protected(run_dir: Path, grace_seconds: float, now: Optional[float] = None) -> bool:
+    """Run épinglé, en cours d'écriture, ou modifié pendant la période de grâce"""
+    now = now or time.time()
+    if _marker(run_dir, PINNED_MARKER).exists():
+        return True
+    active = _marker(run_dir, ACTIVE_MARKER)
+    if active.exists() and now - active.stat().st_mtime < STALE_ACTIVE_SECONDS:
+        return True
+    try:
+        return now - Path(run_dir).stat().st_mtime < grace_seconds
+    except FileNotFoundError:
+        return True
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for p in Path(path).rglob("*"):
+        try:
+            if p.is_file():
+                total += p.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+class RetentionManager:
+    """
+    Évince les runs selon la politique, du moins récemment consulté au plus récent
+
+    Le catalogue (s'il est fourni) donne tailles, projets et dates d'accès sans parcourir
+    les dossiers; sinon les métadonnées du système de fichiers sont utilisées. Les archives
+    ZIP en cache d'un run évincé sont supprimées avec lui.
+    """
+
+    def __init__(self, policy: RetentionPolicy, root: Path = RUNS_ROOT, catalog=None,
+                 export_dir: Path = EXPORT_CACHE_DIR):
+        self.policy = policy
+        self.root = Path(root)
+        self.catalog = catalog
+        self.export_dir = Path(export_dir)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _inventory(self) -> List[Dict]:
+        runs = []
+        if not self.root.is_dir():
+            return runs
+        for run_dir in self.root.iterdir():
+            if not run_dir.is_dir():
+                continue
+            row = self.catalog.get(run_dir.name) if self.catalog else None
+            stat = run_dir.stat()
+            created = row["created_at"] if row else stat.st_mtime
+            runs.append({
+                "run_id": run_dir.name,
+                "path": run_dir,
+                "project_name": row["project_name"] if row else run_dir.name.rsplit("_", 2)[0],
+                "created_at": created,
+                "last_access": (row.get("accessed_at") if row else None) or created,
+                "bytes": row["total_bytes"] if row and row.get("total_bytes") else _dir_size(run_dir),
+            })
+        return runs
+
+    def plan(self, now: Optional[float] = None) -> List[Dict]:
+        """Calcule les évictions sans rien supprimer (liste de {run_id, path, reason})"""
+        now = now or time.time()
+        policy = self.policy
+        runs = self._inventory()
+        evict: Dict[str, str] = {}
+        candidates = [r for r in runs if not is_run_protected(r["path"], policy.grace_seconds, now)]
+
+        if policy.max_age_days is not None:
+            limit = now - policy.max_age_days * 86400
+            for run in candidates:
+                if run["last_access"] < limit:
+                    evict.setdefault(run["run_id"], "max_age")
+
+        if policy.keep_last_per_project is not None:
+            by_project: Dict[str, List[Dict]] = {}
+            for run in runs:
+                by_project.setdefault(run["project_name"], []).append(run)
+            candidate_ids = {r["run_id"] for r in candidates}
+            for project_runs in by_project.values():
+                project_runs.sort(key=lambda r: r["created_at"], reverse=True)
+                for run in project_runs[policy.keep_last_per_project:]:
+                    if run["run_id"] in candidate_ids:
+                        evict.setdefault(run["run_id"], "keep_last")
+
+        if policy.max_total_bytes is not None:
+            total = sum(r["bytes"] for r in runs if r["run_id"] not in evict)
+            for run in sorted(candidates, key=lambda r: r["last_access"]):
+                if total <= policy.max_total_bytes:
+                    break
+                if run["run_id"] not in evict:
+                    evict[run["run_id"]] = "max_total_bytes"
+                    total -= run["bytes"]
+
+        ordered = sorted((r for r in runs if r["run_id"] in evict), key=lambda r: r["last_access"])
+        return [{"run_id": r["run_id"], "path": r["path"], "bytes": r["bytes"], "reason": evict[r["run_id"]]}
+                for r in ordered]
+
+    def enforce(self) -> List[Dict]:
+        """Applique la politique; chaque run est revérifié juste avant sa suppression"""
+        evicted = []
+        for item in self.plan():
+            if self._stop.is_set():
+                break
+            if is_run_protected(item["path"], self.policy.grace_seconds):
+                continue
+            try:
+                shutil.rmtree(item["path"])
+            except OSError as e:
+                warning(f"Éviction impossible de {item['run_id']}: {e}", "retention")
+                continue
+            evict_run_archives(item["run_id"], self.export_dir)
+            if self.catalog:
+                self.catalog.mark_evicted(item["run_id"])
+            evicted.append(item)
+            time.sleep(self.policy.pause_between_deletes)
+        if evicted:
+            info(f"🧹 {len(evicted)} run(s) évincé(s), {sum(i['bytes'] for i in evicted)} octets libérés", "retention")
+        return evicted
+
+    def _loop(self):
+        # Priorité minimale pour ce thread seulement (Linux: setpriority sur le TID)
+        if hasattr(os, "setpriority") and hasattr(threading, "get_native_id"):
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+            except OSError:
+                pass
+        while not self._stop.wait(self.policy.interval_seconds):
+            try:
+                self.enforce()
+            except Exception as e:
+                warning(f"Rétention: {e}", "retention")
+
+    def start(self):
+        """Démarre la rétention périodique en arrière-plan"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="lunacore-retention", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+_default_manager: Optional[RetentionManager] = None
+_default_manager_lock = threading.Lock()
+
+
+def start_retention_from_env(catalog=None) -> Optional[RetentionManager]:
+    """Démarre (une fois par processus) la rétention configurée par variables d'environnement"""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            policy = RetentionPolicy.from_env()
+            if not policy.is_enabled():
+                return None
+            _default_manager = RetentionManager(policy, catalog=catalog)
+            _default_manager.start()
+            info("Rétention des runs active", "retention")
+        return _default_manager
@@ -0,0 +1,203 @@
+"""
+LunaCore Run Budget
+Budgets de tokens, de coût et de temps par run et par agent, suivis en direct sur les LLM du run
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional
+
+from crewai.hooks import HookAborted
+
+from lunacore.logger import warning
+
+# Prix en USD par million de tokens (entrée, sortie); modèle absent = local, gratuit
+MODEL_PRICES: Dict[str, tuple] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+}
+# Tokens de prompt servis par le cache de préfixe d'OpenAI: facturés à moitié prix
+CACHED_PROMPT_RATIO = 0.5
+# Compteurs de tokens suivis par run et par agent (cached_prompt_tokens inclus dans prompt_tokens)
+USAGE_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens", "cached_prompt_tokens")
+
+
+@dataclass(frozen=True)
+class BudgetLimits:
+    """Plafonds d'un périmètre (run ou agent); None = critère désactivé"""
+
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None  # USD
+    max_seconds: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class BudgetConfig:
+    """Budget d'un template: plafonds du run entier et de chaque agent (clé d'AGENT_TEMPLATES)"""
+
+    run: BudgetLimits = BudgetLimits()
+    agents: Dict[str, BudgetLimits] = field(default_factory=dict)
+
+
+# Budget de référence: API web multi-fichiers (modèles, routes, tests d'intégration)
+_WEB_BUDGET = BudgetConfig(
+    run=BudgetLimits(max_tokens=250_000, max_cost=0.50, max_seconds=45 * 60),
+    agents={
+        "supervisor": BudgetLimits(max_tokens=60_000, max_cost=0.25),
+        "developer": BudgetLimits(max_tokens=150_000, max_seconds=30 * 60),
+        "tester": BudgetLimits(max_tokens=80_000, max_seconds=15 * 60),
+    },
+)
+
+# Pire cas accepté par template (un par scaffold de lunacore.scaffolds); au-delà le run s'arrête,
+# résultats partiels conservés. "default" couvre les templates inconnus
+TEMPLATE_BUDGETS: Dict[str, BudgetConfig] = {
+    "default": _WEB_BUDGET,
+    "fastapi": _WEB_BUDGET,
+    "flask": _WEB_BUDGET,
+    "streamlit": BudgetConfig(
+        run=BudgetLimits(max_tokens=160_000, max_cost=0.35, max_seconds=30 * 60),
+        agents={
+            "supervisor": BudgetLimits(max_tokens=40_000, max_cost=0.15),
+            "developer": BudgetLimits(max_tokens=100_000, max_seconds=20 * 60),
+            "tester": BudgetLimits(max_tokens=50_000, max_seconds=10 * 60),
+        },
+    ),
+    "cli": BudgetConfig(
+        run=BudgetLimits(max_tokens=120_000, max_cost=0.25, max_seconds=25 * 60),
+        agents={
+            "supervisor": BudgetLimits(max_tokens=30_000, max_cost=0.10),
+            "developer": BudgetLimits(max_tokens=70_000, max_seconds=15 * 60),
+            "tester": BudgetLimits(max_tokens=40_000, max_seconds=10 * 60),
+        },
+    ),
+    "library": BudgetConfig(
+        run=BudgetLimits(max_tokens=120_000, max_cost=0.25, max_seconds=25 * 60),
+        agents={
+            "supervisor": BudgetLimits(max_tokens=30_000, max_cost=0.10),
+            "developer": BudgetLimits(max_tokens=70_000, max_seconds=15 * 60),
+            "tester": BudgetLimits(max_tokens=50_000, max_seconds=12 * 60),
+        },
+    ),
+}
+
+
+def budget_for_template(template: str) -> BudgetConfig:
+    """
+    Budget du template, plafonds du run surchargés par l'environnement
+
+    Chaque scaffold a son entrée; un template inconnu (ou None) reçoit "default", dimensionné
+    comme une API web.
+
+    LUNACORE_BUDGET_MAX_TOKENS, LUNACORE_BUDGET_MAX_COST, LUNACORE_BUDGET_MAX_SECONDS
+    (0 désactive le critère).
+    """
+    config = TEMPLATE_BUDGETS.get(template) or TEMPLATE_BUDGETS["default"]
+    overrides = {}
+    for name, cast in (("max_tokens", int), ("max_cost", float), ("max_seconds", float)):
+        value = os.getenv(f"LUNACORE_BUDGET_{name.upper()}")
+        if value:
+            overrides[name] = cast(value) or None
+    return replace(config, run=replace(config.run, **overrides)) if overrides else config
+
+
+def llm_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0) -> float:
+    """Coût en USD d'un volume de tokens pour un modèle (0 pour les modèles locaux)"""
+    price_in, price_out = MODEL_PRICES.get(model.split("/")[-1], (0.0, 0.0))
+    billed_in = prompt_tokens - cached_prompt_tokens * (1 - CACHED_PROMPT_RATIO)
+    return (billed_in * price_in + completion_tokens * price_out) / 1_000_000
+
+
+class BudgetExceeded(HookAborted):
+    """Plafond atteint: arrêt volontaire, non rejoué par les retries des agents CrewAI"""
+
+    def __init__(self, scope: str, metric: str, limit: float, value: float):
+        self.scope = scope
+        self.metric = metric
+        self.limit = limit
+        self.value = value
+        super().__init__(f"Budget dépassé ({scope}): {metric} {value:g} > {limit:g}", source="run_budget")
+
+
+class RunBudget:
+    """
+    Suivi d'un run: tokens lus sur les compteurs des LLM du run (mis à jour à chaque réponse),
+    temps attribué à l'agent actif entre deux points de contrôle
+    """
+
+    def __init__(self, config: BudgetConfig):
+        self.config = config
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._llms: Dict[str, List] = {}
+        self._seconds: Dict[str, float] = {}
+        self._mark = self.started_at
+        self.exceeded: Optional[BudgetExceeded] = None
+
+    def track(self, agent_key: str, llm):
+        """Rattache un LLM (copie propre au run) à un agent; retourne le LLM"""
+        with self._lock:
+            self._llms.setdefault(agent_key, []).append(llm)
+        return llm
+
+    def _agent_usage(self, agent_key: str) -> Dict:
+        usage = dict.fromkeys(USAGE_KEYS, 0)
+        usage["cost"] = 0.0
+        for llm in self._llms.get(agent_key, []):
+            counters = llm.get_token_usage_summary()
+            for key in USAGE_KEYS:
+                usage[key] += getattr(counters, key, 0)
+            usage["cost"] += llm_cost(llm.model, counters.prompt_tokens, counters.completion_tokens,
+                                      getattr(counters, "cached_prompt_tokens", 0))
+        usage["seconds"] = self._seconds.get(agent_key, 0.0)
+        return usage
+
+    def usage(self) -> Dict:
+        """Consommation par agent et totale du run"""
+        with self._lock:
+            agents = {key: self._agent_usage(key) for key in self._llms}
+        total = {metric: sum(a[metric] for a in agents.values())
+                 for metric in USAGE_KEYS + ("cost",)}
+        total["seconds"] = time.monotonic() - self.started_at
+        return {"agents": agents, "run": total}
+
+    def check(self, agent_key: Optional[str] = None):
+        """
+        Point de contrôle (étape ou fin de tâche): attribue le temps écoulé à l'agent
+        puis lève BudgetExceeded si un plafond de l'agent ou du run est dépassé
+        """
+        now = time.monotonic()
+        with self._lock:
+            if agent_key is not None:
+                self._seconds[agent_key] = self._seconds.get(agent_key, 0.0) + now - self._mark
+            self._mark = now
+        usage = self.usage()
+        scopes = [("run", self.config.run, usage["run"])]
+        if agent_key is not None and agent_key in self.config.agents:
+            scopes.insert(0, (agent_key, self.config.agents[agent_key], usage["agents"].get(agent_key, {})))
+        for scope, limits, used in scopes:
+            for metric, limit, value in (("tokens", limits.max_tokens, used.get("total_tokens", 0)),
+                                         ("cost", limits.max_cost, used.get("cost", 0.0)),
+                                         ("seconds", limits.max_seconds, used.get("seconds", 0.0))):
+                if limit is not None and value > limit:
+                    self.exceeded = BudgetExceeded(scope, metric, limit, value)
+                    warning(str(self.exceeded), "budget")
+                    raise self.exceeded
+
+    def report(self) -> Dict:
+        """Plafonds, consommation et éventuel dépassement (pour le résultat du run)"""
+        usage = self.usage()
+        usage["run"]["cost"] = round(usage["run"]["cost"], 6)
+        report = {
+            "limits": {"run": self.config.run.__dict__,
+                       "agents": {key: limits.__dict__ for key, limits in self.config.agents.items()}},
+            "usage": usage,
+            "exceeded": None,
+        }
+        if self.exceeded is not None:
+            report["exceeded"] = {"scope": self.exceeded.scope, "metric": self.exceeded.metric,
+                                  "limit": self.exceeded.limit, "value": round(self.exceeded.value, 4)}
+        return report
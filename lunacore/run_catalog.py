@@ -0,0 +1,230 @@
+"""
+LunaCore Run Catalog
+Catalogue SQLite des runs de sandbox/crew_output (requêtes indexées, sans parcours disque)
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lunacore.logger import info
+from lunacore.run_files import iter_project_files
+
+RUN_CATALOG_FILE = Path("sandbox/run_catalog.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    project_name TEXT NOT NULL,
+    template TEXT,
+    status TEXT NOT NULL,
+    brief TEXT,
+    output_directory TEXT,
+    created_at REAL NOT NULL,
+    duration REAL,
+    file_count INTEGER DEFAULT 0,
+    total_bytes INTEGER DEFAULT 0,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    total_tokens INTEGER DEFAULT 0,
+    cached_prompt_tokens INTEGER DEFAULT 0,
+    validation_status TEXT,
+    tests_status TEXT,
+    error TEXT,
+    accessed_at REAL,
+    evicted_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_project ON runs(project_name, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_template ON runs(template, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_duration ON runs(duration);
+CREATE INDEX IF NOT EXISTS idx_runs_bytes ON runs(total_bytes);
+"""
+
+# Colonnes ajoutées après la première version du schéma (ALTER TABLE si absentes)
+_MIGRATIONS = {"accessed_at": "REAL", "evicted_at": "REAL", "cached_prompt_tokens": "INTEGER DEFAULT 0"}
+
+_COLUMNS = (
+    "run_id", "project_name", "template", "status", "brief", "output_directory", "created_at",
+    "duration", "file_count", "total_bytes", "prompt_tokens", "completion_tokens", "total_tokens",
+    "validation_status", "tests_status", "error", "accessed_at", "evicted_at", "cached_prompt_tokens",
+)
+_ORDERABLE = {"created_at", "duration", "file_count", "total_bytes", "total_tokens", "project_name"}
+_GROUPABLE = {"template", "status", "project_name"}
+
+
+class RunCatalog:
+    """Catalogue des runs (une connexion partagée, protégée par un verrou)"""
+
+    def __init__(self, path: Path = RUN_CATALOG_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+            if existing:
+                for column, kind in _MIGRATIONS.items():
+                    if column not in existing:
+                        self._conn.execute(f"ALTER TABLE runs ADD COLUMN {column} {kind}")
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_accessed ON runs(accessed_at)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, entry: Dict):
+        """Insère ou met à jour un run (les colonnes absentes restent à leur valeur par défaut)"""
+        row = {k: entry.get(k) for k in _COLUMNS if entry.get(k) is not None}
+        placeholders = ", ".join("?" for _ in row)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(row)}) VALUES ({placeholders})",
+                tuple(row.values()),
+            )
+
+    def touch(self, run_id: str):
+        """Met à jour la date de dernier accès (utilisée par l'éviction LRU)"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET accessed_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def mark_evicted(self, run_id: str):
+        """Conserve l'historique d'un run supprimé du disque"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET evicted_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def get(self, run_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return dict(row) if row else None
+
+    def previous_run(self, run_id: str) -> Optional[Dict]:
+        """Run antérieur le plus récent du même brief et template, encore sur disque"""
+        row = self.get(run_id)
+        if row is None:
+            return None
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT * FROM runs WHERE project_name = ? AND template IS ? AND brief IS ? "
+                "AND created_at < ? AND evicted_at IS NULL AND output_directory IS NOT NULL "
+                "ORDER BY created_at DESC LIMIT 1",
+                (row["project_name"], row["template"], row["brief"], row["created_at"]),
+            ).fetchone()
+        return dict(previous) if previous else None
+
+    @staticmethod
+    def _where(project_name=None, template=None, status=None, since=None, until=None):
+        clauses, params = [], []
+        for column, value in (("project_name", project_name), ("template", template), ("status", status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def list_runs(self, project_name: Optional[str] = None, template: Optional[str] = None,
+                  status: Optional[str] = None, since: Optional[float] = None,
+                  until: Optional[float] = None, order_by: str = "created_at",
+                  descending: bool = True, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """Liste filtrée et paginée des runs (filtres et tri servis par les index)"""
+        if order_by not in _ORDERABLE:
+            raise ValueError(f"Tri non supporté: {order_by}")
+        where, params = self._where(project_name, template, status, since, until)
+        sql = (f"SELECT * FROM runs{where} ORDER BY {order_by} {'DESC' if descending else 'ASC'} "
+               f"LIMIT ? OFFSET ?")
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit, offset]).fetchall()
+        return [dict(r) for r in rows]
+
+    def count(self, **filters) -> int:
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM runs{where}", params).fetchone()[0]
+
+    def stats(self, group_by: str = "template", since: Optional[float] = None) -> List[Dict]:
+        """Agrégats pour tableaux de bord: nombre de runs, durée moyenne, octets, tokens (dont cache)"""
+        if group_by not in _GROUPABLE:
+            raise ValueError(f"Regroupement non supporté: {group_by}")
+        where, params = self._where(since=since)
+        sql = (f"SELECT {group_by} AS key, COUNT(*) AS runs, "
+               f"SUM(status = 'success') AS successes, AVG(duration) AS avg_duration, "
+               f"SUM(total_bytes) AS total_bytes, SUM(total_tokens) AS total_tokens, "
+               f"SUM(cached_prompt_tokens) AS cached_prompt_tokens "
+               f"FROM runs{where} GROUP BY {group_by} ORDER BY runs DESC")
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params).fetchall()]
+
+    def backfill(self, root: Path = Path("sandbox/crew_output")) -> int:
+        """Indexe les dossiers de runs existants absents du catalogue (migration ponctuelle)"""
+        root = Path(root)
+        if not root.is_dir():
+            return 0
+        added = 0
+        for run_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+            if self.get(run_dir.name):
+                continue
+            files = iter_project_files(run_dir)
+            project_name = run_dir.name.rsplit("_", 2)[0] if run_dir.name.count("_") >= 2 else run_dir.name
+            self.record({
+                "run_id": run_dir.name,
+                "project_name": project_name,
+                "status": "unknown",
+                "output_directory": str(run_dir),
+                "created_at": run_dir.stat().st_mtime,
+                "file_count": len(files),
+                "total_bytes": sum(f.stat().st_size for f in files),
+            })
+            added += 1
+        if added:
+            info(f"Catalogue: {added} run(s) existant(s) indexé(s)", "catalog")
+        return added
+
+
+def run_entry(run_dir: Optional[Path], project_name: str, template: str, brief: str,
+              started_at: float, result: Dict) -> Dict:
+    """Construit la ligne de catalogue d'un run à partir du dictionnaire de résultat"""
+    files = iter_project_files(run_dir) if run_dir else []
+    usage = result.get("token_usage") or {}
+    return {
+        "run_id": Path(run_dir).name if run_dir else f"{project_name}_{int(started_at)}",
+        "project_name": project_name,
+        "template": template,
+        "status": result.get("status", "unknown"),
+        "brief": brief,
+        "output_directory": str(run_dir) if run_dir else None,
+        "created_at": started_at,
+        "duration": result.get("execution_time"),
+        "file_count": len(files),
+        "total_bytes": sum(f.stat().st_size for f in files),
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage.get("total_tokens", 0),
+        "cached_prompt_tokens": usage.get("cached_prompt_tokens", 0),
+        "validation_status": (result.get("validation") or {}).get("status"),
+        "tests_status": (result.get("tests") or {}).get("status"),
+        "error": result.get("error"),
+    }
+
+
+_default_catalog: Optional[RunCatalog] = None
+_default_catalog_lock = threading.Lock()
+
+
+def get_run_catalog() -> RunCatalog:
+    """Retourne le catalogue global des runs"""
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            _default_catalog = RunCatalog()
+        return _default_catalog
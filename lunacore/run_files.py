@@ -0,0 +1,37 @@
+"""
+LunaCore Run Files
+Parcours des fichiers d'un run_dir (hors métadonnées internes)
+"""
+
+import hashlib
+from pathlib import Path
+from typing import List
+
+# Dossier réservé aux métadonnées LunaCore à l'intérieur d'un run_dir
+RUN_META_DIR = ".lunacore"
+
+
+def iter_project_files(run_dir: Path) -> List[Path]:
+    """Liste triée des fichiers du projet généré (sans le dossier de métadonnées)"""
+    run_dir = Path(run_dir)
+    if not run_dir.is_dir():
+        return []
+    files = []
+    for path in run_dir.rglob("*"):
+        rel = path.relative_to(run_dir)
+        if rel.parts and rel.parts[0] == RUN_META_DIR:
+            continue
+        if path.is_file():
+            files.append(path)
+    return sorted(files, key=lambda p: p.relative_to(run_dir).as_posix())
+
+
+def run_fingerprint(run_dir: Path) -> str:
+    """Empreinte rapide du contenu d'un run (chemins, tailles, mtimes) sans lire les fichiers"""
+    run_dir = Path(run_dir)
+    digest = hashlib.sha256()
+    for path in iter_project_files(run_dir):
+        stat = path.stat()
+        rel = path.relative_to(run_dir).as_posix()
+        digest.update(f"{rel}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
@@ -0,0 +1,106 @@
+"""
+LunaCore Run Manifest
+Manifeste compact d'un run (chemin, taille, sha256) et différences entre deux runs
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from lunacore.run_files import RUN_META_DIR, iter_project_files
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK_BYTES = 1024 * 1024
+# Au-delà, pas de diff unifié (seulement l'indication que le fichier a changé)
+MAX_DIFF_BYTES = 1024 * 1024
+
+
+def file_sha256(path: Path) -> str:
+    """Empreinte sha256 d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(run_dir: Path) -> List[Dict]:
+    """Manifeste trié des fichiers du projet: [{path, size, sha256}]"""
+    run_dir = Path(run_dir)
+    return [{"path": f.relative_to(run_dir).as_posix(), "size": f.stat().st_size, "sha256": file_sha256(f)}
+            for f in iter_project_files(run_dir)]
+
+
+def write_manifest(run_dir: Path, manifest: Optional[List[Dict]] = None) -> List[Dict]:
+    """Calcule (si besoin) et écrit run_dir/.lunacore/manifest.json"""
+    run_dir = Path(run_dir)
+    manifest = build_manifest(run_dir) if manifest is None else manifest
+    path = run_dir / RUN_META_DIR / MANIFEST_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "created_at": time.time(), "files": manifest},
+                              ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+    return manifest
+
+
+def load_manifest(run_dir: Path) -> List[Dict]:
+    """Manifeste écrit en fin de run; recalculé et écrit pour les runs antérieurs ou illisibles"""
+    path = Path(run_dir) / RUN_META_DIR / MANIFEST_NAME
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        if payload.get("version") == MANIFEST_VERSION:
+            return payload["files"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return write_manifest(run_dir)
+
+
+def _read_lines(path: Path) -> Optional[List[str]]:
+    """Lignes d'un fichier texte (None si binaire ou trop volumineux pour un diff)"""
+    if path.stat().st_size > MAX_DIFF_BYTES:
+        return None
+    data = path.read_bytes()
+    if b"\0" in data:
+        return None
+    return data.decode("utf-8", errors="replace").splitlines(keepends=True)
+
+
+def unified_diff(old_dir: Path, new_dir: Path, rel: str, context: int = 3) -> str:
+    """Diff unifié d'un fichier entre deux runs (fichier absent = vide)"""
+    old_path, new_path = Path(old_dir) / rel, Path(new_dir) / rel
+    old_lines = _read_lines(old_path) if old_path.is_file() else []
+    new_lines = _read_lines(new_path) if new_path.is_file() else []
+    if old_lines is None or new_lines is None:
+        return f"Fichiers binaires ou volumineux différents: {rel}\n"
+    return "".join(difflib.unified_diff(old_lines, new_lines, f"a/{rel}", f"b/{rel}", n=context))
+
+
+def diff_runs(old_dir: Path, new_dir: Path, diffs: Iterable[str] = (), context: int = 3) -> Dict:
+    """
+    Fichiers ajoutés, supprimés et modifiés entre deux runs, d'après leurs manifestes
+
+    Seules les empreintes sont comparées: aucun fichier inchangé n'est lu. Les diffs
+    unifiés ne sont calculés que pour les chemins demandés dans diffs (parmi les
+    fichiers ajoutés, supprimés ou modifiés).
+    """
+    old = {entry["path"]: entry for entry in load_manifest(old_dir)}
+    new = {entry["path"]: entry for entry in load_manifest(new_dir)}
+    added = sorted(new.keys() - old.keys())
+    removed = sorted(old.keys() - new.keys())
+    modified = sorted(rel for rel in old.keys() & new.keys() if old[rel]["sha256"] != new[rel]["sha256"])
+    changed = set(added) | set(removed) | set(modified)
+    return {
+        "old": Path(old_dir).name,
+        "new": Path(new_dir).name,
+        "added": [new[rel] for rel in added],
+        "removed": [old[rel] for rel in removed],
+        "modified": [{"path": rel, "old_size": old[rel]["size"], "size": new[rel]["size"]} for rel in modified],
+        "unchanged": len(old.keys() & new.keys()) - len(modified),
+        "diffs": {rel: unified_diff(old_dir, new_dir, rel, context) for rel in diffs if rel in changed},
+    }
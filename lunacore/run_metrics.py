@@ -0,0 +1,251 @@
+"""
+LunaCore Run Metrics
+Échantillonnage des ressources du processus pendant un run (RSS, CPU, threads, descripteurs)
+et détection de fuites sur plusieurs runs consécutifs
+"""
+
+import gc
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from lunacore.logger import info, warning
+from lunacore.run_files import RUN_META_DIR
+
+METRICS_NAME = "metrics.json"
+DEFAULT_INTERVAL = 1.0
+# Seuils de pente (par run, après les runs de chauffe) au-delà desquels une fuite est signalée
+LEAK_RSS_BYTES_PER_RUN = 5 * 1024 * 1024
+LEAK_COUNT_PER_RUN = 0.5
+
+
+def metrics_interval_from_env() -> float:
+    """LUNACORE_METRICS_INTERVAL: secondes entre deux échantillons (0 désactive)"""
+    try:
+        return max(0.0, float(os.getenv("LUNACORE_METRICS_INTERVAL", DEFAULT_INTERVAL)))
+    except ValueError:
+        return DEFAULT_INTERVAL
+
+
+def _open_handles(process) -> Optional[int]:
+    """Descripteurs ouverts (POSIX) ou handles (Windows)"""
+    for name in ("num_fds", "num_handles"):
+        method = getattr(process, name, None)
+        if method is not None:
+            try:
+                return method()
+            except (psutil.Error, OSError):
+                return None
+    return None
+
+
+def process_snapshot(process=None) -> Dict:
+    """Mesure instantanée du processus: RSS (octets), temps CPU (s), threads, descripteurs"""
+    process = process or psutil.Process()
+    with process.oneshot():
+        cpu = process.cpu_times()
+        return {
+            "rss": process.memory_info().rss,
+            "cpu": round(cpu.user + cpu.system, 4),
+            "threads": process.num_threads(),
+            "fds": _open_handles(process),
+        }
+
+
+class ResourceSampler:
+    """
+    Thread d'échantillonnage des ressources du processus pendant un run
+
+    Chaque échantillon est étiqueté avec l'étape du run et l'agent en cours (déduits des
+    événements de progression via observe). Les mesures portent sur tout le processus:
+    des runs concurrents sur une même instance se partagent les mêmes chiffres.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, process=None):
+        self.interval = interval
+        self.samples: List[Dict] = []
+        self.stage: Optional[str] = None
+        self.task: Optional[str] = None
+        self.task_order: List[str] = []
+        self._process = process
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = time.monotonic()
+
+    @property
+    def available(self) -> bool:
+        return psutil is not None and self.interval > 0
+
+    def set_task(self, stage: Optional[str] = None, task: Optional[str] = None):
+        """Étiquette des prochains échantillons (stage inchangé si None)"""
+        with self._lock:
+            if stage is not None:
+                self.stage = stage
+            self.task = task
+
+    def follow(self, roles: List[str]):
+        """Ordre des agents des tâches du crew: le premier est en cours, les suivants à chaque fin de tâche"""
+        self.task_order = list(roles)
+        self.set_task(task=self.task_order[0] if self.task_order else None)
+
+    def observe(self, on_event: Optional[Callable[[Dict], None]]) -> Callable[[Dict], None]:
+        """Callback de progression qui met à jour l'étiquette, puis transmet à on_event"""
+        def on_run_event(event: Dict):
+            kind = event.get("event")
+            if kind == "stage":
+                self.set_task(event.get("stage"))
+            elif kind == "step":
+                self.set_task(task=event.get("agent"))
+            elif kind == "task_completed":
+                index = event.get("index", -1) + 1
+                self.set_task(task=self.task_order[index] if index < len(self.task_order) else None)
+            if on_event is not None:
+                on_event(event)
+        return on_run_event
+
+    def sample(self) -> Optional[Dict]:
+        """Ajoute un échantillon étiqueté (None si psutil est absent ou le processus illisible)"""
+        if psutil is None:
+            return None
+        try:
+            if self._process is None:
+                self._process = psutil.Process()
+            snapshot = process_snapshot(self._process)
+        except (psutil.Error, OSError) as e:
+            warning(f"Échantillon de ressources impossible: {e}", "metrics")
+            return None
+        with self._lock:
+            snapshot.update(t=round(time.monotonic() - self._started, 3), stage=self.stage, task=self.task)
+            self.samples.append(snapshot)
+        return snapshot
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self) -> "ResourceSampler":
+        """Premier échantillon puis thread démon (sans effet si désactivé)"""
+        if not self.available or self._thread is not None:
+            return self
+        self.sample()
+        self._thread = threading.Thread(target=self._loop, name="lunacore-metrics", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Arrête le thread et prend l'échantillon final"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=max(1.0, self.interval * 2))
+        self._thread = None
+        self.sample()
+
+    def summary(self) -> Dict:
+        """Pics, croissance et temps CPU du run, puis répartition par étape/agent"""
+        with self._lock:
+            samples = list(self.samples)
+        if not samples:
+            return {"status": "disabled" if self.interval <= 0 else "unavailable"}
+        first, last = samples[0], samples[-1]
+        per_task: Dict[str, Dict] = {}
+        for previous, current in zip(samples, samples[1:]):
+            label = current["task"] or current["stage"] or "setup"
+            entry = per_task.setdefault(label, {"samples": 0, "cpu": 0.0, "rss_peak": 0})
+            entry["samples"] += 1
+            entry["cpu"] = round(entry["cpu"] + current["cpu"] - previous["cpu"], 4)
+            entry["rss_peak"] = max(entry["rss_peak"], current["rss"])
+        fds = [s["fds"] for s in samples if s["fds"] is not None]
+        return {
+            "status": "ok",
+            "interval": self.interval,
+            "samples": len(samples),
+            "duration": round(last["t"] - first["t"], 3),
+            "rss_start": first["rss"],
+            "rss_end": last["rss"],
+            "rss_peak": max(s["rss"] for s in samples),
+            "rss_growth": last["rss"] - first["rss"],
+            "cpu_seconds": round(last["cpu"] - first["cpu"], 4),
+            "threads_peak": max(s["threads"] for s in samples),
+            "threads_growth": last["threads"] - first["threads"],
+            "fds_peak": max(fds) if fds else None,
+            "fds_growth": fds[-1] - fds[0] if fds else None,
+            "tasks": per_task,
+        }
+
+    def write(self, run_dir: Path) -> Optional[Path]:
+        """Écrit run_dir/.lunacore/metrics.json (résumé et échantillons)"""
+        if not self.samples:
+            return None
+        path = Path(run_dir) / RUN_META_DIR / METRICS_NAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            samples = list(self.samples)
+        payload = {"summary": self.summary(), "samples": samples}
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+
+def _slope(values: List[float]) -> float:
+    """Pente des moindres carrés (variation par run)"""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    num = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    den = sum((x - mean_x) ** 2 for x in range(n))
+    return num / den
+
+
+def leak_check(run: Callable[[int], object], runs: int = 5, warmup: int = 1,
+               rss_per_run: float = LEAK_RSS_BYTES_PER_RUN,
+               count_per_run: float = LEAK_COUNT_PER_RUN) -> Dict:
+    """
+    Exécute run(i) N fois de suite et mesure le processus après chaque run (après gc)
+
+    Les runs de chauffe (caches, pools, singletons créés au premier run) sont exclus; une
+    croissance régulière de la RSS, des threads ou des descripteurs au-delà des seuils par
+    run est signalée comme fuite probable.
+    """
+    if psutil is None:
+        return {"status": "unavailable"}
+    if runs <= warmup + 1:
+        raise ValueError("leak_check: il faut au moins deux runs après la chauffe")
+    process = psutil.Process()
+    snapshots = []
+    for index in range(runs):
+        run(index)
+        gc.collect()
+        snapshots.append(process_snapshot(process))
+        info(f"Run {index + 1}/{runs}: RSS {snapshots[-1]['rss'] / 1e6:.1f} Mo, "
+             f"{snapshots[-1]['threads']} threads, {snapshots[-1]['fds']} descripteurs", "metrics")
+
+    measured = snapshots[warmup:]
+    slopes = {
+        "rss": _slope([s["rss"] for s in measured]),
+        "threads": _slope([s["threads"] for s in measured]),
+        "fds": _slope([s["fds"] for s in measured]) if all(s["fds"] is not None for s in measured) else 0.0,
+    }
+    limits = {"rss": rss_per_run, "threads": count_per_run, "fds": count_per_run}
+    suspects = [name for name, value in slopes.items() if value > limits[name]]
+    if suspects:
+        warning(f"Fuite probable sur {runs - warmup} runs: {', '.join(suspects)}", "metrics")
+    return {
+        "status": "leak" if suspects else "ok",
+        "runs": snapshots,
+        "warmup": warmup,
+        "slopes": {name: round(value, 3) for name, value in slopes.items()},
+        "suspects": suspects,
+    }
@@ -0,0 +1,226 @@
+"""
+LunaCore Scaffolds
+Squelettes précalculés par template, matérialisés dans le run_dir avant le crew
+"""
+
+from pathlib import Path
+from string import Template
+from typing import Dict, List
+
+from lunacore.logger import info
+
+_GITIGNORE = """__pycache__/
+*.py[cod]
+.venv/
+.env
+.pytest_cache/
+"""
+
+_README = """# $project_name
+
+$description
+
+## Installation
+
+```bash
+python -m venv .venv
+pip install -r requirements.txt
+```
+
+## Lancement
+
+```bash
+$run_command
+```
+
+## Tests
+
+```bash
+pytest -q
+```
+"""
+
+_CONFTEST_PATH = """import sys
+from pathlib import Path
+
+# Rend les modules du projet importables depuis les tests
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+"""
+
+# Fichiers par template; $project_name et $package sont substitués (string.Template)
+SCAFFOLDS: Dict[str, Dict[str, str]] = {
+    "fastapi": {
+        "requirements.txt": "fastapi>=0.110\nuvicorn[standard]>=0.29\npydantic>=2.0\npytest>=8.0\nhttpx>=0.27\n",
+        "app/__init__.py": "",
+        "app/main.py": '''"""Point d'entrée FastAPI de $project_name"""
+
+from fastapi import FastAPI
+
+app = FastAPI(title="$project_name")
+
+
+@app.get("/health")
+def health() -> dict:
+    return {"status": "ok"}
+''',
+        "tests/__init__.py": "",
+        "tests/conftest.py": _CONFTEST_PATH + '''
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+''',
+    },
+    "streamlit": {
+        "requirements.txt": "streamlit>=1.32\npytest>=8.0\n",
+        "app.py": '''"""Application Streamlit $project_name"""
+
+import streamlit as st
+
+
+def main():
+    st.set_page_config(page_title="$project_name", layout="wide")
+    st.title("$project_name")
+
+
+if __name__ == "__main__":
+    main()
+''',
+        "tests/__init__.py": "",
+        "tests/conftest.py": _CONFTEST_PATH,
+    },
+    "flask": {
+        "requirements.txt": "flask>=3.0\npytest>=8.0\n",
+        "app/__init__.py": '''"""Application Flask $project_name"""
+
+from flask import Flask
+
+
+def create_app(config: dict = None) -> Flask:
+    app = Flask(__name__)
+    if config:
+        app.config.update(config)
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    return app
+''',
+        "wsgi.py": "from app import create_app\n\napp = create_app()\n",
+        "tests/__init__.py": "",
+        "tests/conftest.py": _CONFTEST_PATH + '''
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture
+def client():
+    app = create_app({"TESTING": True})
+    return app.test_client()
+''',
+    },
+    "cli": {
+        "requirements.txt": "pytest>=8.0\n",
+        "$package/__init__.py": '"""$project_name"""\n\n__version__ = "0.1.0"\n',
+        "$package/cli.py": '''"""Interface ligne de commande de $project_name"""
+
+import argparse
+import sys
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="$project_name")
+    parser.add_argument("--version", action="store_true", help="Affiche la version")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.version:
+        from $package import __version__
+        print(__version__)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+''',
+        "main.py": "import sys\n\nfrom $package.cli import main\n\nif __name__ == \"__main__\":\n    sys.exit(main())\n",
+        "tests/__init__.py": "",
+        "tests/conftest.py": _CONFTEST_PATH,
+    },
+    "library": {
+        "requirements.txt": "pytest>=8.0\n",
+        "pyproject.toml": '''[build-system]
+requires = ["setuptools>=68"]
+build-backend = "setuptools.build_meta"
+
+[project]
+name = "$project_name"
+version = "0.1.0"
+requires-python = ">=3.10"
+''',
+        "$package/__init__.py": '"""$project_name"""\n\n__version__ = "0.1.0"\n',
+        "tests/__init__.py": "",
+        "tests/conftest.py": _CONFTEST_PATH,
+    },
+}
+
+_RUN_COMMANDS = {
+    "fastapi": "uvicorn app.main:app --reload",
+    "streamlit": "streamlit run app.py",
+    "flask": "flask --app wsgi run",
+    "cli": "python main.py --help",
+    "library": "pip install -e .",
+}
+
+
+def materialize_scaffold(template: str, run_dir: Path, project_name: str) -> List[str]:
+    """
+    Écrit le squelette du template dans run_dir (sans écraser un fichier existant)
+
+    Returns:
+        Chemins relatifs des fichiers du squelette, [] pour un template inconnu
+    """
+    files = SCAFFOLDS.get(template)
+    if not files:
+        return []
+    values = {
+        "project_name": project_name,
+        "package": project_name.replace("-", "_"),
+        "description": "Projet généré par LunaCore.",
+        "run_command": _RUN_COMMANDS[template],
+    }
+    all_files = dict(files)
+    all_files.setdefault(".gitignore", _GITIGNORE)
+    all_files.setdefault("README.md", _README)
+
+    written = []
+    run_dir = Path(run_dir)
+    for rel_template, content in all_files.items():
+        rel = Template(rel_template).substitute(values)
+        target = run_dir / rel
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(Template(content).substitute(values), encoding="utf-8")
+        written.append(rel)
+    info(f"🧱 Squelette '{template}': {len(written)} fichier(s) prêts", "scaffold")
+    return sorted(written)
+
+
+def scaffold_note(files: List[str]) -> str:
+    """Consigne de prompt listant les fichiers déjà présents"""
+    if not files:
+        return ""
+    listing = "\n".join(f"  - {f}" for f in files)
+    return (
+        "\n\nFichiers DÉJÀ présents dans le projet (squelette du template, ne pas les régénérer; "
+        "les compléter uniquement si la logique du projet l'exige):\n" + listing
+    )
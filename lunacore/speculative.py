@@ -0,0 +1,192 @@
+"""
+LunaCore Speculative
+Génération spéculative: K candidats concurrents par fichier, le premier valide gagne
+"""
+
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from lunacore.context_budget import ContextBudget
+from lunacore.logger import info, warning
+from lunacore.validation import check_python_source
+
+DEFAULT_TEMPERATURES = (0.2, 0.5, 0.8, 1.0)
+
+_FENCE_RE = re.compile(r"```(?:python|py)?\s*\n(.*?)```", re.DOTALL)
+
+
+def extract_code(text: str) -> str:
+    """Extrait le code d'une réponse LLM (bloc ```python``` le plus long, sinon texte brut)"""
+    blocks = _FENCE_RE.findall(text or "")
+    if blocks:
+        return max(blocks, key=len).strip() + "\n"
+    return (text or "").strip() + "\n"
+
+
+def quick_check(code: str, filename: str) -> Optional[str]:
+    """Vérifications rapides d'un candidat; retourne la raison du rejet ou None"""
+    if not code.strip():
+        return "réponse vide"
+    checked = check_python_source((filename, code.encode("utf-8")))
+    if checked["status"] != "ok":
+        return "; ".join(checked["errors"])
+    stripped = [l.strip() for l in code.splitlines() if l.strip() and not l.strip().startswith("#")]
+    if stripped and all(l in ("pass", "...") for l in stripped):
+        return "squelette vide"
+    return None
+
+
+def first_valid(candidates: Sequence[Callable[[], str]], check: Callable[[str], Optional[str]],
+                timeout: Optional[float] = None) -> Dict:
+    """
+    Lance tous les candidats en parallèle et retient la première réponse valide
+
+    Les candidats pas encore démarrés sont annulés; ceux déjà en vol ne peuvent pas être
+    interrompus côté client, leur réponse est simplement ignorée.
+
+    Returns:
+        {"code", "candidate", "duration", "rejected"}; code vaut None si aucun candidat n'est valide
+    """
+    start = time.time()
+    outcome = {"code": None, "candidate": None, "duration": 0.0, "rejected": []}
+    executor = ThreadPoolExecutor(max_workers=max(1, len(candidates)), thread_name_prefix="lunacore-spec")
+    futures = {executor.submit(fn): idx for idx, fn in enumerate(candidates)}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            idx = futures[future]
+            try:
+                code = extract_code(future.result())
+            except Exception as e:
+                outcome["rejected"].append({"candidate": idx, "reason": f"erreur LLM: {e}"})
+                continue
+            reason = check(code)
+            if reason is None:
+                outcome["code"] = code
+                outcome["candidate"] = idx
+                break
+            outcome["rejected"].append({"candidate": idx, "reason": reason})
+    except TimeoutError:
+        outcome["rejected"].append({"candidate": None, "reason": "timeout"})
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    outcome["duration"] = round(time.time() - start, 3)
+    return outcome
+
+
+def planned_python_files(plan) -> List[str]:
+    """Chemins .py déclarés dans plan.json (hors tests, écrits par le testeur)"""
+    found = set()
+
+    def visit(value):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if isinstance(k, str) and k.endswith(".py"):
+                    found.add(k)
+                visit(v)
+        elif isinstance(value, list):
+            for v in value:
+                visit(v)
+        elif isinstance(value, str):
+            text = value.strip()
+            if text.endswith(".py") and " " not in text:
+                found.add(text)
+
+    visit(plan)
+    files = []
+    for path in sorted(found):
+        path = path.replace("\\", "/").removeprefix("./")
+        name = path.rsplit("/", 1)[-1]
+        if path.startswith("/") or ".." in path.split("/"):
+            continue  # hors du projet: jamais écrit
+        if path.startswith("tests/") or name.startswith("test_") or name == "conftest.py":
+            continue
+        files.append(path)
+    return files
+
+
+class SpeculativeDeveloper:
+    """
+    Étape développeur en mode spéculatif
+
+    Pour chaque fichier du plan, K requêtes partent en parallèle (une par température);
+    la première réponse qui compile et passe les vérifications rapides est écrite.
+    """
+
+    def __init__(self, llm_factory: Callable[[float], object], k: int = 3,
+                 temperatures: Sequence[float] = DEFAULT_TEMPERATURES,
+                 persona: str = "", timeout: Optional[float] = None,
+                 budget: Optional[ContextBudget] = None):
+        self.llm_factory = llm_factory
+        self.k = max(1, k)
+        self.temperatures = [temperatures[i % len(temperatures)] for i in range(self.k)]
+        self.persona = persona
+        self.timeout = timeout
+        self.budget = budget
+        # Un LLM par température, réutilisé d'un fichier à l'autre
+        self._llms = {t: llm_factory(t) for t in set(self.temperatures)}
+
+    def _messages(self, filename: str, brief: str, context: str) -> List[Dict]:
+        # Du plus stable au plus variable (cache de préfixe): consignes, brief du run, contexte, fichier
+        return [
+            {"role": "system", "content": self.persona},
+            {"role": "user", "content": (
+                "Écris le contenu COMPLET du fichier indiqué en fin de message, selon plan.json.\n"
+                "Réponds uniquement avec le code Python dans un bloc ```python```.\n\n"
+                f"Brief du projet:\n'''{brief}'''\n\n"
+                f"Contexte (plan.json et interfaces existantes):\n{context}\n\n"
+                f"Fichier à écrire: '{filename}'"
+            )},
+        ]
+
+    def generate_file(self, filename: str, brief: str, context: str) -> Dict:
+        """Génère un fichier avec K candidats concurrents"""
+        messages = self._messages(filename, brief, context)
+        candidates = [
+            (lambda llm=self._llms[t]: llm.call(messages))
+            for t in self.temperatures
+        ]
+        outcome = first_valid(candidates, lambda code: quick_check(code, filename), self.timeout)
+        if outcome["candidate"] is not None:
+            outcome["temperature"] = self.temperatures[outcome["candidate"]]
+        return outcome
+
+    def develop(self, run_dir: Path, brief: str) -> Dict:
+        """Écrit tous les fichiers Python du plan dans run_dir"""
+        run_dir = Path(run_dir)
+        report = {"status": "ok", "k": self.k, "files": {}}
+        plan_path = run_dir / "plan.json"
+        try:
+            plan = json.loads(plan_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            warning(f"Mode spéculatif: plan.json inexploitable ({e})", "speculative")
+            return {"status": "no_plan", "k": self.k, "files": {}, "error": str(e)}
+
+        plan_text = json.dumps(plan, ensure_ascii=False, indent=2)
+        root = run_dir.resolve()
+        for filename in planned_python_files(plan):
+            target = (run_dir / filename).resolve()
+            if not target.is_relative_to(root):
+                # Lien symbolique ou chemin absolu (Windows) qui sortirait du run
+                report["status"] = "partial"
+                report["files"][filename] = {"status": "rejected", "error": "chemin hors du dossier du run"}
+                warning(f"Mode spéculatif: {filename} hors du dossier du run, ignoré", "speculative")
+                continue
+            context = plan_text
+            if self.budget is not None:
+                # Seules les sections utiles au fichier et les interfaces déjà écrites
+                context = self.budget.build(plan, filename, run_dir)["text"]
+            outcome = self.generate_file(filename, brief, context)
+            if outcome["code"] is not None:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_text(outcome["code"], encoding="utf-8")
+                info(f"⚡ {filename}: candidat {outcome['candidate']} retenu en {outcome['duration']}s", "speculative")
+            else:
+                report["status"] = "partial"
+                warning(f"Aucun candidat valide pour {filename}", "speculative")
+            outcome.pop("code")
+            report["files"][filename] = outcome
+        return report
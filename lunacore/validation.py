@@ -0,0 +1,336 @@
+"""
+LunaCore Validation
+Validation post-run du projet sur disque: syntaxe Python, plan.json et imports
+"""
+
+import ast
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from lunacore.logger import info, warning
+from lunacore.run_files import iter_project_files
+
+VALIDATION_CACHE_FILE = Path("sandbox/.cache/validation.json")
+# Au-delà, les entrées les moins récemment utilisées sont oubliées
+VALIDATION_CACHE_MAX_ENTRIES = 20000
+# En dessous de ce nombre de fichiers à vérifier, le pool coûte plus qu'il ne rapporte
+POOL_THRESHOLD = 8
+
+# Modules dont le nom d'import diffère du nom de distribution pip
+IMPORT_ALIASES = {
+    "yaml": "pyyaml",
+    "PIL": "pillow",
+    "sklearn": "scikit_learn",
+    "cv2": "opencv_python",
+    "bs4": "beautifulsoup4",
+    "dotenv": "python_dotenv",
+    "jwt": "pyjwt",
+    "jose": "python_jose",
+    "dateutil": "python_dateutil",
+}
+# Outils de test toujours disponibles dans l'environnement d'exécution des tests
+TEST_TOOLING = {"pytest"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Pool de processus partagé, créé à la première validation volumineuse
+
+    Jamais de fork: l'hôte (Streamlit, serveur de jobs) a déjà des threads, dont les verrous
+    seraient copiés dans un état incohérent. forkserver si disponible, sinon spawn.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=max(1, min(8, (os.cpu_count() or 2) - 1)),
+                                        mp_context=get_context(method))
+        return _pool
+
+
+def check_python_source(item: Tuple[str, bytes]) -> Dict:
+    """
+    Compile un fichier Python et extrait ses imports
+
+    Fonction pure (dépend uniquement du contenu) pour pouvoir être mise en cache et
+    exécutée dans un processus séparé.
+    """
+    filename, source = item
+    try:
+        tree = compile(source, filename, "exec", flags=ast.PyCF_ONLY_AST, dont_inherit=True)
+        compile(tree, filename, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return {"status": "syntax_error", "errors": [f"ligne {e.lineno}: {e.msg}"], "imports": []}
+    except (ValueError, UnicodeDecodeError) as e:
+        return {"status": "syntax_error", "errors": [str(e)], "imports": []}
+
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append([alias.name, 0, []])
+        elif isinstance(node, ast.ImportFrom):
+            imports.append([node.module or "", node.level, [a.name for a in node.names]])
+    return {"status": "ok", "errors": [], "imports": imports}
+
+
+class ValidationCache:
+    """Cache LRU des résultats de compilation indexé par sha256 du contenu"""
+
+    def __init__(self, path: Path = VALIDATION_CACHE_FILE, max_entries: int = VALIDATION_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Ordre d'insertion = ordre d'utilisation (le plus récent en fin), conservé dans le JSON
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._dirty = False
+        if self.path.exists():
+            try:
+                self._entries = OrderedDict(json.loads(self.path.read_text(encoding="utf-8")))
+                self._evict()
+            except (OSError, ValueError) as e:
+                warning(f"Cache de validation illisible, réinitialisé: {e}", "validation")
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._dirty = True
+
+    def get(self, digest: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                # Nouvel ordre écrit à la prochaine sauvegarde utile (pas de réécriture sur un hit)
+                self._entries.move_to_end(digest)
+            return entry
+
+    def put(self, digest: str, entry: Dict):
+        with self._lock:
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            self._evict()
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self._entries)
+            self._dirty = False
+        # Fichier temporaire unique: plusieurs processus peuvent écrire le même cache
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.path.parent,
+                                         prefix=f"{self.path.stem}.", suffix=".tmp", delete=False) as tmp:
+            tmp.write(payload)
+        try:
+            os.replace(tmp.name, self.path)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+
+
+_default_cache: Optional[ValidationCache] = None
+
+
+def get_validation_cache() -> ValidationCache:
+    """Retourne le cache de validation global"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ValidationCache()
+    return _default_cache
+
+
+def _module_name(rel_path: str) -> str:
+    """app/models/__init__.py -> app.models ; app/main.py -> app.main"""
+    parts = rel_path[:-3].replace("\\", "/").strip("/").split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(p for p in parts if p)
+
+
+def declared_modules(plan) -> Set[str]:
+    """Collecte les modules déclarés dans plan.json (chemins .py et noms pointés, avec leurs paquets)"""
+    modules: Set[str] = set()
+
+    def visit(value, key=None):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if isinstance(k, str) and k.endswith(".py"):
+                    modules.add(_module_name(k))
+                visit(v, k)
+        elif isinstance(value, list):
+            for v in value:
+                visit(v, key)
+        elif isinstance(value, str):
+            text = value.strip()
+            if text.endswith(".py") and " " not in text:
+                modules.add(_module_name(text))
+            elif key in ("module", "modules", "name", "package") and text.replace(".", "").replace("_", "").isalnum():
+                modules.add(text)
+
+    visit(plan)
+    # Chaque paquet parent est implicitement déclaré
+    for module in list(modules):
+        parts = module.split(".")
+        for i in range(1, len(parts)):
+            modules.add(".".join(parts[:i]))
+    modules.discard("")
+    return modules
+
+
+def _requirement_names(run_dir: Path) -> Set[str]:
+    """Noms de distributions listés dans le requirements.txt du projet généré"""
+    req = run_dir / "requirements.txt"
+    names: Set[str] = set()
+    if not req.exists():
+        return names
+    for line in req.read_text(encoding="utf-8", errors="replace").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line or line.startswith("-"):
+            continue
+        for sep in ("[", "=", "<", ">", "!", "~", ";", " "):
+            line = line.split(sep, 1)[0]
+        names.add(line.lower().replace("-", "_"))
+    return names
+
+
+def _resolve_imports(rel_path: str, imports: List, declared: Set[str], local: Set[str],
+                     requirements: Set[str]) -> List[str]:
+    """Retourne les imports non résolus d'un fichier"""
+    problems = []
+    package = _module_name(rel_path).split(".")
+    if not rel_path.endswith("__init__.py"):
+        package = package[:-1]
+
+    for module, level, names in imports:
+        if level:
+            base = package[:len(package) - (level - 1)] if level > 1 else package
+            target = ".".join(base + ([module] if module else []))
+            candidates = [target] + [f"{target}.{n}" if target else n for n in names]
+            if not any(c in declared for c in candidates):
+                problems.append(f"import relatif non déclaré dans plan.json: {'.' * level}{module}")
+            continue
+
+        top = module.split(".")[0]
+        if top in sys.stdlib_module_names or top == "__future__":
+            continue
+        if top in local or top in declared:
+            candidates = [module] + [f"{module}.{n}" for n in names]
+            if not any(c in declared for c in candidates):
+                problems.append(f"module local non déclaré dans plan.json: {module}")
+            continue
+        if top in TEST_TOOLING:
+            continue
+        if IMPORT_ALIASES.get(top, top).lower() not in requirements:
+            problems.append(f"import non résolu: {module}")
+    return problems
+
+
+def validate_run_dir(run_dir: Path, cache: Optional[ValidationCache] = None,
+                     scaffold_files: Optional[List[str]] = None) -> Dict:
+    """
+    Valide tous les fichiers d'un run_dir
+
+    Args:
+        run_dir: Dossier du projet généré
+        cache: Cache par hash de contenu (cache global par défaut)
+        scaffold_files: Fichiers posés par materialize_scaffold, déclarés d'office
+            (le plan n'a pas à relister le squelette du template)
+
+    Returns:
+        Rapport avec le statut global, celui de plan.json et un rapport par fichier
+    """
+    start = time.time()
+    run_dir = Path(run_dir)
+    cache = cache if cache is not None else get_validation_cache()
+
+    report = {
+        "status": "ok",
+        "plan": {"status": "missing"},
+        "files": {},
+        "files_checked": 0,
+        "cache_hits": 0,
+        "errors": 0,
+    }
+
+    # plan.json
+    declared: Set[str] = set()
+    plan_path = run_dir / "plan.json"
+    if plan_path.exists():
+        try:
+            plan = json.loads(plan_path.read_text(encoding="utf-8"))
+            declared = declared_modules(plan)
+            report["plan"] = {"status": "ok", "declared_modules": len(declared)}
+        except ValueError as e:
+            report["plan"] = {"status": "invalid_json", "error": str(e)}
+            report["errors"] += 1
+    else:
+        report["errors"] += 1
+    declared |= declared_modules([rel for rel in scaffold_files or [] if rel.endswith(".py")])
+
+    # Fichiers Python: les contenus déjà vus viennent du cache, le reste part au pool
+    py_files = [p for p in iter_project_files(run_dir) if p.suffix == ".py"]
+    results: Dict[str, Dict] = {}
+    pending: List[Tuple[str, str, bytes]] = []
+    for path in py_files:
+        rel = path.relative_to(run_dir).as_posix()
+        source = path.read_bytes()
+        digest = hashlib.sha256(source).hexdigest()
+        cached = cache.get(digest)
+        if cached is not None:
+            results[rel] = dict(cached, cached=True)
+            report["cache_hits"] += 1
+        else:
+            pending.append((rel, digest, source))
+
+    if pending:
+        items = [(rel, source) for rel, _, source in pending]
+        if len(pending) >= POOL_THRESHOLD:
+            chunksize = max(1, len(items) // 32)
+            checked = list(_get_pool().map(check_python_source, items, chunksize=chunksize))
+        else:
+            checked = [check_python_source(item) for item in items]
+        for (rel, digest, _), entry in zip(pending, checked):
+            cache.put(digest, entry)
+            results[rel] = dict(entry, cached=False)
+        cache.save()
+
+    local = {p.relative_to(run_dir).parts[0].removesuffix(".py") for p in py_files}
+    requirements = _requirement_names(run_dir)
+    check_imports = report["plan"]["status"] == "ok"
+
+    for rel, entry in sorted(results.items()):
+        file_report = {"status": entry["status"], "errors": list(entry["errors"]), "cached": entry["cached"]}
+        if entry["status"] == "ok" and check_imports:
+            problems = _resolve_imports(rel, entry["imports"], declared, local, requirements)
+            if problems:
+                file_report["status"] = "import_error"
+                file_report["errors"].extend(problems)
+        if file_report["status"] != "ok":
+            report["errors"] += 1
+        report["files"][rel] = file_report
+
+    report["files_checked"] = len(results)
+    report["duration"] = round(time.time() - start, 3)
+    if report["errors"]:
+        report["status"] = "error"
+        warning(f"Validation: {report['errors']} problème(s) sur {len(results)} fichier(s)", "validation")
+    else:
+        info(f"Validation OK: {len(results)} fichier(s) en {report['duration']}s", "validation")
+    return report
@@ -0,0 +1,276 @@
+"""
+LunaCore Verification
+Exécution isolée et parallèle des suites pytest générées
+"""
+
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lunacore.logger import info, warning
+from lunacore.run_files import RUN_META_DIR
+
+try:
+    import resource
+except ImportError:  # Windows: seules les limites de temps réel s'appliquent
+    resource = None
+
+# Variables d'environnement transmises aux sous-processus (pas de clés API, pas de HOME réel)
+_ENV_WHITELIST = ("PATH", "SYSTEMROOT", "TEMP", "TMP", "TMPDIR", "LANG", "LC_ALL")
+
+# Lanceur exécuté dans l'enfant: applique les rlimits puis remplace le processus par pytest.
+# Pas de preexec_fn, qui n'est pas sûr dans un hôte multithread (Streamlit, serveur de jobs).
+_LIMITS_LAUNCHER = """
+import os, resource, sys
+cpu, memory = int(sys.argv[1]), int(sys.argv[2])
+resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+try:
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+except (ValueError, OSError):
+    pass
+os.execv(sys.executable, [sys.executable] + sys.argv[3:])
+"""
+
+
+# ModuleNotFoundError dans la sortie pytest (collecte, conftest ou exécution)
+_MISSING_MODULE_RE = re.compile(r"No module named '([\w.]+)'")
+
+
+@dataclass
+class TestLimits:
+    """Limites appliquées à chaque shard pytest"""
+    __test__ = False  # pas une classe de test pour pytest
+
+    cpu_seconds: int = 60
+    memory_mb: int = 1024
+    wall_seconds: int = 120
+
+
+def collect_test_files(run_dir: Path) -> List[Path]:
+    """Fichiers de tests pytest du projet généré"""
+    run_dir = Path(run_dir)
+    files = set()
+    for pattern in ("test_*.py", "*_test.py"):
+        for path in run_dir.rglob(pattern):
+            rel = path.relative_to(run_dir)
+            if rel.parts[0] != RUN_META_DIR and path.is_file():
+                files.add(path)
+    return sorted(files)
+
+
+def shard_files(files: List[Path], shards: int) -> List[List[Path]]:
+    """Répartit les fichiers en shards équilibrés par taille (plus gros d'abord)"""
+    shards = max(1, min(shards, len(files)))
+    buckets: List[List[Path]] = [[] for _ in range(shards)]
+    weights = [0] * shards
+    for path in sorted(files, key=lambda p: p.stat().st_size, reverse=True):
+        idx = weights.index(min(weights))
+        buckets[idx].append(path)
+        weights[idx] += path.stat().st_size
+    return [b for b in buckets if b]
+
+
+def _limited_command(args: List[str], limits: TestLimits) -> List[str]:
+    """Commande Python précédée du lanceur qui applique les rlimits (POSIX)"""
+    if resource is None:
+        return [sys.executable, *args]
+    return [sys.executable, "-c", _LIMITS_LAUNCHER, str(limits.cpu_seconds),
+            str(limits.memory_mb * 1024 * 1024), *args]
+
+
+def _isolated_env(run_dir: Path, home: Path) -> Dict[str, str]:
+    env = {k: os.environ[k] for k in _ENV_WHITELIST if k in os.environ}
+    # Dossier personnel jetable: les tests générés ne voient ni ~/.ssh ni les configs réelles
+    env["HOME"] = env["USERPROFILE"] = str(home)
+    env["PYTHONPATH"] = str(run_dir)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    env["PYTHONHASHSEED"] = "0"
+    return env
+
+
+def missing_modules(run_dir: Path, output: str) -> List[str]:
+    """
+    Dépendances absentes de l'interpréteur (ModuleNotFoundError) citées dans une sortie pytest
+
+    Seuls les modules tiers comptent: un module du projet introuvable (fichier ou paquet
+    de premier niveau présent dans run_dir) est un défaut du code généré, pas une dépendance.
+    """
+    missing = set()
+    for name in _MISSING_MODULE_RE.findall(output):
+        top = name.split(".")[0]
+        if not ((Path(run_dir) / top).is_dir() or (Path(run_dir) / f"{top}.py").is_file()):
+            missing.add(top)
+    return sorted(missing)
+
+
+def _parse_junit(xml_path: Path) -> Dict:
+    counts = {"passed": 0, "failed": 0, "errors": 0, "skipped": 0, "failures": []}
+    root = ET.parse(xml_path).getroot()
+    for case in root.iter("testcase"):
+        nodeid = f"{case.get('classname', '')}::{case.get('name', '')}"
+        outcome = "passed"
+        for child in case:
+            if child.tag in ("failure", "error"):
+                outcome = "failed" if child.tag == "failure" else "errors"
+                counts["failures"].append({
+                    "test": nodeid,
+                    "file": case.get("file"),
+                    "message": (child.get("message") or "")[:500],
+                    "details": (child.text or "")[-2000:],
+                })
+                break
+            if child.tag == "skipped":
+                outcome = "skipped"
+        counts[outcome] += 1
+    return counts
+
+
+def run_shard(run_dir: Path, files: List[Path], shard_id: int, limits: TestLimits) -> Dict:
+    """Exécute un shard pytest dans un sous-processus isolé et limité"""
+    run_dir = Path(run_dir).resolve()
+    report_dir = run_dir / RUN_META_DIR / "tests"
+    report_dir.mkdir(parents=True, exist_ok=True)
+    xml_path = report_dir / f"shard_{shard_id}.xml"
+    if xml_path.exists():
+        xml_path.unlink()
+
+    cmd = _limited_command([
+        "-m", "pytest", "-q", "-p", "no:cacheprovider",
+        f"--junitxml={xml_path}",
+        *[str(f.resolve().relative_to(run_dir)) for f in files],
+    ], limits)
+    start = time.time()
+    shard = {"shard": shard_id, "files": [f.resolve().relative_to(run_dir).as_posix() for f in files]}
+    with tempfile.TemporaryDirectory(prefix="lunacore-home-") as home:
+        proc = subprocess.Popen(
+            cmd,
+            cwd=run_dir,
+            env=_isolated_env(run_dir, Path(home)),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        try:
+            output, _ = proc.communicate(timeout=limits.wall_seconds)
+            shard["returncode"] = proc.returncode
+            shard["status"] = "completed"
+        except subprocess.TimeoutExpired:
+            if resource is not None:
+                os.killpg(proc.pid, signal.SIGKILL)
+            else:
+                proc.kill()
+            output, _ = proc.communicate()
+            shard["returncode"] = proc.returncode
+            shard["status"] = "timeout"
+    shard["duration"] = round(time.time() - start, 3)
+    text = output.decode("utf-8", errors="replace")
+    shard["output_tail"] = text[-2000:]
+
+    if xml_path.exists():
+        try:
+            shard.update(_parse_junit(xml_path))
+        except ET.ParseError as e:
+            warning(f"Rapport JUnit illisible ({xml_path}): {e}", "tests")
+    # Sortie complète: un conftest qui n'importe pas arrête pytest sans rapport JUnit
+    shard["missing_modules"] = missing_modules(run_dir, text)
+    return shard
+
+
+class VerificationPool:
+    """
+    Pool partagé d'exécution des tests générés
+
+    Les shards de plusieurs runs s'exécutent sur les mêmes workers; chaque run est
+    coordonné par un thread séparé pour ne jamais bloquer un worker en attente.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, limits: Optional[TestLimits] = None):
+        self.max_workers = max_workers or max(1, min(4, os.cpu_count() or 1))
+        self.limits = limits or TestLimits()
+        self._shard_executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="lunacore-tests")
+        self._run_executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="lunacore-verify")
+
+    def verify(self, run_dir: Path, shards: Optional[int] = None) -> Dict:
+        """Exécute la suite de tests d'un run et retourne le rapport agrégé"""
+        start = time.time()
+        run_dir = Path(run_dir)
+        files = collect_test_files(run_dir)
+        report = {
+            "status": "no_tests",
+            "passed": 0, "failed": 0, "errors": 0, "skipped": 0,
+            "duration": 0.0,
+            "shards": [],
+            "failures": [],
+        }
+        if not files:
+            return report
+
+        futures = [
+            self._shard_executor.submit(run_shard, run_dir, group, idx, self.limits)
+            for idx, group in enumerate(shard_files(files, shards or self.max_workers))
+        ]
+        missing = set()
+        for future in futures:
+            shard = future.result()
+            for key in ("passed", "failed", "errors", "skipped"):
+                report[key] += shard.get(key, 0)
+            report["failures"].extend(shard.pop("failures", []))
+            missing.update(shard["missing_modules"])
+            report["shards"].append(shard)
+        if missing:
+            # Environnement incomplet: ces échecs ne sont pas à réparer dans le code généré
+            report["missing_modules"] = sorted(missing)
+            report["failures"] = [f for f in report["failures"]
+                                  if not set(missing_modules(run_dir, f["message"] + f["details"])) & missing]
+
+        total = report["passed"] + report["failed"] + report["errors"]
+        if any(s["status"] == "timeout" for s in report["shards"]):
+            report["status"] = "timeout"
+        elif missing:
+            report["status"] = "missing_dependencies"
+            warning(f"Tests générés non exécutables: dépendance(s) absente(s) {', '.join(sorted(missing))}", "tests")
+        elif report["failed"] or report["errors"]:
+            report["status"] = "failed"
+        elif total == 0 and all(s.get("returncode") == 5 for s in report["shards"]):
+            report["status"] = "no_tests"
+        elif total == 0 or any(s.get("returncode") not in (0, 5) for s in report["shards"]):
+            # Pas de rapport exploitable (crash, rlimit, collecte impossible)
+            report["status"] = "error"
+        else:
+            report["status"] = "passed"
+        report["duration"] = round(time.time() - start, 3)
+        info(f"🧪 Tests générés: {report['status']} ({report['passed']} ok, "
+             f"{report['failed']} échecs, {report['errors']} erreurs) en {report['duration']}s", "tests")
+        return report
+
+    def submit(self, run_dir: Path, shards: Optional[int] = None) -> Future:
+        """Planifie la vérification d'un run sans bloquer l'appelant"""
+        return self._run_executor.submit(self.verify, run_dir, shards)
+
+    def shutdown(self, wait: bool = True):
+        self._run_executor.shutdown(wait=wait)
+        self._shard_executor.shutdown(wait=wait)
+
+
+_default_pool: Optional[VerificationPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_verification_pool() -> VerificationPool:
+    """Retourne le pool de vérification global du processus"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = VerificationPool()
+        return _default_pool
@@ -0,0 +1,179 @@
+"""
+Outils partagés des tests de génération hors ligne
+LunaCrewSystem sans index de briefs ni catalogue global, sandbox temporaire, kickoff et LLM scriptés
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+from crewai.llms.base_llm import BaseLLM
+
+import lunacore.brief_index as brief_index
+import lunacore.crew_system as crew_system
+import lunacore.run_catalog as run_catalog
+import lunacore.validation as validation
+from lunacore.crew_system import LunaCrewSystem
+
+# Fichier écrit par chaque agent d'un projet minimal (rôle -> (chemin, contenu))
+FILES = {
+    "Superviseur": ("plan.json", json.dumps({"files": ["app/calc.py", "tests/test_calc.py"]})),
+    "Développeur": ("app/calc.py", "def add(a, b):\n    return a + b\n"),
+    "Testeur": ("tests/test_calc.py", "from app.calc import add\n\n\ndef test_add():\n    assert add(2, 3) == 5\n"),
+}
+
+
+# Clé factice: les LLM scriptés ou rejoués n'appellent jamais le réseau
+OFFLINE_OPENAI_KEY = "sk-test-hors-ligne"
+# Échanges LLM enregistrés des tests de bout en bout (<nom du test>.jsonl.gz)
+CASSETTE_DIR = Path(__file__).resolve().parent / "cassettes"
+
+
+@contextmanager
+def environ(**values: Optional[str]):
+    """Variables d'environnement le temps du bloc (None = absente), puis valeurs d'origine"""
+    previous = {name: os.environ.get(name) for name in values}
+    try:
+        for name, value in values.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@contextmanager
+def isolated_sandbox():
+    """
+    Exécute le bloc dans un dossier temporaire: sandbox/ (runs, caches) y est créé puis supprimé
+
+    Le catalogue, l'index de briefs et le cache de validation globaux sont neufs dans le bloc
+    puis restaurés: créer le LunaCrewSystem dans le bloc. Les chemins de run renvoyés par
+    generate_project sont relatifs: les lire dans le bloc. OPENAI_API_KEY vaut une clé factice
+    dans le bloc si elle est absente, et n'est jamais modifiée hors du bloc.
+    """
+    previous = os.getcwd()
+    singletons = (run_catalog._default_catalog, brief_index._default_index, validation._default_cache)
+    key = os.environ.get("OPENAI_API_KEY") or OFFLINE_OPENAI_KEY
+    with tempfile.TemporaryDirectory() as tmp, environ(OPENAI_API_KEY=key):
+        os.chdir(tmp)
+        run_catalog._default_catalog = brief_index._default_index = validation._default_cache = None
+        try:
+            yield Path(tmp)
+        finally:
+            if run_catalog._default_catalog is not None:
+                run_catalog._default_catalog.close()
+            run_catalog._default_catalog, brief_index._default_index, validation._default_cache = singletons
+            os.chdir(previous)
+
+
+@contextmanager
+def recorded_generation(name: str):
+    """
+    Génération de bout en bout dans une sandbox isolée, LLM rejoués depuis cassettes/<name>.jsonl.gz
+
+    Rejeu strict par défaut (ni clé OpenAI ni Ollama, toute requête différente échoue);
+    test ignoré si la cassette manque. LUNACORE_CASSETTE=record la réenregistre contre les
+    services réels (clé OpenAI et Ollama nécessaires).
+    """
+    cassette = CASSETTE_DIR / f"{name}.jsonl.gz"
+    mode = os.getenv("LUNACORE_CASSETTE") or "replay"
+    if mode == "replay" and not cassette.is_file():
+        pytest.skip(f"cassette absente: {cassette} (LUNACORE_CASSETTE=record pour l'enregistrer)")
+    strict = "1" if mode == "replay" else None
+    with isolated_sandbox() as root, environ(LUNACORE_CASSETTE=mode, LUNACORE_CASSETTE_PATH=str(cassette),
+                                             LUNACORE_CASSETTE_STRICT=strict):
+        yield root
+
+
+def assert_generated(result: Dict, required: set):
+    """Run réussi: fichiers attendus, manifeste conforme aux contenus, cassette sans écart"""
+    assert result["status"] == "success", result.get("error")
+    assert required <= set(result["files"]), sorted(result["files"])
+    assert [e["path"] for e in result["manifest"]] == sorted(result["files"])
+    for entry in result["manifest"]:
+        content = result["files"][entry["path"]].encode("utf-8")
+        assert entry["size"] == len(content) and entry["sha256"] == hashlib.sha256(content).hexdigest()
+    assert result["validation"]["status"] == "ok", result["validation"]
+    assert result["tests"]["status"] == "passed", result["tests"]
+    if result["cassette"]["mode"] == "replay":
+        assert result["cassette"]["mismatches"] == 0
+        assert result["cassette"]["calls"] == result["cassette"]["recorded"], "cassette rejouée en entier"
+
+
+def offline_system(catalog=None) -> LunaCrewSystem:
+    """
+    LunaCrewSystem de test: toujours un plan neuf, aucun ajout à l'index de briefs
+
+    Les runs ne sont inscrits que dans catalog (RunCatalog du test), jamais dans le catalogue global.
+    """
+    system = LunaCrewSystem()
+    system._apply_prior_plan = lambda *args: {"mode": "fresh"}
+    system._index_plan = lambda *args: None
+    if catalog is None:
+        system._record_run = lambda *args: None
+    else:
+        system._record_run = lambda *args: catalog.record(crew_system.run_entry(*args))
+    return system
+
+
+@contextmanager
+def patched_kickoff(kickoff):
+    """Remplace Crew.kickoff le temps du bloc"""
+    original = crew_system.Crew.kickoff
+    crew_system.Crew.kickoff = kickoff
+    try:
+        yield
+    finally:
+        crew_system.Crew.kickoff = original
+
+
+def write_file(agent, filename: str, content: str):
+    """Écrit un fichier via le write_file propre au run de l'agent"""
+    tool = next(t for t in agent.tools if t.name == "write_file")
+    return tool.run(filename=filename, content=content)
+
+
+def write_action(filename: str, content: str) -> str:
+    """Réponse ReAct qui appelle write_file"""
+    return ("Thought: j'écris le fichier\nAction: write_file\n"
+            f"Action Input: {json.dumps({'filename': filename, 'content': content})}")
+
+
+class ScriptedLLM(BaseLLM):
+    """
+    LLM scripté: écrit le fichier de FILES correspondant au rôle de l'agent (prompt système)
+
+    Les sous-classes surchargent record pour simuler latence, tokens ou cache du fournisseur.
+    Les compteurs d'un test vivent hors du modèle (pydantic copie ses champs).
+    """
+
+    def record(self, messages):
+        """Appelé avant chaque réponse"""
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.record(messages)
+        role = next(r for r in FILES if r in messages[0]["content"])
+        return write_action(*FILES[role])
+
+    def supports_function_calling(self):
+        return False
+
+
+def generate(system: LunaCrewSystem, brief: str = "Calculatrice simple", **kwargs):
+    """generate_project minimal: projet libre, sans tests, mémoire ni réparation"""
+    options = dict(template="custom", run_tests=False, memory_mode="off", repair_rounds=0)
+    options.update(kwargs)
+    return system.generate_project(brief, **options)
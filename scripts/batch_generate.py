@@ -0,0 +1,47 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so 'lunacore' package can be imported when the
+# script is executed from the scripts/ folder.
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from lunacore.batch import load_briefs, run_batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère un lot de projets à partir de briefs JSONL")
+    parser.add_argument("briefs", help="Fichier JSONL: une ligne {\"brief\": ..., \"template\": ..., \"id\": ...} par projet")
+    parser.add_argument("-o", "--output", default="sandbox/batch_results.jsonl",
+                        help="Résultats JSONL (reprise: les briefs déjà présents sont sautés)")
+    parser.add_argument("-c", "--concurrency", type=int, default=2, help="Briefs traités en parallèle")
+    parser.add_argument("--limit", type=int, help="Traiter au plus N briefs du fichier")
+    parser.add_argument("--no-tests", action="store_true", help="Ne pas exécuter les tests générés")
+    parser.add_argument("--memory-mode", choices=["off", "ephemeral", "persistent"])
+    parser.add_argument("--speculative-k", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    items = load_briefs(Path(args.briefs))
+    if args.limit:
+        items = items[:args.limit]
+
+    from lunacore.crew_system import LunaCrewSystem
+
+    # Un seul système pour tout le lot (LLM, agents et pools initialisés une fois)
+    system = LunaCrewSystem()
+    summary = run_batch(
+        system, items, Path(args.output), concurrency=args.concurrency,
+        generate_kwargs={"run_tests": not args.no_tests, "memory_mode": args.memory_mode,
+                         "speculative_k": args.speculative_k},
+    )
+    print(json.dumps(summary, indent=2))
+    print(f"succès: {summary['success_rate']:.0%}  débit: {summary['throughput_per_min']:.2f}/min  "
+          f"latence p50/p90/p99: {summary['latency_p50']:.1f}s / {summary['latency_p90']:.1f}s / "
+          f"{summary['latency_p99']:.1f}s  sautés: {summary['skipped']}")
+    return 0 if summary["processed"] == summary["succeeded"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
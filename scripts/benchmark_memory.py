@@ -0,0 +1,121 @@
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path so 'lunacore' package can be imported when the
+# script is executed from the scripts/ folder.
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from lunacore.crew_memory import MEMORY_MODES, BoundedMemoryStore, build_crew_memory
+
+PROJECTS = ["blog", "boutique", "agenda", "meteo", "quiz", "budget", "recettes", "bibliotheque"]
+RESOURCES = ["articles", "utilisateurs", "commandes", "produits", "evenements", "notes", "favoris", "paiements"]
+
+
+def _corpus():
+    """Faits de type sorties de tâches et requêtes dont la réponse attendue est connue"""
+    facts, queries = [], []
+    for project in PROJECTS:
+        for resource in RESOURCES:
+            fact = (f"Projet {project}: l'endpoint /{resource} est défini dans "
+                    f"app/routes/{project}_{resource}.py avec le modèle {resource.capitalize()}")
+            facts.append(fact)
+            queries.append((f"fichier de l'endpoint {resource} du projet {project}", fact))
+    return facts, queries
+
+
+def _store_for(mode, tmp, max_records):
+    if mode == "persistent":
+        return BoundedMemoryStore(Path(tmp) / "memory.sqlite3", max_records=max_records)
+    if mode == "ephemeral":
+        return BoundedMemoryStore(max_records=max_records)
+    return None
+
+
+def bench_offline(max_records, n_queries, seed):
+    """Ingestion et rappel (recherche directe, sans LLM) pour chaque mode"""
+    facts, queries = _corpus()
+    sample = random.Random(seed).sample(queries, min(n_queries, len(queries)))
+    rows = []
+    for mode in MEMORY_MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = _store_for(mode, tmp, max_records)
+            # Pas de consolidation (appel LLM) entre faits proches: seul le stockage est mesuré
+            memory = build_crew_memory(mode, store=store, consolidation_threshold=1.0)
+            start = time.perf_counter()
+            if memory is not None:
+                for fact in facts:
+                    memory.remember(fact, scope="/bench", categories=["code"], importance=0.5)
+            ingest = time.perf_counter() - start
+
+            latencies, top1, top3 = [], 0, 0
+            for query, expected in sample:
+                start = time.perf_counter()
+                matches = memory.recall(query, limit=3, depth="shallow") if memory is not None else []
+                latencies.append(time.perf_counter() - start)
+                contents = [m.record.content for m in matches]
+                top1 += bool(contents) and contents[0] == expected
+                top3 += expected in contents
+            records = len(store) if store is not None else 0
+            if memory is not None:
+                memory.close()
+            rows.append({
+                "mode": mode,
+                "ingest_s": ingest,
+                "recall_ms": statistics.median(latencies) * 1000,
+                "top1": top1 / len(sample),
+                "top3": top3 / len(sample),
+                "records": records,
+            })
+    return rows
+
+
+def bench_live(brief, template, modes):
+    """Génération complète par mode (nécessite les LLM configurés)"""
+    from lunacore.crew_system import LunaCrewSystem
+
+    system = LunaCrewSystem()
+    rows = []
+    for mode in modes:
+        result = system.generate_project(brief, template=template, run_tests=True, memory_mode=mode)
+        rows.append({
+            "mode": mode,
+            "status": result["status"],
+            "execution_time": result.get("execution_time", 0),
+            "validation": (result.get("validation") or {}).get("status"),
+            "tests": (result.get("tests") or {}).get("status"),
+            "tokens": (result.get("token_usage") or {}).get("total_tokens", 0),
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare les modes de mémoire du crew (temps et précision)")
+    parser.add_argument("--max-records", type=int, default=2000, help="Plafond du store (éviction LRU)")
+    parser.add_argument("--queries", type=int, default=40, help="Nombre de requêtes de rappel")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--live", metavar="BRIEF", help="Lancer aussi une génération complète par mode")
+    parser.add_argument("--template", default="fastapi")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<12} {'ingestion':>10} {'rappel p50':>11} {'top-1':>7} {'top-3':>7} {'souvenirs':>10}")
+    for row in bench_offline(args.max_records, args.queries, args.seed):
+        print(f"{row['mode']:<12} {row['ingest_s']:>9.2f}s {row['recall_ms']:>9.2f}ms "
+              f"{row['top1']:>7.0%} {row['top3']:>7.0%} {row['records']:>10}")
+
+    if args.live:
+        print()
+        print(f"{'mode':<12} {'statut':<8} {'durée':>8} {'validation':<10} {'tests':<9} {'tokens':>8}")
+        for row in bench_live(args.live, args.template, MEMORY_MODES):
+            print(f"{row['mode']:<12} {row['status']:<8} {row['execution_time']:>7.1f}s "
+                  f"{row['validation'] or '-':<10} {row['tests'] or '-':<9} {row['tokens']:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
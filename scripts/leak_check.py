@@ -0,0 +1,48 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so 'lunacore' package can be imported when the
+# script is executed from the scripts/ folder.
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from lunacore.run_metrics import LEAK_COUNT_PER_RUN, LEAK_RSS_BYTES_PER_RUN, leak_check
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Détecte une croissance mémoire/threads/descripteurs sur N runs d'un même LunaCrewSystem")
+    parser.add_argument("brief", help="Brief généré à chaque run (nécessite les LLM configurés)")
+    parser.add_argument("--template", default="fastapi")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1, help="Runs initiaux exclus (caches, pools)")
+    parser.add_argument("--rss-mb", type=float, default=LEAK_RSS_BYTES_PER_RUN / (1024 * 1024),
+                        help="Croissance RSS tolérée par run (Mo)")
+    parser.add_argument("--count", type=float, default=LEAK_COUNT_PER_RUN,
+                        help="Croissance tolérée par run des threads et descripteurs")
+    parser.add_argument("--no-tests", action="store_true", help="Ne pas exécuter les tests générés")
+    args = parser.parse_args(argv)
+
+    from lunacore.crew_system import LunaCrewSystem
+
+    system = LunaCrewSystem()
+    statuses = []
+
+    def run(index):
+        result = system.generate_project(args.brief, template=args.template, run_tests=not args.no_tests)
+        statuses.append(result["status"])
+
+    report = leak_check(run, runs=args.runs, warmup=args.warmup,
+                        rss_per_run=args.rss_mb * 1024 * 1024, count_per_run=args.count)
+    print(f"{'run':>4} {'statut':<16} {'RSS':>10} {'threads':>8} {'fds':>6}")
+    for index, (status, snapshot) in enumerate(zip(statuses, report["runs"]), 1):
+        print(f"{index:>4} {status:<16} {snapshot['rss'] / 1e6:>8.1f}Mo {snapshot['threads']:>8} "
+              f"{snapshot['fds'] if snapshot['fds'] is not None else '-':>6}")
+    print(json.dumps({"status": report["status"], "slopes": report["slopes"]}, ensure_ascii=False))
+    return 1 if report["status"] == "leak" else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
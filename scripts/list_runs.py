@@ -0,0 +1,49 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path so 'lunacore' package can be imported when the
+# script is executed from the scripts/ folder.
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from lunacore.run_catalog import get_run_catalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Liste les runs du catalogue LunaCore")
+    parser.add_argument("--project", help="Filtrer par nom de projet")
+    parser.add_argument("--template", help="Filtrer par template")
+    parser.add_argument("--status", help="Filtrer par statut (success, error, ...)")
+    parser.add_argument("--days", type=float, help="Seulement les N derniers jours")
+    parser.add_argument("--order-by", default="created_at", help="Colonne de tri")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--stats", metavar="GROUP_BY", help="Agrégats par template|status|project_name")
+    parser.add_argument("--backfill", action="store_true", help="Indexer les dossiers existants de sandbox/crew_output")
+    args = parser.parse_args(argv)
+
+    catalog = get_run_catalog()
+    if args.backfill:
+        print('backfilled:', catalog.backfill())
+
+    since = time.time() - args.days * 86400 if args.days else None
+    if args.stats:
+        for row in catalog.stats(group_by=args.stats, since=since):
+            print(f"{row['key']!s:<30} runs={row['runs']:<6} ok={row['successes'] or 0:<6} "
+                  f"avg={row['avg_duration'] or 0:.1f}s bytes={row['total_bytes'] or 0} tokens={row['total_tokens'] or 0}")
+        return 0
+
+    runs = catalog.list_runs(project_name=args.project, template=args.template, status=args.status,
+                             since=since, order_by=args.order_by, limit=args.limit, offset=args.offset)
+    for run in runs:
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(run['created_at']))
+        print(f"{created}  {run['status']:<8} {run['template'] or '-':<10} {run['file_count']:>4} fichiers "
+              f"{run['duration'] or 0:>7.1f}s  {run['run_id']}")
+    print('total:', catalog.count(project_name=args.project, template=args.template, status=args.status, since=since))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Test de la génération par lots (système partagé, reprise, statistiques)"""
+
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from lunacore.batch import brief_key, completed_keys, load_briefs, run_batch, summarize
+
+
+class StubSystem:
+    """Remplace LunaCrewSystem: compte les appels et la concurrence observée"""
+
+    def __init__(self, fail_on: str = None):
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def generate_project(self, brief, template="fastapi", **kwargs):
+        with self._lock:
+            self.calls.append((brief, template, kwargs))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        if brief == self.fail_on:
+            raise RuntimeError("LLM indisponible")
+        return {"status": "success", "execution_time": 0.05, "files": {"main.py": ""},
+                "validation": {"status": "passed"}, "tests": {"status": "passed"},
+                "token_usage": {"total_tokens": 42}}
+
+
+def _write_briefs(path: Path, n: int):
+    lines = [json.dumps({"brief": f"API numéro {i}", "template": "fastapi"}) for i in range(n)]
+    lines.insert(2, "pas du json")
+    lines.append(json.dumps({"id": "cli-1", "brief": "Outil CLI", "template": "cli"}))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_load_and_keys():
+    print("🧪 Test du chargement des briefs")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "briefs.jsonl"
+        _write_briefs(path, 3)
+        items = load_briefs(path)
+        assert len(items) == 4
+        assert items[-1]["key"] == "cli-1"
+        assert items[0]["key"] == brief_key({"brief": "API numéro 0"})
+        assert items[0]["key"] != brief_key({"brief": "API numéro 0", "template": "flask"})
+    print("✅ Lignes invalides ignorées, clés stables")
+
+
+def test_run_and_resume():
+    print("🧪 Test d'un lot concurrent puis de sa reprise")
+    with tempfile.TemporaryDirectory() as tmp:
+        briefs, output = Path(tmp) / "briefs.jsonl", Path(tmp) / "out" / "results.jsonl"
+        _write_briefs(briefs, 6)
+        items = load_briefs(briefs)
+        system = StubSystem(fail_on="API numéro 3")
+
+        summary = run_batch(system, items, output, concurrency=3, generate_kwargs={"run_tests": False})
+        assert summary["processed"] == 7 and summary["succeeded"] == 6
+        assert summary["skipped"] == 0
+        assert system.max_active > 1, "aucune exécution concurrente"
+        assert all(kwargs == {"run_tests": False} for _, _, kwargs in system.calls)
+        lines = [json.loads(l) for l in output.read_text(encoding="utf-8").splitlines()]
+        assert {l["status"] for l in lines} == {"success", "error"}
+        assert next(l for l in lines if l["status"] == "error")["error"] == "LLM indisponible"
+
+        # Arrêt brutal simulé: une ligne tronquée en fin de fichier
+        with output.open("a", encoding="utf-8") as f:
+            f.write('{"key": "tronq')
+        items.append({"brief": "Nouveau brief", "template": "flask", "key": brief_key({"brief": "Nouveau brief", "template": "flask"})})
+        resumed = StubSystem()
+        summary = run_batch(resumed, items, output, concurrency=2)
+        assert summary["skipped"] == 7 and summary["processed"] == 1
+        assert [c[0] for c in resumed.calls] == ["Nouveau brief"]
+        assert len(completed_keys(output)) == 8
+    print("✅ Résultats en flux, reprise sans rejouer les briefs terminés")
+
+
+def test_summary():
+    print("🧪 Test du résumé")
+    lines = [{"status": "success", "latency": float(i)} for i in range(1, 11)]
+    lines[0]["status"] = "error"
+    summary = summarize(lines, wall_time=30)
+    assert summary["success_rate"] == 0.9
+    assert summary["throughput_per_min"] == 20
+    assert summary["latency_p50"] == 5.5 and 9 < summary["latency_p90"] <= 10
+    assert summarize([], 0)["latency_p99"] == 0.0
+    print("✅ Débit, taux de succès et percentiles")
+
+
+if __name__ == "__main__":
+    test_load_and_keys()
+    test_run_and_resume()
+    test_summary()
+    print("🎉 Tous les tests de lot sont passés")
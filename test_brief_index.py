@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Test de l'index de briefs (MinHash/LSH) pour la réutilisation de plans"""
+
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from lunacore.brief_index import BriefIndex, REVISE_THRESHOLD, minhash
+
+BRIEF = ("Crée une API REST avec FastAPI, authentification JWT, CRUD pour gérer des utilisateurs "
+         "et des articles de blog, avec validation Pydantic et documentation automatique")
+
+
+def test_near_duplicate_found():
+    print("🧪 Test détection de brief quasi identique")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BriefIndex(Path(tmp) / "index.jsonl")
+        index.add(BRIEF, "fastapi", {"files": ["app/main.py"]}, run_dir="run_1")
+        index.add("Crée un bot Discord avec commandes de modération et de musique", "cli", {"files": ["bot.py"]})
+
+        similarity, entry = index.lookup(BRIEF.replace("articles de blog", "articles de news"), "fastapi")
+        assert similarity >= REVISE_THRESHOLD
+        assert entry["run_dir"] == "run_1"
+        assert index.lookup(BRIEF, "streamlit") is None
+
+        # Rechargement depuis le disque
+        reloaded = BriefIndex(Path(tmp) / "index.jsonl")
+        assert len(reloaded) == 2
+        assert reloaded.lookup(BRIEF, "fastapi")[0] == 1.0
+    print("✅ Brief proche retrouvé")
+
+
+def test_lookup_latency():
+    print("🧪 Test latence avec 20 000 briefs indexés")
+    rng = random.Random(0)
+    words = [f"mot{i}" for i in range(3000)]
+    query = BRIEF + " et tests"
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BriefIndex(Path(tmp) / "index.jsonl")
+        index.add(BRIEF, "fastapi", {"id": "cible"})
+        compared = {}
+        for size in (2000, 20000):
+            while len(index) < size:
+                index.add(" ".join(rng.choice(words) for _ in range(25)), "fastapi", {})
+            compared[size] = len(index._candidates(minhash(query)))
+        # Propriété algorithmique: les bandes LSH bornent les comparaisons, quelle que soit la taille
+        assert compared[20000] <= 10 and compared[20000] <= compared[2000] + 5, compared
+
+        index.lookup(query)  # préchauffage
+        timings = []
+        for _ in range(200):
+            start = time.perf_counter()
+            similarity, entry = index.lookup(query)
+            timings.append(time.perf_counter() - start)
+        median = statistics.median(timings)
+        assert entry["plan"] == {"id": "cible"}
+        print(f"⏱️ {median * 1000:.3f} ms par recherche (médiane), {compared[20000]} candidat(s) comparé(s)")
+        assert median < 0.002, "médiane large: machine chargée tolérée"
+    print("✅ Recherche rapide, comparaisons bornées")
+
+
+if __name__ == "__main__":
+    test_near_duplicate_found()
+    test_lookup_latency()
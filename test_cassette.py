@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test de l'enregistrement et du rejeu des échanges LLM (cassette) d'un generate_project"""
+
+import gzip
+import json
+import os
+import time
+from pathlib import Path
+
+from offline_crew import ScriptedLLM, generate, isolated_sandbox, offline_system
+
+DELAY = 0.2
+CALLS = []  # appels aux « modèles réels » (hors du modèle pydantic, qui copie ses champs)
+
+
+class LiveLikeLLM(ScriptedLLM):
+    """Simule un modèle réel: latence et tokens avant l'action write_file"""
+
+    def record(self, messages):
+        CALLS.append(self.model)
+        time.sleep(DELAY)
+        self._token_usage["prompt_tokens"] += 50
+        self._token_usage["completion_tokens"] += 10
+        self._token_usage["total_tokens"] += 60
+
+
+def test_record_then_replay():
+    print("🧪 Test enregistrement puis rejeu hors ligne")
+    with isolated_sandbox():
+        _record_then_replay()
+
+
+def _record_then_replay():
+    os.environ["LUNACORE_CASSETTE"] = "record"
+    try:
+        system = offline_system()
+        system._bind_llm = lambda kind: LiveLikeLLM(model=f"live-{kind}")
+        recorded = generate(system)
+    finally:
+        del os.environ["LUNACORE_CASSETTE"]
+    assert recorded["status"] == "success", recorded.get("error")
+    assert len(CALLS) == 3 and recorded["cassette"]["calls"] == 3
+
+    cassette_path = Path(recorded["output_directory"]) / ".lunacore" / "cassette.jsonl.gz"
+    with gzip.open(cassette_path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    header, entries = lines[0], lines[1:]
+    assert header["brief"] == "Calculatrice simple" and set(header["llms"]) == {"supervisor", "developer", "tester"}
+    assert [e["channel"] for e in entries] == ["supervisor", "developer", "tester"]
+    assert all(e["duration"] >= DELAY and e["usage"]["total_tokens"] == 60 for e in entries)
+
+    # Rejeu: ni clé OpenAI ni LLM scripté, les LLM réels ne sont jamais appelés
+    key = os.environ.pop("OPENAI_API_KEY")
+    os.environ.update(LUNACORE_CASSETTE="replay", LUNACORE_CASSETTE_PATH=recorded["output_directory"],
+                      LUNACORE_CASSETTE_STRICT="1")
+    try:
+        replay_system = offline_system()
+        start = time.perf_counter()
+        replayed = generate(replay_system)
+        fast = time.perf_counter() - start
+        os.environ["LUNACORE_CASSETTE_REALTIME"] = "1"
+        start = time.perf_counter()
+        realtime = generate(replay_system)
+        slow = time.perf_counter() - start
+    finally:
+        os.environ["OPENAI_API_KEY"] = key
+        for name in ("LUNACORE_CASSETTE", "LUNACORE_CASSETTE_PATH", "LUNACORE_CASSETTE_STRICT",
+                     "LUNACORE_CASSETTE_REALTIME"):
+            os.environ.pop(name, None)
+
+    for result in (replayed, realtime):
+        assert result["status"] == "success", result.get("error")
+        assert result["files"] == recorded["files"], "projet identique à l'enregistrement"
+        assert result["cassette"]["mismatches"] == 0 and result["cassette"]["calls"] == 3
+        assert result["token_usage"]["total_tokens"] == recorded["token_usage"]["total_tokens"] == 180
+    assert len(CALLS) == 3, "aucun appel de modèle pendant le rejeu"
+    assert not (Path(replayed["output_directory"]) / ".lunacore" / "cassette.jsonl.gz").exists()
+    assert slow >= 3 * DELAY and slow > fast, "latences d'origine rejouées en mode realtime"
+    print(f"✅ Rejeu identique sans service ({fast:.2f}s), latences d'origine en realtime ({slow:.2f}s)")
+
+
+if __name__ == "__main__":
+    test_record_then_replay()
+    print("🎉 Tous les tests de cassette sont passés")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Test des contrats de tâche: arrêt de la boucle de l'agent dès que le run_dir les remplit"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+
+from lunacore import completion
+from lunacore.completion import CompletionGuard, code_ready, plan_ready
+from lunacore.crew_system import LunaCrewSystem
+from offline_crew import isolated_sandbox
+
+
+class ScriptedLLM(BaseLLM):
+    """Écrit un fichier au premier tour, puis répond « Final Answer » (tour évitable)"""
+
+    native: bool = False
+    content: str = "{}"
+    calls: int = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.calls += 1
+        if self.calls > 1:
+            return "Thought: le plan est écrit\nFinal Answer: plan.json écrit"
+        args = {"filename": "plan.json", "content": self.content}
+        if self.native:
+            return [{"id": "c1", "type": "function",
+                     "function": {"name": "write_file", "arguments": json.dumps(args)}}]
+        return "Thought: j'écris le plan\nAction: write_file\nAction Input: " + json.dumps(args)
+
+    def supports_function_calling(self):
+        return self.native
+
+    def supports_stop_words(self):
+        return not self.native
+
+
+def test_contracts():
+    print("🧪 Test des prédicats de contrat")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp)
+        (run_dir / "plan.json").write_text("{pas du json", encoding="utf-8")
+        assert not plan_ready(run_dir, {"plan.json"}, set())
+        (run_dir / "plan.json").write_text(json.dumps({"files": ["app/main.py", "app/models.py", "tests/test_api.py"]}),
+                                           encoding="utf-8")
+        assert plan_ready(run_dir, {"plan.json"}, set())
+        assert not plan_ready(run_dir, set(), set()), "plan.json antérieur à la tâche"
+
+        (run_dir / "app").mkdir()
+        (run_dir / "app" / "main.py").write_text("app = None\n", encoding="utf-8")  # squelette
+        (run_dir / "app" / "models.py").write_text("class Article(:\n", encoding="utf-8")
+        assert not code_ready(run_dir, {"app/models.py"}, {"app/main.py"})
+        (run_dir / "app" / "models.py").write_text("class Article:\n    pass\n", encoding="utf-8")
+        assert code_ready(run_dir, {"app/models.py"}, {"app/main.py"}), "squelette présent et compilable"
+        assert not code_ready(run_dir, set(), {"app/main.py"}), "squelette seul: rien écrit par l'agent"
+        assert not code_ready(run_dir, {"app/main.py"}, {"app/main.py"})
+
+        (run_dir / "tests").mkdir()
+        (run_dir / "tests" / "test_api.py").write_text("def test_ok():\n    assert True\n", encoding="utf-8")
+        assert not completion.tests_ready(run_dir, set(), set())
+        assert completion.tests_ready(run_dir, {"tests/test_api.py"}, set())
+    print("✅ Plan, code et tests vérifiés sur le run_dir")
+
+
+def _run_supervisor(native: bool, content: str):
+    with isolated_sandbox() as tmp:
+        system = LunaCrewSystem()
+        guard = CompletionGuard(tmp)
+        llm = ScriptedLLM(model="scripted", native=native, content=content)
+        agent = Agent(role="Superviseur", goal="Planifier", backstory="Architecte", llm=llm,
+                      tools=[guard.write_tool("supervisor")], max_iter=3, verbose=False)
+        agent.step_callback = system._make_step_callback(
+            "Superviseur", None, on_tool_result=lambda step: guard.mark_final("supervisor", step))
+        task = Task(description="Écris plan.json", expected_output="plan.json", agent=agent,
+                    callback=lambda _output: guard.record_task("supervisor", agent, 3))
+        Crew(agents=[agent], tasks=[task], process=Process.sequential, memory=False).kickoff()
+        return llm.calls, guard.report()
+
+
+def test_agent_loop_stops_early():
+    print("🧪 Test de l'arrêt anticipé (ReAct et appels d'outils natifs)")
+    plan = json.dumps({"files": ["app/main.py"]})
+    for native in (False, True):
+        calls, report = _run_supervisor(native, plan)
+        assert calls == 1, f"tour de confirmation non évité (native={native})"
+        assert report["tasks"]["supervisor"] == {"contract_met": True, "iterations": 1, "max_iter": 3,
+                                                 "iterations_saved": 2}
+
+    # Plan invalide: le contrat n'est pas rempli, l'agent poursuit normalement
+    calls, report = _run_supervisor(False, "{pas du json")
+    assert calls == 2 and report["iterations_saved"] == 0
+    assert report["tasks"]["supervisor"]["contract_met"] is False
+    print("✅ Boucle arrêtée dès le contrat rempli, itérations économisées enregistrées")
+
+
+if __name__ == "__main__":
+    test_contracts()
+    test_agent_loop_stops_early()
+    print("🎉 Tous les tests de contrats de tâche sont passés")
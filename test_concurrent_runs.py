@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Test de stress: générations concurrentes sur une seule instance LunaCrewSystem (kickoff simulé)"""
+
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from crewai.agents.parser import AgentAction
+
+import lunacore.crew_system as crew_system
+from lunacore.crew_system import LunaCrewSystem
+from lunacore.run_catalog import RunCatalog
+from lunacore.tools_runtime import make_write_file_tool
+from offline_crew import isolated_sandbox, offline_system, patched_kickoff, write_file
+
+RUNS = 8
+
+
+class FakeOutput:
+    """Sortie de tâche minimale (callbacks de progression et de contexte)"""
+
+    def __init__(self, summary):
+        self.summary = summary
+
+
+def fake_kickoff(crew, inputs=None):
+    """Kickoff simulé: chaque agent écrit via SES tools, avec des pauses pour entrelacer les runs"""
+    for task in crew.tasks:
+        marker = task.description.split("'''")[1] if "'''" in task.description else None
+        if task.agent.step_callback is not None:
+            task.agent.step_callback(AgentAction(thought=f"écriture pour {crew._marker}", tool="write_file",
+                                                 tool_input="{}", text=""))
+        time.sleep(random.uniform(0, 0.02))
+        if marker is not None:
+            write_file(task.agent, "plan.json", json.dumps({"brief": marker}))
+        else:
+            write_file(task.agent, f"{task.agent.role}.txt", crew._marker)
+        time.sleep(random.uniform(0, 0.02))
+        task.callback(FakeOutput(task.agent.role))
+    return FakeOutput("fin")
+
+
+def test_concurrent_runs_are_isolated():
+    print(f"🧪 Test de {RUNS} générations concurrentes sur une instance partagée")
+    with isolated_sandbox() as root:
+        catalog = RunCatalog(root / "runs.sqlite3")
+        system = offline_system(catalog)
+        reference_tools = {key: list(agent.tools) for key, agent in system.agents.items()}
+
+        original_make_crew = system._make_crew
+
+        def make_crew(tasks, memory=None):
+            crew = original_make_crew(tasks, memory)
+            object.__setattr__(crew, "_marker", tasks[0].description.split("'''")[1])
+            return crew
+
+        system._make_crew = make_crew
+        briefs = [f"Projet numero{i} api de test {i}" for i in range(RUNS)]
+        events = {brief: [] for brief in briefs}
+        with patched_kickoff(fake_kickoff), ThreadPoolExecutor(max_workers=RUNS) as pool:
+            results = list(pool.map(
+                lambda brief: system.generate_project(brief, run_tests=False, memory_mode="off",
+                                                      on_event=events[brief].append, repair_rounds=0),
+                briefs))
+
+        directories = {r["output_directory"] for r in results}
+        assert len(directories) == RUNS, "deux runs partagent un dossier"
+        for brief, result in zip(briefs, results):
+            assert result["status"] == "success", result.get("error")
+            run_dir = Path(result["output_directory"])
+            assert json.loads((run_dir / "plan.json").read_text(encoding="utf-8"))["brief"] == brief
+            for role in ("Superviseur", "Développeur", "Testeur"):
+                if role != "Superviseur":
+                    assert (run_dir / f"{role}.txt").read_text(encoding="utf-8") == brief, f"{role} a écrit ailleurs"
+            steps = [e for e in events[brief] if e["event"] == "step"]
+            assert len(steps) == 3 and all(brief in s["thought"] for s in steps), "étapes mélangées entre runs"
+            completed = [e for e in events[brief] if e["event"] == "task_completed"]
+            assert [e["agent"] for e in completed] == ["Superviseur", "Développeur", "Testeur"]
+            assert catalog.get(run_dir.name)["template"] == "fastapi"
+        assert {key: list(agent.tools) for key, agent in system.agents.items()} == reference_tools, \
+            "les agents de référence ont été modifiés"
+        catalog.close()
+    print("✅ Dossiers, fichiers et événements isolés par run")
+
+
+def test_run_agents_are_fresh():
+    print("🧪 Test de l'instanciation des agents par run")
+    with isolated_sandbox():
+        system = LunaCrewSystem()
+    tool_a, tool_b = make_write_file_tool(Path("run_a")), make_write_file_tool(Path("run_b"))
+    first, second = system._create_agents(tools=[tool_a]), system._create_agents(tools=[tool_b])
+    for key in crew_system.AGENT_TEMPLATES:
+        assert first[key] is not second[key] and first[key].llm is not second[key].llm
+        assert first[key].tools == [tool_a] and second[key].tools == [tool_b]
+        assert first[key].step_callback is None
+    # Compteurs de tokens propres à chaque agent du run (plus de cumul entre runs)
+    first["developer"].llm._token_usage["total_tokens"] += 10
+    assert second["developer"].llm._token_usage["total_tokens"] == 0
+    assert first["tester"].llm._token_usage["total_tokens"] == 0
+    print("✅ Agents, tools et LLM propres à chaque run")
+
+
+if __name__ == "__main__":
+    test_concurrent_runs_are_isolated()
+    test_run_agents_are_fresh()
+    print("🎉 Tous les tests de concurrence sont passés")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Test du budget de contexte des prompts développeur/testeur"""
+
+import tempfile
+from pathlib import Path
+
+from lunacore.context_budget import ContextBudget, count_tokens, extract_interface
+
+PLAN = {
+    "project": {"name": "blog_api", "stack": "fastapi"},
+    "files": ["app/main.py", "app/models.py", "app/auth.py"],
+    "models": {"app/models.py": {"User": ["id", "email"], "Post": ["id", "title", "body"]}},
+    "endpoints": [{"path": "/posts/{post_id}", "file": "app/main.py", "method": "GET"}],
+    "auth": {"file": "app/auth.py", "details": "JWT " * 2000},
+    "tests": {"files": ["tests/test_main.py"], "cases": ["GET /posts renvoie 200"]},
+}
+
+
+def test_relevant_sections_first():
+    print("🧪 Test sélection des sections pertinentes")
+    context = ContextBudget(max_tokens=400).build(PLAN, "app/models.py")
+    assert context["included"][0] == "plan.json › files"
+    assert "plan.json › models" in context["included"]
+    assert "plan.json › auth" in context["summarized"] + context["dropped"]
+    assert context["tokens"] <= 400
+    assert count_tokens(context["text"]) <= 400 + 10
+    print("✅ Sections pertinentes retenues, le reste résumé ou écarté")
+
+
+def test_deterministic():
+    budget = ContextBudget(max_tokens=300)
+    assert budget.build(PLAN, "app/main.py")["text"] == budget.build(PLAN, "app/main.py")["text"]
+
+
+def test_interfaces_included():
+    print("🧪 Test interfaces déjà écrites")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp)
+        (run_dir / "app").mkdir()
+        (run_dir / "app" / "models.py").write_text(
+            "MAX_LEN = 10\n\nclass User:\n    email: str\n    def save(self, force: bool = False) -> None:\n        pass\n"
+            "\ndef _private():\n    pass\n",
+            encoding="utf-8",
+        )
+        context = ContextBudget(max_tokens=2000).build(PLAN, "app/main.py", run_dir)
+        assert "interface › app/models.py" in context["included"]
+        assert "def save(self, force: bool=False) -> None: ..." in context["text"]
+        assert "_private" not in context["text"]
+    print("✅ Interfaces injectées sans implémentation")
+
+
+def test_extract_interface_invalid():
+    assert extract_interface("def f(:") == ""
+
+
+if __name__ == "__main__":
+    test_relevant_sections_first()
+    test_deterministic()
+    test_interfaces_included()
+    test_extract_interface_invalid()
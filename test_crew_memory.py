@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Test de la mémoire de crew bornée (modes off/éphémère/persistant, embeddings locaux)"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from crewai.memory.types import MemoryRecord
+
+from lunacore.crew_memory import (BoundedMemoryStore, HashedNgramEmbedder, build_crew_memory,
+                                  extract_local_memories, memory_report)
+
+EMBEDDER = HashedNgramEmbedder()
+
+
+def _record(content: str, scope: str = "/crew/lunacore/plan") -> MemoryRecord:
+    return MemoryRecord(content=content, scope=scope, categories=["plan"],
+                        embedding=EMBEDDER.embed(content).tolist())
+
+
+def test_embedder():
+    print("🧪 Test des embeddings locaux")
+    a, b, c = EMBEDDER(["endpoint FastAPI pour les articles du blog",
+                        "endpoints FastAPI des articles de blog",
+                        "bot discord qui répond aux commandes"])
+    assert a.shape == (384,)
+    assert abs(np.linalg.norm(a) - 1.0) < 1e-5
+    assert np.array_equal(a, EMBEDDER.embed("endpoint FastAPI pour les articles du blog"))
+    assert float(a @ b) > float(a @ c)
+    assert not EMBEDDER.embed("").any()
+    print("✅ Embeddings déterministes et discriminants")
+
+
+def test_lru_eviction():
+    print("🧪 Test de l'éviction LRU")
+    store = BoundedMemoryStore(max_records=3)
+    records = [_record(f"fichier module_{i}.py du projet") for i in range(3)]
+    store.save(records)
+    store.touch_records([records[0].id])  # records[1] devient le moins récemment utilisé
+    store.save([_record("fichier tests/test_api.py")])
+    assert len(store) == 3 and store.evicted == 1
+    assert store.get_record(records[1].id) is None
+    assert store.get_record(records[0].id) is not None
+    print("✅ Plafond respecté, le moins récemment utilisé est évincé")
+
+
+def test_search_and_scopes():
+    print("🧪 Test de la recherche vectorielle filtrée")
+    store = BoundedMemoryStore()
+    store.save([_record("modèle SQLAlchemy Article avec titre et contenu"),
+                _record("commande !ping du bot discord", scope="/crew/lunacore/bot")])
+    hits = store.search(EMBEDDER.embed("modèle Article SQLAlchemy").tolist(), limit=2)
+    assert "Article" in hits[0][0].content and 0.0 <= hits[0][1] <= 1.0
+    scoped = store.search(EMBEDDER.embed("modèle Article").tolist(), scope_prefix="/crew/lunacore/bot")
+    assert [r.scope for r, _ in scoped] == ["/crew/lunacore/bot"]
+    assert store.list_scopes("/crew/lunacore") == ["/crew/lunacore/bot", "/crew/lunacore/plan"]
+    assert store.list_categories() == {"plan": 2}
+    assert store.delete(scope_prefix="/crew/lunacore/bot") == 1 and store.count() == 1
+    print("✅ Recherche, scopes et suppression cohérents")
+
+
+def test_persistent_reload():
+    print("🧪 Test du store persistant")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "memory.sqlite3"
+        store = BoundedMemoryStore(path, max_records=10)
+        record = _record("plan.json: app/main.py, app/models.py")
+        store.save([record])
+        reloaded = BoundedMemoryStore(path, max_records=10)
+        assert reloaded.get_record(record.id).content == record.content
+        capped = BoundedMemoryStore(path, max_records=0)
+        assert len(capped) == 0 and len(BoundedMemoryStore(path)) == 0
+    print("✅ Rechargement et plafond appliqués au démarrage")
+
+
+def test_modes():
+    print("🧪 Test des modes de mémoire")
+    assert build_crew_memory("off") is None
+    assert memory_report("off", None) == {"mode": "off"}
+    try:
+        build_crew_memory("cloud")
+        assert False, "mode inconnu accepté"
+    except ValueError:
+        pass
+    memory = build_crew_memory("ephemeral")
+    # Champs explicites: aucun appel LLM ni fournisseur d'embeddings externe
+    memory.remember("Le projet utilise FastAPI et SQLite", scope="/stack", categories=["stack"], importance=0.8)
+    matches = memory.recall("quelle base de données", depth="shallow")
+    assert matches and "SQLite" in matches[0].record.content
+    assert memory_report("ephemeral", memory)["records"] == 1
+    memory.close()
+    assert len(memory._storage) == 0
+    print("✅ off/ephemeral fonctionnels hors ligne")
+
+
+def test_local_analysis_without_llm():
+    print("🧪 Test de la sauvegarde et du rappel sans appel LLM")
+    output = ("Task: Écrire le plan du projet\nAgent: Superviseur\nResult:\n"
+              "- Le backend utilise FastAPI avec une base SQLite\n"
+              "- Le backend utilise FastAPI avec une base SQLite\n"
+              "ok\n"
+              "- Les tests vivent dans tests/ et lancent pytest")
+    facts = extract_local_memories(output)
+    assert facts == ["Le backend utilise FastAPI avec une base SQLite", "Les tests vivent dans tests/ et lancent pytest"]
+    assert len(extract_local_memories("\n".join(f"Fait numéro {i} du projet" for i in range(20)), limit=3)) == 3
+
+    memory = build_crew_memory("ephemeral")
+    assert memory._llm is None, "aucun LLM d'analyse construit"
+    # Chemin de l'executor CrewAI après chaque tâche: extraction puis remember_many
+    memory.remember_many(memory.extract_memories(output), agent_role="Superviseur", root_scope="/crew/lunacore")
+    memory.remember_many(memory.extract_memories(output), agent_role="Superviseur", root_scope="/crew/lunacore")
+    # remember est synchrone: une consolidation sans LLM lèverait ici
+    assert memory.remember("le backend utilise FastAPI, avec une base SQLite.") is None, "doublon ignoré"
+    matches = memory.recall("quelle base de données", limit=5)  # depth par défaut des agents
+    stored = len(memory._storage)
+    memory.close()
+    assert stored == 2, "second lot déjà connu: ignoré au lieu d'être consolidé par LLM"
+    assert matches and "SQLite" in matches[0].record.content
+    assert matches[0].record.categories == ["Superviseur"] and matches[0].record.importance == 0.5
+    print(f"✅ {len(matches)} souvenir(s) rappelé(s), doublons ignorés, sans LLM d'analyse")
+
+
+if __name__ == "__main__":
+    test_embedder()
+    test_lru_eviction()
+    test_search_and_scopes()
+    test_persistent_reload()
+    test_modes()
+    test_local_analysis_without_llm()
+    print("🎉 Tous les tests de mémoire sont passés")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Test de l'export ZIP streamé et mis en cache"""
+
+import io
+import tempfile
+import zipfile
+from pathlib import Path
+
+from lunacore.export import stream_zip, build_run_archive
+
+
+def _make_run(root: Path) -> Path:
+    run_dir = root / "demo_app_20250101_000000"
+    (run_dir / "app").mkdir(parents=True)
+    (run_dir / "plan.json").write_text('{"modules": []}', encoding="utf-8")
+    (run_dir / "app" / "main.py").write_text("print('hello')\n" * 5000, encoding="utf-8")
+    (run_dir / ".lunacore").mkdir()
+    (run_dir / ".lunacore" / "internal.json").write_text("{}", encoding="utf-8")
+    return run_dir
+
+
+def test_stream_zip():
+    print("🧪 Test du ZIP streamé")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = _make_run(Path(tmp))
+        chunks = list(stream_zip(run_dir, chunk_size=1024))
+        assert len(chunks) > 1
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zipf:
+            names = sorted(zipf.namelist())
+            assert names == ["app/main.py", "plan.json"]
+            assert zipf.read("app/main.py") == (run_dir / "app" / "main.py").read_bytes()
+    print("✅ ZIP streamé valide")
+
+
+def test_archive_cache():
+    print("🧪 Test du cache d'archive")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = _make_run(Path(tmp))
+        cache_dir = Path(tmp) / "exports"
+
+        first = build_run_archive(run_dir, cache_dir)
+        mtime = first.stat().st_mtime_ns
+        assert build_run_archive(run_dir, cache_dir) == first
+        assert first.stat().st_mtime_ns == mtime
+
+        # Une modification du run invalide l'archive et remplace l'ancienne
+        (run_dir / "README.md").write_text("# Demo", encoding="utf-8")
+        second = build_run_archive(run_dir, cache_dir)
+        assert second != first
+        assert not first.exists()
+        with zipfile.ZipFile(second) as zipf:
+            assert "README.md" in zipf.namelist()
+    print("✅ Cache d'archive fonctionnel")
+
+
+if __name__ == "__main__":
+    test_stream_zip()
+    test_archive_cache()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test de l'index des fichiers d'un run (arborescence paginée, pages de lignes, recherche)"""
+
+import tempfile
+from pathlib import Path
+
+from lunacore.file_index import CHECKPOINT_LINES, RunFileIndex, build_file_index
+from lunacore.run_files import RUN_META_DIR
+
+
+def _make_run(root: Path) -> Path:
+    run_dir = root / "projet_1"
+    (run_dir / "app" / "routes").mkdir(parents=True)
+    (run_dir / RUN_META_DIR).mkdir()
+    (run_dir / "main.py").write_text("from app import create_app\napp = create_app()\n", encoding="utf-8")
+    (run_dir / "app" / "routes" / "articles.py").write_text(
+        "\n".join(f"def route_{i}():  # article {i}" for i in range(3 * CHECKPOINT_LINES + 7)) + "\n",
+        encoding="utf-8")
+    for i in range(45):
+        (run_dir / "app" / f"module_{i:02d}.py").write_text(f"VALEUR = {i}\n", encoding="utf-8")
+    (run_dir / "logo.png").write_bytes(b"\x89PNG\0\0binaire")
+    (run_dir / RUN_META_DIR / "active").write_text("interne", encoding="utf-8")
+    return run_dir
+
+
+def test_tree_and_pages():
+    print("🧪 Test de l'arborescence et des pages de lignes")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = _make_run(Path(tmp))
+        assert build_file_index(run_dir)["files"] == 48
+        index = RunFileIndex(run_dir)
+        assert index.build() is False, "index reconstruit alors que le run n'a pas changé"
+
+        root, total = index.children("")
+        assert total == 3 and [e["path"] for e in root] == ["app", "logo.png", "main.py"]
+        page, total = index.children("app", limit=10, offset=10)
+        assert total == 46 and len(page) == 10 and page[0]["kind"] == "file"
+        assert index.children("app", limit=10)[0][0] == {"path": "app/routes", "name": "routes", "kind": "dir",
+                                                         "size": None, "lines": None}
+
+        rel = "app/routes/articles.py"
+        assert index.file_info(rel)["lines"] == 3 * CHECKPOINT_LINES + 7
+        lines = index.read_lines(rel, CHECKPOINT_LINES * 2 - 3, 6)
+        assert lines[0].startswith(f"def route_{CHECKPOINT_LINES * 2 - 3}(") and len(lines) == 6
+        assert len(index.read_lines(rel, 3 * CHECKPOINT_LINES, 100)) == 7
+        assert index.file_info("logo.png")["binary"] == 1
+
+        # Modification du run: l'empreinte change, l'index est reconstruit
+        (run_dir / "README.md").write_text("# Blog\n", encoding="utf-8")
+        assert index.build() is True and index.stats()["files"] == 49
+        index.close()
+    print("✅ Niveaux paginés, lignes lues depuis les checkpoints, index à jour")
+
+
+def test_search():
+    print("🧪 Test de la recherche dans les noms et contenus")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = RunFileIndex(_make_run(Path(tmp)))
+        index.build()
+        hits = index.search("articles")
+        assert [h["path"] for h in hits["files"]] == ["app/routes/articles.py"]
+        hits = index.search("route_1234")
+        assert hits["lines"][0] == {"path": "app/routes/articles.py", "line": 1234,
+                                    "text": "def route_1234():  # article 1234"}
+        assert len(index.search("article", limit=5)["lines"]) == 5
+        assert index.search("= 7")["lines"][0]["path"] == "app/module_07.py"
+        assert index.search('100%"') == {"files": [], "lines": []}
+        assert index.search("interne")["lines"] == [], "les métadonnées du run ne doivent pas être indexées"
+        index.close()
+    print("✅ Recherche servie par l'index (trigrammes), résultats bornés")
+
+
+if __name__ == "__main__":
+    test_tree_and_pages()
+    test_search()
+    print("🎉 Tous les tests de l'index de fichiers sont passés")
@@ -2,39 +2,37 @@
 """Test complet du système LunaCore avec routeur intégré"""
 
 from lunacore.crew_system import LunaCrewSystem
+from offline_crew import assert_generated, recorded_generation
+
+# Échanges LLM rejoués depuis cassettes/test_full_generation.jsonl.gz (hors ligne, reproductible);
+# LUNACORE_CASSETTE=record les réenregistre contre les services réels
+
 
 def test_generation():
     print("🚀 Test de génération complète avec routeur LLM")
-    
-    # Initialiser le système
-    luna = LunaCrewSystem()
-    print("✅ Système LunaCore initialisé")
-    
+
     # Brief de test simple
     brief = "Create a simple map application using Streamlit that shows a basic map"
-    
     print(f"📋 Brief: {brief}")
-    
-    # Génération du projet
-    try:
+
+    with recorded_generation("test_full_generation"):
+        luna = LunaCrewSystem()
+        print("✅ Système LunaCore initialisé")
         result = luna.generate_project(brief, template="streamlit")
-        
-        print("\n🎯 Résultats de génération:")
-        print(f"📊 Status: {result['status']}")
-        print(f"⏱️ Temps d'exécution: {result['execution_time']}s")
-        print(f"📁 Fichiers générés: {len(result['files'])}")
-        print(f"🤖 Agents utilisés: {result['agents_count']}")
-        print(f"📋 Tâches exécutées: {result['tasks_count']}")
-        
-        # Afficher les fichiers générés
-        if result['files']:
-            print("\n📁 Fichiers créés:")
-            for filename, content in result['files'].items():
-                size = len(content) if isinstance(content, str) else 0
-                print(f"  - {filename} ({size} caractères)")
-                
-    except Exception as e:
-        print(f"❌ Erreur: {e}")
+
+    print("\n🎯 Résultats de génération:")
+    print(f"📊 Status: {result['status']}")
+    print(f"⏱️ Temps d'exécution: {result['execution_time']}s")
+    print(f"📁 Fichiers générés: {len(result['files'])}")
+    for filename, content in result["files"].items():
+        print(f"  - {filename} ({len(content)} caractères)")
+
+    assert_generated(result, {"plan.json", "app.py", "requirements.txt"})
+    assert result["agents_count"] == 3 and result["tasks_count"] == 3
+    assert "streamlit" in result["files"]["app.py"] and "st.map" in result["files"]["app.py"]
+    assert any(path.startswith("tests/test_") for path in result["files"]), "tests générés"
+    print("✅ Projet Streamlit généré, validé et testé")
+
 
 if __name__ == "__main__":
     test_generation()
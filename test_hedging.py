@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Test des requêtes couvertes Ollama -> OpenAI (seuil adaptatif, plafond de couverture, opt-in par rôle)"""
+
+import time
+
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+
+from lunacore.crew_system import LunaCrewSystem
+from lunacore.hedging import HedgedLLM, HedgePolicy, LatencyTracker, get_latency_tracker
+from lunacore.run_budget import BudgetConfig, RunBudget
+from offline_crew import environ, isolated_sandbox
+
+
+class SlowLLM(BaseLLM):
+    """
+    Premier token après `delay` secondes puis `chunks` morceaux espacés de `pace` (si streamé);
+    compte ses appels, les stops reçus et les chunks réellement émis
+    """
+
+    delay: float = 0.0
+    pace: float = 0.0
+    chunks: int = 1
+    answer: str = "Thought: fini\nFinal Answer: OK"
+    calls: int = 0
+    seen_stops: list = []
+    streamed: list = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.calls += 1
+        self.seen_stops.append(list(self.stop_sequences))
+        self._token_usage["total_tokens"] += 10
+        time.sleep(self.delay)
+        if self.stream:
+            size = -(-len(self.answer) // self.chunks)
+            for i in range(0, len(self.answer), size):
+                if i:
+                    time.sleep(self.pace)
+                self._emit_stream_chunk_event(self.answer[i:i + size])  # StreamAborted si perdant
+                self.streamed.append(self.answer[i:i + size])
+        return self.answer
+
+    def supports_function_calling(self):
+        return False
+
+
+def _pair(primary_delay, backup_delay=0.0, **policy):
+    primary = SlowLLM(model=f"ollama/lent-{time.monotonic_ns()}", delay=primary_delay, answer="llama")
+    backup = SlowLLM(model="openai/rapide", delay=backup_delay, answer="openai")
+    policy = HedgePolicy(roles=frozenset({"developer"}), **policy)
+    return HedgedLLM.wrap(primary, backup, policy, "Développeur"), policy
+
+
+def test_adaptive_threshold():
+    print("🧪 Test du seuil adaptatif")
+    tracker = LatencyTracker()
+    policy = HedgePolicy(min_samples=10, default_seconds=30)
+    for i in range(5):
+        tracker.record(float(i))
+    assert policy.threshold(tracker) == 30, "historique trop court: seuil par défaut"
+    for i in range(5, 100):
+        tracker.record(float(i))
+    assert policy.threshold(tracker) == 90.0
+    print("✅ p90 du backend après min_samples appels")
+
+
+def test_hedge_wins_on_slow_primary():
+    print("🧪 Test de la couverture d'un appel Llama lent")
+    llm, policy = _pair(primary_delay=1.0, default_seconds=0.1, max_rate=1.0)
+    start = time.perf_counter()
+    assert llm.call([{"role": "user", "content": "ping"}]) == "openai"
+    assert time.perf_counter() - start < 0.6, "la réponse du secours n'attend pas le perdant"
+    assert llm.stats == {"calls": 1, "hedges": 1, "backup_wins": 1}
+
+    fast, _ = _pair(primary_delay=0.0, default_seconds=0.5, max_rate=1.0)
+    assert fast.call([{"role": "user", "content": "ping"}]) == "llama"
+    assert fast.stats["hedges"] == 0 and fast.backup.calls == 0
+
+    # Premier token sous le seuil: pas de couverture, même si la réponse complète le dépasse
+    long, _ = _pair(primary_delay=0.02, default_seconds=0.1, max_rate=1.0)
+    long.primary.chunks, long.primary.pace = 5, 0.1
+    assert long.call([{"role": "user", "content": "ping"}]) == "llama"
+    assert long.stats["hedges"] == 0 and long.backup.calls == 0 and len(long.primary.streamed) == 5
+
+    time.sleep(1.0)  # le perdant termine: sa latence alimente le p90 et ses tokens restent comptés
+    assert len(get_latency_tracker(llm.primary.model)) == 1
+    assert llm.get_token_usage_summary().total_tokens == 20
+    print("✅ Première réponse retenue, perdant ignoré mais compté")
+
+
+def test_loser_stream_aborted():
+    print("🧪 Test de l'interruption du flux perdant")
+    llm, _ = _pair(primary_delay=0.3, backup_delay=0.35, default_seconds=0.1, max_rate=1.0)
+    llm.primary.answer, llm.primary.chunks, llm.primary.pace = "l" * 20, 20, 0.05
+    assert llm.call([{"role": "user", "content": "ping"}]) == "openai"
+    time.sleep(0.5)
+    assert 0 < len(llm.primary.streamed) < 10, f"flux Llama coupé en cours ({len(llm.primary.streamed)} chunks)"
+    emitted = len(llm.primary.streamed)
+    time.sleep(0.3)
+    assert len(llm.primary.streamed) == emitted, "plus aucun chunk lu après l'abandon"
+    print(f"✅ Secours retenu, flux Llama interrompu après {emitted}/20 chunks")
+
+
+def test_overlapping_calls_keep_their_stream():
+    print("🧪 Test de deux appels consécutifs pendant que le flux perdant se termine")
+    llm, _ = _pair(primary_delay=0.4, backup_delay=0.05, default_seconds=0.2, max_rate=1.0)
+    llm.primary.answer, llm.primary.chunks, llm.primary.pace = "l" * 5, 5, 0.1
+    assert llm.call([{"role": "user", "content": "ping"}]) == "openai"
+    # Appel suivant pendant que le premier flux Llama attend encore son premier chunk (t=0.4s):
+    # ce chunk appartient au premier appel, il ne doit ni compter comme premier token du second
+    # (pas de couverture) ni échapper à l'abandon
+    llm.primary.delay = 1.0
+    assert llm.call([{"role": "user", "content": "ping"}]) == "openai", "second appel couvert à son propre seuil"
+    assert llm.stats == {"calls": 2, "hedges": 2, "backup_wins": 2}
+    time.sleep(1.3)
+    assert llm.primary.streamed == [], "les deux flux perdants interrompus dès leur premier chunk"
+    latencies = get_latency_tracker(llm.primary.model)
+    assert len(latencies) == 2 and latencies.quantile(0) >= 0.35, "aucune latence fictive enregistrée"
+    print("✅ Chaque appel relié à son flux: couverture et abandon corrects")
+
+
+def test_hedge_rate_cap():
+    print("🧪 Test du plafond de couverture")
+    llm, policy = _pair(primary_delay=0.3, default_seconds=0.05, max_rate=0.5)
+    for _ in range(4):
+        llm.call([{"role": "user", "content": "ping"}])
+    assert policy.calls == 4 and policy.hedges == 2, policy.report()
+    assert llm.primary.calls == 4 and llm.backup.calls == 2
+    print("✅ Taux de couverture borné par max_rate")
+
+
+def test_agent_and_role_opt_in():
+    print("🧪 Test de l'intégration agent (ReAct) et de l'opt-in par rôle")
+    llm, _ = _pair(primary_delay=1.0, default_seconds=0.1, max_rate=1.0)
+    llm.backup.answer = "Thought: fini\nFinal Answer: couvert"
+    agent = Agent(role="Développeur", goal="Coder", backstory="Dev", llm=llm, max_iter=2, verbose=False)
+    assert agent.llm is llm
+    task = Task(description="Réponds", expected_output="Une réponse", agent=agent)
+    output = Crew(agents=[agent], tasks=[task], process=Process.sequential, memory=False).kickoff()
+    assert "couvert" in str(output)
+    assert llm.backup.seen_stops[-1] == llm.primary.seen_stops[-1] and "\nObservation:" in llm.backup.seen_stops[-1]
+
+    with isolated_sandbox(), environ(LUNACORE_HEDGE_ROLES="developer"):
+        system = LunaCrewSystem()
+        system.llama_available = True
+        budget = RunBudget(BudgetConfig())
+        agents = system._create_agents(budget=budget)
+    assert isinstance(agents["developer"].llm, HedgedLLM)
+    assert agents["developer"].llm.primary.stream and agents["developer"].llm.backup.stream, "seuil au premier token"
+    assert not isinstance(agents["tester"].llm, HedgedLLM) and not isinstance(agents["supervisor"].llm, HedgedLLM)
+    assert len(budget._llms["developer"]) == 2, "coût des deux backends suivi par le budget"
+    assert system._hedging_report(agents)["agents"] == {"developer": {"calls": 0, "hedges": 0, "backup_wins": 0}}
+    print("✅ Agent CrewAI couvert, seuls les rôles configurés sont concernés")
+
+
+if __name__ == "__main__":
+    test_adaptive_threshold()
+    test_hedge_wins_on_slow_primary()
+    test_loser_stream_aborted()
+    test_overlapping_calls_keep_their_stream()
+    test_hedge_rate_cap()
+    test_agent_and_role_opt_in()
+    print("🎉 Tous les tests de couverture sont passés")
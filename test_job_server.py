@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Test de l'API HTTP de jobs (soumission, SSE, manifeste, archive) avec un système simulé"""
+
+import io
+import json
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from pathlib import Path
+
+from lunacore.job_server import create_server, parse_job_options
+
+
+class StubSystem:
+    """Génère deux fichiers et émet les événements de progression comme LunaCrewSystem"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.calls = []
+
+    def generate_project(self, brief, template="fastapi", on_event=None, **kwargs):
+        self.calls.append((brief, template, kwargs))
+        run_dir = self.root / f"run_{len(self.calls)}"
+        run_dir.mkdir(parents=True)
+        on_event({"event": "started", "run_id": run_dir.name, "output_directory": str(run_dir), "time": time.time()})
+        time.sleep(0.2)
+        if brief == "échec":
+            raise RuntimeError("LLM indisponible")
+        (run_dir / "app").mkdir()
+        (run_dir / "app" / "main.py").write_text("print('ok')\n", encoding="utf-8")
+        (run_dir / "README.md").write_text("# Demo\n", encoding="utf-8")
+        on_event({"event": "task_completed", "agent": "Développeur", "time": time.time()})
+        return {"status": "success", "output_directory": str(run_dir), "execution_time": 0.2,
+                "validation": {"status": "passed"}, "tests": {"status": "skipped"}}
+
+
+def _start(tmp: Path):
+    system = StubSystem(tmp)
+    server = create_server(port=0, workers=2, system_factory=lambda: system)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, system, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _post(base, payload):
+    request = urllib.request.Request(f"{base}/jobs", data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+def _sse(url, last_event_id=None):
+    headers = {"Last-Event-ID": str(last_event_id)} if last_event_id is not None else {}
+    events = []
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=10) as response:
+        assert response.headers["Content-Type"] == "text/event-stream"
+        for block in response.read().decode("utf-8").split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if fields:
+                events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_job_lifecycle():
+    print("🧪 Test du cycle de vie d'un job")
+    with tempfile.TemporaryDirectory() as tmp:
+        server, system, base = _start(Path(tmp))
+        try:
+            status, created = _post(base, {"brief": "API de blog", "template": "flask", "run_tests": False,
+                                           "ignored": True})
+            assert status == 202 and created["events"] == f"/jobs/{created['id']}/events"
+
+            events = _sse(base + created["events"])
+            names = [name for _, name, _ in events]
+            assert names == ["running", "started", "task_completed", "done"]
+            assert events[-1][2]["status"] == "success"
+            assert system.calls == [("API de blog", "flask", {"run_tests": False})]
+
+            # Reprise après déconnexion: seuls les événements suivants sont renvoyés
+            assert [name for _, name, _ in _sse(base + created["events"], last_event_id=1)] == ["task_completed", "done"]
+
+            with urllib.request.urlopen(f"{base}/jobs/{created['id']}", timeout=5) as response:
+                state = json.loads(response.read())
+            assert state["status"] == "success" and state["validation"] == "passed"
+
+            with urllib.request.urlopen(f"{base}/jobs/{created['id']}/manifest", timeout=5) as response:
+                manifest = json.loads(response.read())
+            assert [f["path"] for f in manifest["files"]] == ["README.md", "app/main.py"]
+
+            with urllib.request.urlopen(f"{base}/jobs/{created['id']}/archive", timeout=5) as response:
+                archive = zipfile.ZipFile(io.BytesIO(response.read()))
+            assert archive.read("app/main.py") == b"print('ok')\n"
+        finally:
+            server.shutdown()
+            server.manager.shutdown()
+    print("✅ Soumission, SSE rejouable, manifeste et archive")
+
+
+def test_option_coercion():
+    print("🧪 Test de la lecture des options d'un job")
+    options = parse_job_options({"brief": "API", "speculative_k": 3.0, "memory_mode": None, "run_tests": False,
+                                 "unknown": 1})
+    assert options == {"speculative_k": 3, "run_tests": False}
+    assert type(options["speculative_k"]) is int
+    print("✅ Options typées, null ignoré, entiers flottants convertis")
+
+
+def test_errors_and_pending():
+    print("🧪 Test des erreurs et des jobs en cours")
+    with tempfile.TemporaryDirectory() as tmp:
+        server, _, base = _start(Path(tmp))
+        try:
+            invalid = ({"template": "flask"}, {"brief": "  "}, {"brief": "API", "speculative_k": "3"},
+                       {"brief": "API", "run_tests": "false"}, {"brief": "API", "repair_rounds": True},
+                       {"brief": "API", "repair_rounds": -1}, {"brief": "API", "memory_mode": "forever"})
+            for payload in invalid:
+                try:
+                    _post(base, payload)
+                    assert False, f"requête invalide acceptée: {payload}"
+                except urllib.error.HTTPError as e:
+                    assert e.code == 400
+            _, pending = _post(base, {"brief": "API lente"})
+            try:
+                urllib.request.urlopen(f"{base}/jobs/{pending['id']}/archive", timeout=5)
+                assert False, "archive servie avant la fin du job"
+            except urllib.error.HTTPError as e:
+                assert e.code == 409
+            _, failed = _post(base, {"brief": "échec"})
+            events = _sse(f"{base}/jobs/{failed['id']}/events")
+            assert events[-1][2]["status"] == "error"
+            with urllib.request.urlopen(f"{base}/jobs", timeout=5) as response:
+                jobs = json.loads(response.read())
+            assert {j["id"] for j in jobs} == {pending["id"], failed["id"]}
+            assert next(j for j in jobs if j["id"] == failed["id"])["error"] == "LLM indisponible"
+            try:
+                urllib.request.urlopen(f"{base}/jobs/deadbeef", timeout=5)
+                assert False, "job inconnu trouvé"
+            except urllib.error.HTTPError as e:
+                assert e.code == 404
+        finally:
+            server.shutdown()
+            server.manager.shutdown()
+    print("✅ Validation du corps, 409 avant la fin, erreurs remontées")
+
+
+if __name__ == "__main__":
+    test_job_lifecycle()
+    test_option_coercion()
+    test_errors_and_pending()
+    print("🎉 Tous les tests de l'API de jobs sont passés")
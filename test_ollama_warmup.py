@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Test du préchargement Ollama (keep-alive, état loaded/cold, épinglage) contre un serveur simulé"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lunacore.job_server import JobManager
+from lunacore.ollama_warmup import OllamaWarmup, PinWindow
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    """/api/generate charge le modèle (keep_alive mémorisé), /api/ps liste les modèles chargés"""
+
+    loaded = {}
+    requests = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(payload)
+        self.loaded[payload["model"]] = payload["keep_alive"]
+        self._reply({"model": payload["model"], "response": "", "done": True})
+
+    def do_GET(self):
+        self._reply({"models": [{"name": name, "model": name, "expires_at": "2026-01-01T12:30:00Z"}
+                                for name in self.loaded]})
+
+
+def _start_stub():
+    StubOllama.loaded, StubOllama.requests = {}, []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _local(hour, day=5):
+    """Instant local: janvier 2026, le 5 est un lundi"""
+    return time.mktime((2026, 1, day, hour, 0, 0, 0, 0, -1))
+
+
+def test_preload_and_state():
+    print("🧪 Test du préchargement et de l'état du modèle")
+    server, base = _start_stub()
+    try:
+        warmup = OllamaWarmup(base, "llama3.1:8b", keep_alive="30m")
+        assert warmup.status()["state"] == "cold"
+        assert warmup.preload() and warmup.last_load_seconds is not None
+        assert StubOllama.requests[-1] == {"model": "llama3.1:8b", "prompt": "", "stream": False, "keep_alive": "30m"}
+        status = warmup.status()
+        assert status["state"] == "loaded" and status["expires_at"] == "2026-01-01T12:30:00Z"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    unreachable = OllamaWarmup(base, "llama3.1:8b", timeout=1)
+    assert unreachable.status()["state"] == "unreachable"
+    assert not unreachable.preload() and unreachable.last_error
+    print("✅ Modèle préchargé, états loaded / cold / unreachable exposés")
+
+
+def test_keep_alive_follows_demand():
+    print("🧪 Test des pings keep-alive pilotés par la demande")
+    server, base = _start_stub()
+    try:
+        warmup = OllamaWarmup(base, "llama3.1:8b", ping_seconds=0.05)
+        assert not warmup.tick(), "aucun ping sans demande"
+        with warmup.hold():
+            assert warmup.tick()
+        assert warmup.demand() == 0 and not warmup.tick()
+
+        # Jobs en file côté serveur de jobs: la demande suit la file
+        class System:
+            pass
+
+        system = System()
+        system.warmup = warmup
+        manager = JobManager(lambda: system, max_workers=3)
+        manager._get_system()
+        gate = threading.Event()
+        system.generate_project = lambda brief, on_event=None, **options: gate.wait(5) and {"status": "success"}
+        jobs = [manager.submit(f"projet {i}") for i in range(3)]
+        assert warmup.demand() == 3 and manager.model_status()["state"] == "loaded"
+
+        warmup.start()
+        time.sleep(0.3)
+        pings = warmup.pings
+        assert pings >= 3, "préchargement puis pings périodiques attendus"
+        gate.set()
+        manager.shutdown()
+        assert all(job.done for job in jobs) and warmup.demand() == 0
+        time.sleep(0.15)
+        settled = warmup.pings
+        time.sleep(0.2)
+        assert warmup.pings == settled, "pings arrêtés une fois la file vide"
+        warmup.stop()
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✅ Pings tant que des runs ou des jobs sont actifs, silence ensuite")
+
+
+def test_business_hours_pin():
+    print("🧪 Test de l'épinglage aux heures ouvrées")
+    pin = PinWindow.parse("8-19", "mon-fri")
+    assert pin.weekdays == (0, 1, 2, 3, 4) and PinWindow.parse("9-17", "sat,sun").weekdays == (5, 6)
+    assert pin.seconds_left(_local(18)) == 3600
+    assert pin.seconds_left(_local(19)) == 0 and pin.seconds_left(_local(10, day=4)) == 0  # dimanche
+
+    server, base = _start_stub()
+    try:
+        now = {"t": _local(10)}
+        warmup = OllamaWarmup(base, "llama3.1:8b", keep_alive="30m", ping_seconds=240, pin=pin,
+                              clock=lambda: now["t"])
+        assert warmup.status()["pinned"] and warmup.tick(), "épinglé sans aucune demande"
+        assert StubOllama.requests[-1]["keep_alive"] == 9 * 3600 + 240, "chargé jusqu'à la fin de la plage"
+        now["t"] = _local(20)
+        assert not warmup.tick()
+        with warmup.hold():
+            warmup.tick()
+        assert StubOllama.requests[-1]["keep_alive"] == "30m"
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✅ Modèle épinglé pendant la plage configurée, keep-alive standard en dehors")
+
+
+def test_overnight_pin():
+    print("🧪 Test de l'épinglage sur une plage de nuit")
+    pin = PinWindow.parse("22-6", "mon-fri")
+    assert pin.seconds_left(_local(23)) == 7 * 3600, "lundi 23h: jusqu'à mardi 6h"
+    assert pin.seconds_left(_local(2, day=6)) == 4 * 3600, "mardi 2h: plage commencée lundi"
+    assert pin.seconds_left(_local(2, day=5)) == 0, "lundi 2h: dimanche n'est pas épinglé"
+    assert pin.seconds_left(_local(2, day=10)) == 4 * 3600, "samedi 2h: plage commencée vendredi"
+    assert pin.seconds_left(_local(23, day=10)) == 0 and pin.seconds_left(_local(12)) == 0
+    assert PinWindow.parse("22-6").seconds_left(time.mktime((2026, 1, 30, 23, 0, 0, 0, 0, -1))) == 7 * 3600, \
+        "vendredi 30 janvier: fin le 31"
+    for hours in ("8-8", "25-6", "8-30"):
+        try:
+            PinWindow.parse(hours)
+            assert False, f"plage {hours} acceptée"
+        except ValueError:
+            pass
+    print("✅ Plage 22h-6h épinglée à cheval sur deux jours, plages vides refusées")
+
+
+def test_pin_days():
+    print("🧪 Test des jours d'épinglage")
+    assert PinWindow.parse("8-19", "fri-mon").weekdays == (0, 4, 5, 6), "plage qui enjambe le week-end"
+    assert PinWindow.parse("8-19", "sat-sun,mon").weekdays == (0, 5, 6)
+    assert PinWindow.parse("8-19", "Monday, wed").weekdays == (0, 2)
+    assert PinWindow.parse("8-19", "sun-sun").weekdays == (6,)
+    assert PinWindow.parse("8-19", "fri-mon").seconds_left(_local(10, day=11)) == 9 * 3600, "dimanche épinglé"
+    for days in ("mon-fry", "lundi", "mon,,fri"):
+        try:
+            PinWindow.parse("8-19", days)
+            assert False, f"jours {days!r} acceptés"
+        except ValueError as e:
+            assert "Jour inconnu" in str(e)
+    print("✅ Plages de jours circulaires, jours inconnus refusés")
+
+
+if __name__ == "__main__":
+    test_preload_and_state()
+    test_keep_alive_follows_demand()
+    test_business_hours_pin()
+    test_overnight_pin()
+    test_pin_days()
+    print("🎉 Tous les tests de préchargement Ollama sont passés")
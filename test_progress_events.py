@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Test des événements de progression de generate_project (tâches et étapes des agents)"""
+
+from crewai.agents.parser import AgentAction, AgentFinish
+
+from lunacore.crew_system import LunaCrewSystem
+from offline_crew import isolated_sandbox
+
+
+def test_task_and_step_events():
+    print("🧪 Test des callbacks de tâches et d'étapes")
+    with isolated_sandbox() as tmp:
+        system = LunaCrewSystem()
+        events = []
+        agents = system._create_agents(on_event=events.append)
+        tasks = system._create_project_tasks_with_brief("API de blog", "fastapi", agents=agents)
+        context_report = {}
+        system._attach_context_budget(tasks, tmp, context_report)
+        system._attach_progress(tasks, events.append)
+
+        tasks[0].callback(None)
+        assert "developer" in context_report, "le callback de contexte budgété n'est plus chaîné"
+        completed = [e for e in events if e["event"] == "task_completed"]
+        assert completed[0]["agent"] == "Superviseur" and completed[0]["index"] == 0 and completed[0]["total"] == 3
+
+        developer = agents["developer"]
+        developer.step_callback(AgentAction(thought="écrire le modèle", tool="write_file", tool_input="{}", text=""))
+        developer.step_callback(AgentFinish(thought="", output="fini", text=""))
+        steps = [e for e in events if e["event"] == "step"]
+        assert [(s["agent"], s["kind"], s["tool"]) for s in steps] == [
+            ("Développeur", "action", "write_file"), ("Développeur", "finish", None)]
+        assert all("time" in e for e in events)
+
+        # Run suivant sans callback: ses agents n'émettent rien, ceux de référence non plus
+        assert system._create_agents()["developer"].step_callback is None
+        assert system.agents["developer"].step_callback is None
+    print("✅ Tâches et étapes réelles notifiées, callbacks existants préservés")
+
+
+def test_failing_callback_is_contained():
+    print("🧪 Test d'un callback de progression défaillant")
+
+    def broken(_event):
+        raise RuntimeError("client déconnecté")
+
+    LunaCrewSystem._emit(broken, "stage", stage="crew")
+    LunaCrewSystem._emit(None, "stage", stage="crew")
+    print("✅ Les erreurs du callback n'interrompent pas la génération")
+
+
+if __name__ == "__main__":
+    test_task_and_step_events()
+    test_failing_callback_is_contained()
+    print("🎉 Tous les tests de progression sont passés")
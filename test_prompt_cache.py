@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Test de l'ordre des prompts (préfixe stable entre runs) et du suivi des tokens servis par le cache"""
+
+from lunacore.run_budget import llm_cost
+from lunacore.speculative import SpeculativeDeveloper
+from offline_crew import ScriptedLLM, generate, isolated_sandbox, offline_system
+
+PROMPTS = []  # prompts reçus, dans l'ordre (hors du modèle pydantic, qui copie ses champs)
+
+
+def _prompt(messages) -> str:
+    return "".join(f"{m['role']}:{m['content']}\n" for m in messages)
+
+
+def _common_prefix(a: str, b: str) -> int:
+    size = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        size += 1
+    return size
+
+
+class PrefixCachingLLM(ScriptedLLM):
+    """Simule le cache de préfixe du fournisseur: ~4 caractères par token, préfixe déjà vu = cache"""
+
+    def record(self, messages):
+        prompt = _prompt(messages)
+        cached = max((_common_prefix(prompt, seen) for seen in PROMPTS), default=0)
+        PROMPTS.append(prompt)
+        self._track_token_usage_internal({"prompt_tokens": len(prompt) // 4, "completion_tokens": 10,
+                                          "prompt_tokens_details": {"cached_tokens": cached // 4}})
+
+
+def test_stable_prefix_across_runs():
+    print("🧪 Test du préfixe identique entre deux briefs différents")
+    with isolated_sandbox():
+        system = offline_system()
+        system._bind_llm = lambda kind: PrefixCachingLLM(model="openai/gpt-4o-mini")
+        first = generate(system, "Calculatrice simple")
+        second = generate(system, "Convertisseur de devises")
+    assert first["status"] == second["status"] == "success", (first.get("error"), second.get("error"))
+
+    planner_a, planner_b = PROMPTS[0], PROMPTS[3]
+    brief_at = planner_b.index("Convertisseur de devises")
+    assert _common_prefix(planner_a, planner_b) >= brief_at - len("'''"), "tout ce qui précède le brief est identique"
+    trailer = planner_b[brief_at + len("Convertisseur de devises"):]
+    assert planner_a.endswith(trailer) and "Brief:" not in trailer, "après le brief: seul le gabarit fixe de CrewAI"
+
+    usage = second["token_usage"]
+    assert usage["cached_prompt_tokens"] > usage["prompt_tokens"] * 0.8, usage
+    budget = second["budget"]["usage"]["run"]
+    assert budget["cached_prompt_tokens"] == usage["cached_prompt_tokens"]
+    assert budget["cost"] < llm_cost("gpt-4o-mini", budget["prompt_tokens"], budget["completion_tokens"])
+    assert first["token_usage"]["cached_prompt_tokens"] < usage["cached_prompt_tokens"]
+    print(f"✅ Second run: {usage['cached_prompt_tokens']}/{usage['prompt_tokens']} tokens de prompt en cache")
+
+
+def test_speculative_prompt_order():
+    print("🧪 Test de l'ordre du prompt spéculatif (consignes, brief, contexte, fichier)")
+    developer = SpeculativeDeveloper(lambda temperature: None, k=1, persona="Persona")
+    first = developer._messages("app/a.py", "Brief", "Contexte A")[1]["content"]
+    second = developer._messages("app/b.py", "Brief", "Contexte B")[1]["content"]
+    assert first.index("Brief") < first.index("Contexte A") < first.index("app/a.py")
+    assert _common_prefix(first, second) == first.index("Contexte A") + len("Contexte ")
+    print("✅ Seuls le contexte et le fichier diffèrent, en fin de message")
+
+
+def test_cost_with_cached_tokens():
+    print("🧪 Test du coût des tokens servis par le cache")
+    assert llm_cost("openai/gpt-4o-mini", 1_000_000, 0) == 0.15
+    assert abs(llm_cost("openai/gpt-4o-mini", 1_000_000, 0, cached_prompt_tokens=1_000_000) - 0.075) < 1e-9
+    assert llm_cost("ollama/llama3.1:8b", 1_000_000, 1_000, cached_prompt_tokens=500_000) == 0
+    print("✅ Tokens en cache facturés à moitié prix")
+
+
+if __name__ == "__main__":
+    test_stable_prefix_across_runs()
+    test_speculative_prompt_order()
+    test_cost_with_cached_tokens()
+    print("🎉 Tous les tests de cache de prompt sont passés")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Test de la réparation ciblée: seuls les fichiers en échec sont régénérés"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from crewai.llms.base_llm import BaseLLM
+
+from lunacore.repair import RepairStage, failing_files
+from lunacore.validation import validate_run_dir
+from lunacore.verification import get_verification_pool
+from offline_crew import isolated_sandbox, offline_system, patched_kickoff, write_file
+
+BUGGY_CALC = "def add(a, b):\n    return a - b\n"
+FIXED = {
+    "app/calc.py": "def add(a, b):\n    return a + b\n",
+    "app/broken.py": "VALUE = 42\n",
+}
+TEST_CALC = "from app.calc import add\n\n\ndef test_add():\n    assert add(2, 3) == 5\n"
+
+
+class FixerLLM(BaseLLM):
+    """Renvoie la version corrigée du fichier nommé dans le prompt de réparation"""
+
+    calls: list = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        prompt = messages[-1]["content"]
+        filename = prompt.split("Fichier en échec: '", 1)[1].split("'", 1)[0]
+        self.calls.append(filename)
+        self._token_usage["total_tokens"] += 100
+        self._token_usage["prompt_tokens"] += 100
+        return f"Voici le fichier corrigé:\n```python\n{FIXED[filename]}```"
+
+    def supports_function_calling(self):
+        return False
+
+
+def _write(run_dir: Path, rel: str, content: str):
+    path = run_dir / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+def _project(run_dir: Path, modules: int = 37):
+    files = ["app/__init__.py", "app/calc.py", "app/broken.py"] + [f"app/mod_{i:02d}.py" for i in range(modules)]
+    _write(run_dir, "plan.json", json.dumps({"files": files + ["tests/test_calc.py"]}))
+    _write(run_dir, "app/__init__.py", "")
+    _write(run_dir, "app/calc.py", BUGGY_CALC)
+    _write(run_dir, "app/broken.py", "VALUE = (42\n")
+    for i in range(modules):
+        _write(run_dir, f"app/mod_{i:02d}.py", f"def value():\n    return {i}\n")
+    _write(run_dir, "tests/test_calc.py", TEST_CALC)
+
+
+def test_failure_mapping():
+    print("🧪 Test de l'association échec -> fichier")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp)
+        _project(run_dir, modules=1)
+        validation = {"files": {"app/broken.py": {"status": "syntax_error", "errors": ["ligne 1: '(' was never closed"]},
+                                "app/calc.py": {"status": "ok", "errors": []}}}
+        tests = {"failures": [
+            {"test": "tests.test_calc::test_add", "message": "assert -1 == 5",
+             "details": f'File "{run_dir}/tests/test_calc.py", line 5, in test_add\n'
+                        "app/calc.py:2: in add\n/usr/lib/python3.11/functools.py:10: in wrapper"},
+            {"test": "tests.test_calc::test_add", "message": "assert -1 == 5",
+             "details": "def test_add():\n>       assert add(2, 3) == 5\n\ntests/test_calc.py:5: AssertionError"},
+            {"test": "tests.test_calc::test_other", "message": "assert False",
+             "details": "tests/test_calc.py:9: AssertionError"},
+            {"test": "tests.test_calc::test_lost", "message": "timeout", "details": ""},
+        ]}
+        failing = failing_files(run_dir, validation, tests)
+        assert sorted(failing) == ["app/broken.py", "app/calc.py", "tests/test_calc.py"]
+        assert len(failing["app/calc.py"]) == 2, "assertion du test ramenée au module testé"
+        assert "assert -1 == 5" in failing["app/calc.py"][0]
+
+        stage = RepairStage(lambda owner: None, lambda owner: "", owners={"tests/test_calc.py": "tester",
+                                                                          "app/calc.py": "developer"})
+        assert stage.owner("tests/test_calc.py") == "tester" and stage.owner("app/broken.py") == "developer"
+    print("✅ Erreurs de validation et traces de tests ramenées au fichier responsable")
+
+
+def test_repairs_only_failing_files():
+    print("🧪 Test de la réparation de 2 fichiers sur 40")
+    with isolated_sandbox() as root:
+        run_dir = root / "run"
+        _project(run_dir)
+        assert len(list(run_dir.rglob("*.py"))) == 41
+        validation = validate_run_dir(run_dir)
+        tests = get_verification_pool().verify(run_dir)
+        assert validation["status"] == "error" and tests["status"] == "failed"
+
+        llm = FixerLLM(model="fixer", calls=[])
+        stage = RepairStage(lambda owner: llm, lambda owner: f"Persona {owner}", max_rounds=3)
+        repaired = stage.run(run_dir, lambda: validate_run_dir(run_dir),
+                             lambda: get_verification_pool().verify(run_dir), validation, tests)
+        report = repaired["report"]
+        assert sorted(llm.calls) == ["app/broken.py", "app/calc.py"], llm.calls
+        assert report["status"] == "repaired" and report["generations"] == 2 and len(report["rounds"]) == 1
+        assert repaired["validation"]["status"] == "ok" and repaired["tests"]["status"] == "passed"
+
+        # Fichier irréparable: la boucle s'arrête dès qu'une passe ne change plus rien
+        _write(run_dir, "app/calc.py", BUGGY_CALC)
+        FIXED_BACKUP = FIXED["app/calc.py"]
+        FIXED["app/calc.py"] = BUGGY_CALC
+        try:
+            llm.calls = []
+            repaired = stage.run(run_dir, lambda: validate_run_dir(run_dir),
+                                 lambda: get_verification_pool().verify(run_dir), validate_run_dir(run_dir),
+                                 get_verification_pool().verify(run_dir))
+        finally:
+            FIXED["app/calc.py"] = FIXED_BACKUP
+        assert repaired["report"]["status"] == "partial" and repaired["report"]["failing"] == ["app/calc.py"]
+        assert llm.calls == ["app/calc.py"], "pas de nouvelle passe sans progrès"
+    print("✅ 2 régénérations pour 2 fichiers en échec, boucle bornée")
+
+
+def kickoff_with_bug(crew, inputs=None):
+    """Kickoff simulé: chaque agent écrit ses fichiers via son write_file (manifeste d'écriture)"""
+    for task in crew.tasks:
+        if task.agent.role == "Superviseur":
+            write_file(task.agent, "plan.json", json.dumps(
+                {"files": ["app/__init__.py", "app/calc.py", "tests/test_calc.py"]}))
+        elif task.agent.role == "Testeur":
+            write_file(task.agent, "tests/test_calc.py", TEST_CALC)
+        else:
+            write_file(task.agent, "app/__init__.py", "")
+            write_file(task.agent, "app/calc.py", BUGGY_CALC)
+    return None
+
+
+def test_generation_repair_stage():
+    print("🧪 Test de l'étape de réparation dans generate_project")
+    calls, events = [], []
+    with isolated_sandbox(), patched_kickoff(kickoff_with_bug):
+        system = offline_system()
+        system._bind_llm = lambda kind: FixerLLM(model="fixer", calls=calls)  # un LLM par agent
+        result = system.generate_project("Calculatrice", template="custom", run_tests=True,
+                                         memory_mode="off", on_event=events.append, repair_rounds=2)
+    assert result["status"] == "success", result.get("error")
+    assert result["repair"]["status"] == "repaired" and result["repair"]["generations"] == 1
+    assert result["repair"]["files"]["app/calc.py"][0]["owner"] == "developer"
+    assert result["tests"]["status"] == "passed" and result["files"]["app/calc.py"] == FIXED["app/calc.py"]
+    assert result["token_usage"]["total_tokens"] == 100
+    assert any(e.get("stage") == "repair" for e in events)
+    print("✅ Fichier en échec réparé par son auteur, tests repassés")
+
+
+if __name__ == "__main__":
+    test_failure_mapping()
+    test_repairs_only_failing_files()
+    test_generation_repair_stage()
+    print("🎉 Tous les tests de réparation sont passés")
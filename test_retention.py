@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Test de la politique de rétention des runs"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from lunacore.retention import RetentionManager, RetentionPolicy, mark_run_active, pin_run
+from lunacore.run_catalog import RunCatalog
+
+
+def _make_runs(root: Path, catalog: RunCatalog, now: float):
+    """6 runs de 1000 octets, du plus ancien (run_0) au plus récent (run_5)"""
+    runs = []
+    for i in range(6):
+        project = "api_blog" if i % 2 == 0 else "bot_discord"
+        run_dir = root / f"{project}_2025010{i}_000000"
+        run_dir.mkdir(parents=True)
+        (run_dir / "main.py").write_bytes(b"x" * 1000)
+        created = now - (6 - i) * 86400
+        os.utime(run_dir, (created, created))
+        catalog.record({"run_id": run_dir.name, "project_name": project, "status": "success",
+                        "created_at": created, "accessed_at": created, "total_bytes": 1000})
+        runs.append(run_dir)
+    return runs
+
+
+def test_policies():
+    print("🧪 Test des critères de rétention")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "crew_output"
+        catalog = RunCatalog(Path(tmp) / "catalog.sqlite3")
+        now = time.time()
+        runs = _make_runs(root, catalog, now)
+
+        by_age = RetentionManager(RetentionPolicy(max_age_days=4.5), root, catalog).plan(now)
+        assert {r["reason"] for r in by_age} == {"max_age"}
+        assert len(by_age) == 2
+
+        keep = RetentionManager(RetentionPolicy(keep_last_per_project=2), root, catalog).plan(now)
+        assert [r["run_id"] for r in keep] == ["api_blog_20250100_000000", "bot_discord_20250101_000000"]
+
+        # Quota: le run le plus ancien a été consulté récemment, il doit survivre
+        catalog.touch(runs[0].name)
+        quota = RetentionManager(RetentionPolicy(max_total_bytes=3500), root, catalog).plan(now)
+        assert [r["run_id"] for r in quota] == [p.name for p in runs[1:4]]
+        catalog.close()
+    print("✅ Âge, N derniers et quota LRU respectés")
+
+
+def test_protected_runs_and_enforce():
+    print("🧪 Test protection des runs actifs/épinglés")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "crew_output"
+        catalog = RunCatalog(Path(tmp) / "catalog.sqlite3")
+        runs = _make_runs(root, catalog, time.time())
+        mark_run_active(runs[0])
+        pin_run(runs[1])
+        for run in runs[:2]:
+            old = time.time() - 10 * 86400
+            os.utime(run, (old, old))
+
+        exports = Path(tmp) / "exports"
+        exports.mkdir()
+        archives = [exports / f"{run.name}-0123456789abcdef.zip" for run in runs[:3]]
+        for archive in archives:
+            archive.write_bytes(b"PK")
+
+        manager = RetentionManager(RetentionPolicy(max_total_bytes=0, pause_between_deletes=0), root, catalog,
+                                   export_dir=exports)
+        evicted = manager.enforce()
+        assert len(evicted) == 4
+        assert runs[0].exists() and runs[1].exists()
+        assert not runs[2].exists()
+        assert archives[0].exists() and archives[1].exists() and not archives[2].exists(), \
+            "archive ZIP supprimée avec son run"
+        assert catalog.get(runs[2].name)["evicted_at"] is not None
+        catalog.close()
+    print("✅ Runs en cours et épinglés conservés, archives des runs évincés supprimées")
+
+
+if __name__ == "__main__":
+    test_policies()
+    test_protected_runs_and_enforce()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Test des budgets de run (tokens, coût, temps) et de l'arrêt avec résultats partiels"""
+
+import os
+import time
+from pathlib import Path
+
+from crewai.agents.parser import AgentAction
+
+from lunacore.crew_system import AGENT_TEMPLATES
+from lunacore.run_budget import (TEMPLATE_BUDGETS, BudgetConfig, BudgetExceeded, BudgetLimits, RunBudget,
+                                 budget_for_template, llm_cost)
+from lunacore.scaffolds import SCAFFOLDS
+from offline_crew import isolated_sandbox, offline_system, patched_kickoff, write_file
+
+
+class FakeUsage:
+    def __init__(self, prompt, completion):
+        self.prompt_tokens = prompt
+        self.completion_tokens = completion
+        self.total_tokens = prompt + completion
+
+
+class FakeLLM:
+    """Compteurs de tokens mis à jour « à chaque réponse » par le test"""
+
+    def __init__(self, model):
+        self.model = model
+        self.prompt, self.completion = 0, 0
+
+    def get_token_usage_summary(self):
+        return FakeUsage(self.prompt, self.completion)
+
+
+def test_limits_and_costs():
+    print("🧪 Test des plafonds par agent et par run")
+    assert abs(llm_cost("gpt-4o-mini", 1_000_000, 1_000_000) - 0.75) < 1e-9
+    assert llm_cost("llama3.1:8b", 10_000, 10_000) == 0.0
+
+    budget = RunBudget(BudgetConfig(run=BudgetLimits(max_tokens=1000, max_cost=0.0001),
+                                    agents={"developer": BudgetLimits(max_tokens=300)}))
+    supervisor, developer = budget.track("supervisor", FakeLLM("gpt-4o-mini")), budget.track("developer", FakeLLM("llama3.1:8b"))
+    developer.prompt = 250
+    budget.check("developer")
+    developer.completion = 100
+    try:
+        budget.check("developer")
+        raise AssertionError("plafond de l'agent ignoré")
+    except BudgetExceeded as e:
+        assert (e.scope, e.metric, e.value) == ("developer", "tokens", 350)
+
+    budget = RunBudget(BudgetConfig(run=BudgetLimits(max_cost=0.0001)))
+    budget.track("supervisor", FakeLLM("gpt-4o-mini")).completion = 200  # 0.00012 USD
+    try:
+        budget.check("supervisor")
+        raise AssertionError("plafond de coût ignoré")
+    except BudgetExceeded as e:
+        assert e.scope == "run" and e.metric == "cost"
+    report = budget.report()
+    assert report["exceeded"]["metric"] == "cost" and report["usage"]["run"]["completion_tokens"] == 200
+
+    budget = RunBudget(BudgetConfig(agents={"tester": BudgetLimits(max_seconds=0.05)}))
+    budget.track("tester", FakeLLM("llama3.1:8b"))
+    time.sleep(0.06)
+    try:
+        budget.check("tester")
+        raise AssertionError("plafond de temps ignoré")
+    except BudgetExceeded as e:
+        assert e.metric == "seconds"
+    print("✅ Tokens, coût et temps contrôlés par périmètre")
+
+
+def test_template_config():
+    print("🧪 Test de la configuration par template")
+    assert budget_for_template("inconnu") == budget_for_template("default")
+    assert budget_for_template("cli").run.max_tokens < budget_for_template("fastapi").run.max_tokens
+    assert budget_for_template("streamlit").run.max_tokens < budget_for_template("flask").run.max_tokens
+    # Chaque scaffold livré a un budget explicite, complet pour les trois agents
+    for template in SCAFFOLDS:
+        assert template in TEMPLATE_BUDGETS, f"{template} retombe sur le budget par défaut"
+        config = budget_for_template(template)
+        assert None not in (config.run.max_tokens, config.run.max_cost, config.run.max_seconds), template
+        assert set(config.agents) == set(AGENT_TEMPLATES), template
+        assert all(limits.max_tokens <= config.run.max_tokens for limits in config.agents.values()), template
+    os.environ["LUNACORE_BUDGET_MAX_TOKENS"] = "5000"
+    os.environ["LUNACORE_BUDGET_MAX_SECONDS"] = "0"
+    try:
+        config = budget_for_template("fastapi")
+        assert config.run.max_tokens == 5000 and config.run.max_seconds is None
+        assert config.agents == budget_for_template("default").agents
+    finally:
+        del os.environ["LUNACORE_BUDGET_MAX_TOKENS"], os.environ["LUNACORE_BUDGET_MAX_SECONDS"]
+    print("✅ Budgets par template, surcharges d'environnement")
+
+
+def looping_kickoff(crew, inputs=None):
+    """Kickoff simulé: le développeur réécrit en boucle, chaque réponse consomme des tokens"""
+    for task in crew.tasks:
+        if task.agent.role == "Superviseur":
+            write_file(task.agent, "plan.json", '{"files": ["app/models.py"]}')
+            continue
+        for i in range(50):
+            write_file(task.agent, "app/models.py", f"VERSION = {i}\n")
+            task.agent.llm._token_usage["prompt_tokens"] += 2000
+            task.agent.llm._token_usage["total_tokens"] += 2000
+            task.agent.step_callback(AgentAction(thought="réécriture", tool="write_file", tool_input="{}", text=""))
+    raise AssertionError("la boucle aurait dû être interrompue")
+
+
+def test_generation_stops_with_partial_results():
+    print("🧪 Test de l'arrêt d'une génération qui boucle")
+    events = []
+    with isolated_sandbox(), patched_kickoff(looping_kickoff):
+        system = offline_system()
+        result = system.generate_project(
+            "Projet boucle infinie", run_tests=True, memory_mode="off", on_event=events.append,
+            budget=BudgetConfig(run=BudgetLimits(max_tokens=100_000), agents={"developer": BudgetLimits(max_tokens=9000)}))
+        models = Path(result["output_directory"], "app/models.py").read_text(encoding="utf-8")
+
+    assert result["status"] == "budget_exceeded", result.get("error")
+    assert "developer" in result["error"]
+    assert result["budget"]["exceeded"]["scope"] == "developer"
+    assert result["token_usage"]["total_tokens"] == 10_000, "consommation arrêtée au premier dépassement"
+    assert models == "VERSION = 4\n"
+    assert result["validation"]["status"] != "skipped" and result["tests"]["status"] == "skipped"
+    assert any(e.get("stage") == "budget_exceeded" for e in events)
+    assert events[-1]["event"] == "finished" and events[-1]["status"] == "budget_exceeded"
+
+    # CrewAI ne rejoue pas la tâche: BudgetExceeded fait partie des arrêts volontaires
+    agent = system._create_agents()["developer"]
+    try:
+        try:
+            raise BudgetExceeded("developer", "tokens", 1, 2)
+        except BudgetExceeded as exc:
+            agent._check_execution_error(exc, None)  # appelé dans le except de execute_task
+        raise AssertionError("BudgetExceeded absorbé par les retries de l'agent")
+    except BudgetExceeded:
+        pass
+    print("✅ Run arrêté proprement, fichiers conservés et validés, statut explicite")
+
+
+if __name__ == "__main__":
+    test_limits_and_costs()
+    test_template_config()
+    test_generation_stops_with_partial_results()
+    print("🎉 Tous les tests de budget sont passés")
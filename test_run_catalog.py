@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Test du catalogue SQLite des runs"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from lunacore.run_catalog import RunCatalog, run_entry
+
+
+def test_record_and_query():
+    print("🧪 Test enregistrement et requêtes du catalogue")
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = RunCatalog(Path(tmp) / "catalog.sqlite3")
+        now = time.time()
+        for i in range(30):
+            catalog.record({
+                "run_id": f"api_blog_{i}",
+                "project_name": "api_blog" if i % 2 else "bot_discord",
+                "template": "fastapi" if i % 3 else "cli",
+                "status": "success" if i % 5 else "error",
+                "created_at": now - i * 3600,
+                "duration": float(i),
+                "file_count": i,
+                "total_bytes": i * 100,
+                "total_tokens": i * 10,
+            })
+
+        assert catalog.count() == 30
+        latest = catalog.list_runs(limit=3)
+        assert [r["run_id"] for r in latest] == ["api_blog_0", "api_blog_1", "api_blog_2"]
+        errors = catalog.list_runs(status="error")
+        assert {r["run_id"] for r in errors} == {f"api_blog_{i}" for i in (0, 5, 10, 15, 20, 25)}
+        recent = catalog.count(since=now - 5.5 * 3600)
+        assert recent == 6
+        longest = catalog.list_runs(template="fastapi", order_by="duration", limit=1)[0]
+        assert longest["run_id"] == "api_blog_29"
+
+        stats = {row["key"]: row for row in catalog.stats("template")}
+        assert stats["fastapi"]["runs"] + stats["cli"]["runs"] == 30
+
+        # Le plan de requête utilise les index, pas un parcours de table
+        plan = catalog._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM runs WHERE status = ? ORDER BY created_at DESC LIMIT 5", ("error",)
+        ).fetchall()
+        assert any("idx_runs_status" in row[-1] for row in plan)
+        catalog.close()
+    print("✅ Requêtes indexées OK")
+
+
+def test_run_entry_and_backfill():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "crew_output"
+        run_dir = root / "api_blog_20250101_120000"
+        run_dir.mkdir(parents=True)
+        (run_dir / "main.py").write_text("print(1)\n", encoding="utf-8")
+
+        entry = run_entry(run_dir, "api_blog", "fastapi", "brief", 1.0,
+                          {"status": "success", "execution_time": 2.5, "token_usage": {"total_tokens": 42}})
+        assert entry["file_count"] == 1 and entry["total_bytes"] == 9 and entry["total_tokens"] == 42
+
+        catalog = RunCatalog(Path(tmp) / "catalog.sqlite3")
+        assert catalog.backfill(root) == 1
+        assert catalog.get("api_blog_20250101_120000")["project_name"] == "api_blog"
+        assert catalog.backfill(root) == 0
+        catalog.close()
+
+
+def test_previous_run():
+    print("🧪 Test du run précédent d'un même brief")
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = RunCatalog(Path(tmp) / "catalog.sqlite3")
+        for i, brief in enumerate(["API de blog", "API de blog", "Autre brief", "API de blog"]):
+            catalog.record({"run_id": f"api_blog_{i}", "project_name": "api_blog", "template": "fastapi",
+                            "status": "success", "brief": brief, "output_directory": f"{tmp}/api_blog_{i}",
+                            "created_at": 100.0 + i})
+        assert catalog.previous_run("api_blog_3")["run_id"] == "api_blog_1"
+        catalog.mark_evicted("api_blog_1")
+        assert catalog.previous_run("api_blog_3")["run_id"] == "api_blog_0"
+        assert catalog.previous_run("api_blog_0") is None and catalog.previous_run("inconnu") is None
+        catalog.close()
+    print("✅ Run précédent du même brief (runs supprimés ignorés)")
+
+
+if __name__ == "__main__":
+    test_record_and_query()
+    test_run_entry_and_backfill()
+    test_previous_run()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Test du manifeste des runs (chemin, taille, sha256) et des différences entre deux runs"""
+
+import hashlib
+import json
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import lunacore.run_manifest as run_manifest
+from lunacore.job_server import create_server
+from lunacore.run_manifest import diff_runs, load_manifest, write_manifest
+from offline_crew import generate, isolated_sandbox, offline_system, patched_kickoff, write_file
+
+
+def _write(run_dir: Path, files: dict):
+    for rel, content in files.items():
+        path = run_dir / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def test_diff_from_hashes():
+    print("🧪 Test du diff entre deux runs sans relire les fichiers inchangés")
+    with tempfile.TemporaryDirectory() as tmp:
+        old, new = Path(tmp) / "run_1", Path(tmp) / "run_2"
+        common = {f"app/mod_{i:02d}.py": f"VALUE = {i}\n" for i in range(30)}
+        _write(old, dict(common, **{"app/calc.py": "def add(a, b):\n    return a - b\n", "old.txt": "x\n"}))
+        _write(new, dict(common, **{"app/calc.py": "def add(a, b):\n    return a + b\n", "README.md": "# Calc\n"}))
+        manifest = write_manifest(old)
+        write_manifest(new)
+        entry = next(e for e in manifest if e["path"] == "app/calc.py")
+        assert entry["size"] == 32 and entry["sha256"] == hashlib.sha256((old / "app/calc.py").read_bytes()).hexdigest()
+
+        reads = []
+        original_hash, original_lines = run_manifest.file_sha256, run_manifest._read_lines
+        run_manifest.file_sha256 = lambda path: reads.append(path) or original_hash(path)
+        run_manifest._read_lines = lambda path: reads.append(path) or original_lines(path)
+        try:
+            changes = diff_runs(old, new)
+            assert reads == [], "manifestes seuls: aucun fichier du projet lu"
+            with_diff = diff_runs(old, new, diffs=["app/calc.py", "app/mod_00.py"])
+        finally:
+            run_manifest.file_sha256, run_manifest._read_lines = original_hash, original_lines
+
+        assert [e["path"] for e in changes["added"]] == ["README.md"]
+        assert [e["path"] for e in changes["removed"]] == ["old.txt"]
+        assert [e["path"] for e in changes["modified"]] == ["app/calc.py"] and changes["unchanged"] == 30
+        assert changes["diffs"] == {} and list(with_diff["diffs"]) == ["app/calc.py"]
+        assert "-    return a - b" in with_diff["diffs"]["app/calc.py"]
+        assert "+    return a + b" in with_diff["diffs"]["app/calc.py"]
+        assert sorted(p.name for p in reads) == ["calc.py", "calc.py"], "seul le fichier demandé est lu"
+
+        # Run antérieur sans manifeste: recalculé puis mémorisé
+        (new / ".lunacore" / "manifest.json").unlink()
+        assert load_manifest(new) == load_manifest(new) and (new / ".lunacore" / "manifest.json").exists()
+    print("✅ 1 ajouté, 1 supprimé, 1 modifié, 30 inchangés jamais relus; diff du seul fichier demandé")
+
+
+def kickoff_writes(crew, inputs=None):
+    """Kickoff simulé: chaque agent écrit un fichier via son write_file"""
+    for task in crew.tasks:
+        write_file(task.agent, f"{task.agent.role.lower()}.txt", f"{task.agent.role}\n")
+    return None
+
+
+def test_generation_returns_manifest():
+    print("🧪 Test du manifeste retourné par generate_project")
+    with isolated_sandbox(), patched_kickoff(kickoff_writes):
+        result = generate(offline_system())
+        manifest_path = Path(result["output_directory"]) / ".lunacore" / "manifest.json"
+        written = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert result["status"] == "success", result.get("error")
+    assert [e["path"] for e in result["manifest"]] == sorted(result["files"])
+    for entry in result["manifest"]:
+        content = result["files"][entry["path"]].encode("utf-8")
+        assert entry["size"] == len(content) and entry["sha256"] == hashlib.sha256(content).hexdigest()
+    assert written["files"] == result["manifest"]
+    print(f"✅ Manifeste de {len(result['manifest'])} fichiers, identique au disque")
+
+
+class StubSystem:
+    """Deux runs du même brief: le second modifie un fichier et en ajoute un"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.count = 0
+
+    def generate_project(self, brief, template="fastapi", on_event=None, **kwargs):
+        self.count += 1
+        run_dir = self.root / f"run_{self.count}"
+        on_event({"event": "started", "run_id": run_dir.name, "output_directory": str(run_dir), "time": time.time()})
+        files = {"app/main.py": f"VERSION = {self.count}\n", "README.md": "# Demo\n"}
+        if self.count == 2:
+            files["app/extra.py"] = "EXTRA = True\n"
+        _write(run_dir, files)
+        return {"status": "success", "output_directory": str(run_dir), "execution_time": 0.1}
+
+
+def _wait(base, job_id):
+    for _ in range(100):
+        with urllib.request.urlopen(f"{base}/jobs/{job_id}", timeout=5) as response:
+            if json.loads(response.read())["status"] == "success":
+                return
+        time.sleep(0.05)
+    raise AssertionError("job non terminé")
+
+
+def test_job_server_diff():
+    print("🧪 Test de la route /jobs/<id>/diff")
+    with tempfile.TemporaryDirectory() as tmp:
+        system = StubSystem(Path(tmp))
+        server = create_server(port=0, workers=1, system_factory=lambda: system)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            ids = []
+            for _ in range(2):
+                request = urllib.request.Request(f"{base}/jobs", data=json.dumps({"brief": "Demo"}).encode("utf-8"),
+                                                 method="POST")
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    ids.append(json.loads(response.read())["id"])
+                _wait(base, ids[-1])
+            with urllib.request.urlopen(f"{base}/jobs/{ids[1]}/manifest", timeout=5) as response:
+                assert all(len(f["sha256"]) == 64 for f in json.loads(response.read())["files"])
+            with urllib.request.urlopen(f"{base}/jobs/{ids[1]}/diff?against={ids[0]}&diff=app/main.py",
+                                        timeout=5) as response:
+                report = json.loads(response.read())
+        finally:
+            server.shutdown()
+            server.manager.shutdown()
+    assert [e["path"] for e in report["added"]] == ["app/extra.py"] and report["removed"] == []
+    assert [e["path"] for e in report["modified"]] == ["app/main.py"] and report["unchanged"] == 1
+    assert list(report["diffs"]) == ["app/main.py"] and "+VERSION = 2" in report["diffs"]["app/main.py"]
+    print("✅ Différences entre deux jobs servies par l'API")
+
+
+if __name__ == "__main__":
+    test_diff_from_hashes()
+    test_generation_returns_manifest()
+    test_job_server_diff()
+    print("🎉 Tous les tests de manifeste sont passés")
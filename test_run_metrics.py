@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Test de l'échantillonnage des ressources d'un run et de la détection de fuites"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from lunacore.run_metrics import ResourceSampler, leak_check
+from offline_crew import generate, isolated_sandbox, offline_system, patched_kickoff, write_file
+
+LEAKED = []  # mémoire volontairement retenue entre deux runs
+
+
+def slow_kickoff(crew, inputs=None):
+    """Kickoff simulé: chaque tâche écrit un fichier, signale une étape et dure un peu"""
+    for task in crew.tasks:
+        write_file(task.agent, f"{task.agent.role.lower()}.txt", task.agent.role)
+        task.agent.step_callback(type("Finish", (), {"output": "ok", "thought": ""})())
+        time.sleep(0.15)
+        task.callback(None)
+    return None
+
+
+def test_sampler_tags_and_summary():
+    print("🧪 Test des échantillons étiquetés par étape et agent")
+    sampler = ResourceSampler(interval=0.05)
+    events = []
+    observe = sampler.observe(events.append)
+    sampler.start()
+    observe({"event": "stage", "stage": "crew"})
+    sampler.follow(["Superviseur", "Développeur"])
+    time.sleep(0.15)
+    observe({"event": "task_completed", "index": 0})
+    time.sleep(0.15)
+    observe({"event": "stage", "stage": "validation"})
+    time.sleep(0.1)
+    sampler.stop()
+    summary = sampler.summary()
+    assert len(events) == 3, "événements transmis au callback d'origine"
+    assert summary["status"] == "ok" and summary["samples"] >= 6
+    assert {"Superviseur", "Développeur", "validation"} <= set(summary["tasks"])
+    assert summary["rss_peak"] >= summary["rss_start"] > 0 and summary["threads_peak"] >= 1
+    assert ResourceSampler(interval=0).start().summary() == {"status": "disabled"}
+    print(f"✅ {summary['samples']} échantillons, étiquettes {sorted(summary['tasks'])}")
+
+
+def test_generation_writes_metrics():
+    print("🧪 Test du fichier de métriques d'un generate_project")
+    os.environ["LUNACORE_METRICS_INTERVAL"] = "0.05"
+    try:
+        with isolated_sandbox(), patched_kickoff(slow_kickoff):
+            result = generate(offline_system())
+            metrics_path = Path(result["output_directory"]) / ".lunacore" / "metrics.json"
+            metrics = json.loads(metrics_path.read_text(encoding="utf-8"))
+    finally:
+        del os.environ["LUNACORE_METRICS_INTERVAL"]
+    assert result["status"] == "success", result.get("error")
+    assert metrics["summary"] == result["metrics"] and len(metrics["samples"]) >= 5
+    tags = {sample["task"] for sample in metrics["samples"]}
+    assert {"Superviseur", "Développeur", "Testeur"} <= tags, tags
+    assert all({"rss", "cpu", "threads", "fds", "stage"} <= set(sample) for sample in metrics["samples"])
+    assert ".lunacore/metrics.json" not in result["files"]
+    print(f"✅ {len(metrics['samples'])} échantillons écrits, pic RSS {result['metrics']['rss_peak'] / 1e6:.1f} Mo")
+
+
+def test_leak_check():
+    print("🧪 Test de la détection de fuite sur N runs d'un même système")
+    os.environ["LUNACORE_METRICS_INTERVAL"] = "0.05"
+    try:
+        with isolated_sandbox(), patched_kickoff(slow_kickoff):
+            system = offline_system()
+            clean = leak_check(lambda i: generate(system), runs=5, warmup=1)
+            leaky = leak_check(lambda i: LEAKED.append(bytearray(20 * 1024 * 1024)) or generate(system),
+                               runs=4, warmup=1)
+    finally:
+        del os.environ["LUNACORE_METRICS_INTERVAL"]
+        LEAKED.clear()
+    assert clean["status"] == "ok", clean["slopes"]
+    assert clean["slopes"]["threads"] <= 0.5 and clean["slopes"]["fds"] <= 0.5, "ni thread ni descripteur retenu"
+    assert leaky["status"] == "leak" and "rss" in leaky["suspects"], leaky["slopes"]
+    print(f"✅ Runs sains stables {clean['slopes']}, fuite de 20 Mo/run détectée")
+
+
+if __name__ == "__main__":
+    test_sampler_tags_and_summary()
+    test_generation_writes_metrics()
+    test_leak_check()
+    print("🎉 Tous les tests de métriques sont passés")
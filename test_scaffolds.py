@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Test des squelettes précalculés par template"""
+
+import tempfile
+from pathlib import Path
+
+from lunacore.scaffolds import SCAFFOLDS, materialize_scaffold, scaffold_note
+
+
+def test_all_templates_materialize():
+    print("🧪 Test matérialisation de chaque template")
+    for template in SCAFFOLDS:
+        with tempfile.TemporaryDirectory() as tmp:
+            run_dir = Path(tmp)
+            files = materialize_scaffold(template, run_dir, "demo_app")
+            assert "requirements.txt" in files and "README.md" in files
+            assert "tests/conftest.py" in files
+            for rel in files:
+                path = run_dir / rel
+                assert path.exists(), rel
+                assert "$" not in rel
+                if rel.endswith(".py"):
+                    compile(path.read_text(encoding="utf-8"), rel, "exec")
+        print(f"✅ {template}: {len(files)} fichiers")
+
+
+def test_existing_files_preserved():
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp)
+        (run_dir / "README.md").write_text("# Perso", encoding="utf-8")
+        files = materialize_scaffold("cli", run_dir, "outil_fichiers")
+        assert (run_dir / "README.md").read_text(encoding="utf-8") == "# Perso"
+        assert "outil_fichiers/cli.py" in files
+
+
+def test_unknown_template():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert materialize_scaffold("python", Path(tmp), "x") == []
+    assert scaffold_note([]) == ""
+    assert "app/main.py" in scaffold_note(["app/main.py"])
+
+
+if __name__ == "__main__":
+    test_all_templates_materialize()
+    test_existing_files_preserved()
+    test_unknown_template()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Test de la génération spéculative (premier candidat valide retenu)"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from lunacore.speculative import SpeculativeDeveloper, extract_code, first_valid, planned_python_files
+
+
+class FakeLLM:
+    """LLM factice: latence et réponse dépendent de la température"""
+
+    def __init__(self, temperature, delays, answers):
+        self.temperature = temperature
+        self.delays = delays
+        self.answers = answers
+
+    def call(self, messages):
+        time.sleep(self.delays[self.temperature])
+        return self.answers[self.temperature]
+
+
+def test_first_valid_wins():
+    print("🧪 Test premier candidat valide")
+    calls = []
+
+    def make(delay, text):
+        def fn():
+            time.sleep(delay)
+            calls.append(text)
+            return text
+        return fn
+
+    outcome = first_valid(
+        [make(0.05, "def f(:"), make(0.1, "```python\nx = 1\n```"), make(2.0, "y = 2")],
+        lambda code: None if "=" in code and "(" not in code else "invalide",
+    )
+    assert outcome["candidate"] == 1
+    assert outcome["code"] == "x = 1\n"
+    assert outcome["rejected"][0]["candidate"] == 0
+    # Le candidat lent n'est pas attendu
+    assert outcome["duration"] < 1.5
+    print("✅ Premier valide retenu sans attendre le plus lent")
+
+
+def test_develop_from_plan():
+    print("🧪 Test étape développeur spéculative")
+    delays = {0.2: 0.3, 0.8: 0.01}
+    answers = {0.2: "```python\ndef main():\n    return 'ok'\n```", 0.8: "def main(:\n"}
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp)
+        plan = {"files": ["app/main.py", "tests/test_main.py"], "modules": {"app/utils.py": "helpers"}}
+        (run_dir / "plan.json").write_text(json.dumps(plan), encoding="utf-8")
+
+        developer = SpeculativeDeveloper(lambda t: FakeLLM(t, delays, answers), k=2, temperatures=(0.2, 0.8))
+        report = developer.develop(run_dir, "brief")
+
+        assert report["status"] == "ok"
+        assert sorted(report["files"]) == ["app/main.py", "app/utils.py"]
+        assert report["files"]["app/main.py"]["temperature"] == 0.2
+        assert "def main" in (run_dir / "app" / "main.py").read_text(encoding="utf-8")
+        assert not (run_dir / "tests" / "test_main.py").exists()
+    print("✅ Fichiers du plan écrits")
+
+
+def test_helpers():
+    assert extract_code("bla\n```py\nprint(1)\n```\nfin") == "print(1)\n"
+    assert planned_python_files({"a": ["./x.py", "tests/conftest.py", "y.txt"]}) == ["x.py"]
+    # Préfixe "./" retiré, pas les caractères: un dossier caché reste caché
+    assert planned_python_files({"a": ["./x.py", ".hidden/y.py", "../evil.py", "/etc/z.py",
+                                       "app/../../w.py"]}) == ["x.py", ".hidden/y.py"]
+
+
+def test_develop_stays_in_run_dir():
+    print("🧪 Test des chemins du plan hors du dossier du run")
+    answers = {0.2: "```python\nVALUE = 1\n```"}
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir, outside = Path(tmp) / "run", Path(tmp) / "outside"
+        run_dir.mkdir()
+        outside.mkdir()
+        (run_dir / "link").symlink_to(outside, target_is_directory=True)
+        plan = {"files": ["app/ok.py", "link/evil.py", "../evil.py"]}
+        (run_dir / "plan.json").write_text(json.dumps(plan), encoding="utf-8")
+
+        developer = SpeculativeDeveloper(lambda t: FakeLLM(t, {0.2: 0.0}, answers), k=1, temperatures=(0.2,))
+        report = developer.develop(run_dir, "brief")
+        assert report["status"] == "partial" and report["files"]["link/evil.py"]["status"] == "rejected"
+        assert "../evil.py" not in report["files"]
+        assert (run_dir / "app" / "ok.py").exists()
+        assert not list(outside.iterdir()) and not (Path(tmp) / "evil.py").exists()
+    print("✅ Seuls les fichiers du dossier du run sont écrits")
+
+
+if __name__ == "__main__":
+    test_first_valid_wins()
+    test_develop_from_plan()
+    test_helpers()
+    test_develop_stays_in_run_dir()
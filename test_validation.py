@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Test de la validation post-run du projet sur disque"""
+
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+from lunacore import validation
+from lunacore.scaffolds import materialize_scaffold
+from lunacore.validation import ValidationCache, validate_run_dir
+
+
+def _make_run(root: Path) -> Path:
+    run_dir = root / "run"
+    (run_dir / "app").mkdir(parents=True)
+    (run_dir / "tests").mkdir()
+    plan = {"modules": [{"file": "app/__init__.py"}, {"file": "app/main.py"}, {"file": "app/models.py"}]}
+    (run_dir / "plan.json").write_text(json.dumps(plan), encoding="utf-8")
+    (run_dir / "requirements.txt").write_text("fastapi>=0.110\npyyaml\n", encoding="utf-8")
+    (run_dir / "app" / "__init__.py").write_text("", encoding="utf-8")
+    (run_dir / "app" / "models.py").write_text("import yaml\nVALUE = 1\n", encoding="utf-8")
+    (run_dir / "app" / "main.py").write_text(
+        "import os\nfrom fastapi import FastAPI\nfrom .models import VALUE\nfrom app import models\n",
+        encoding="utf-8",
+    )
+    (run_dir / "tests" / "test_main.py").write_text("import pytest\nfrom app.main import os\n", encoding="utf-8")
+    return run_dir
+
+
+def test_validation_ok_and_cached():
+    print("🧪 Test validation d'un projet valide + cache")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = _make_run(Path(tmp))
+        cache = ValidationCache(Path(tmp) / "cache.json")
+
+        report = validate_run_dir(run_dir, cache=cache)
+        assert report["status"] == "ok", report
+        assert report["files_checked"] == 4
+        assert report["cache_hits"] == 0
+
+        # Deuxième passage: rien n'est recompilé
+        report = validate_run_dir(run_dir, cache=ValidationCache(Path(tmp) / "cache.json"))
+        assert report["cache_hits"] == 4
+        assert all(f["cached"] for f in report["files"].values())
+    print("✅ Validation et cache OK")
+
+
+def test_validation_errors():
+    print("🧪 Test détection des erreurs")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = _make_run(Path(tmp))
+        (run_dir / "app" / "broken.py").write_text("def f(:\n", encoding="utf-8")
+        (run_dir / "app" / "extra.py").write_text("import requests\nimport app.ghost\n", encoding="utf-8")
+
+        report = validate_run_dir(run_dir, cache=ValidationCache(Path(tmp) / "cache.json"))
+        assert report["status"] == "error"
+        assert report["files"]["app/broken.py"]["status"] == "syntax_error"
+        extra = report["files"]["app/extra.py"]
+        assert extra["status"] == "import_error"
+        assert any("requests" in e for e in extra["errors"])
+        assert any("app.ghost" in e for e in extra["errors"])
+
+        (run_dir / "plan.json").write_text("{pas du json", encoding="utf-8")
+        report = validate_run_dir(run_dir, cache=ValidationCache(Path(tmp) / "cache.json"))
+        assert report["plan"]["status"] == "invalid_json"
+    print("✅ Erreurs détectées")
+
+
+def test_validation_pool():
+    print("🧪 Test validation via le pool de processus")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = _make_run(Path(tmp))
+        for i in range(20):
+            (run_dir / "app" / f"mod_{i}.py").write_text(f"X = {i}\n", encoding="utf-8")
+        report = validate_run_dir(run_dir, cache=ValidationCache(Path(tmp) / "cache.json"))
+        assert report["files_checked"] == 24
+        assert report["files"]["app/mod_3.py"]["status"] == "ok"
+    assert validation._get_pool()._mp_context.get_start_method() != "fork", "pas de fork dans un hôte multithread"
+    print("✅ Pool de validation OK")
+
+
+def test_cache_lru_and_concurrent_saves():
+    print("🧪 Test du cache de validation borné et des sauvegardes concurrentes")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.json"
+        cache = ValidationCache(path, max_entries=3)
+        for digest in ("a", "b", "c"):
+            cache.put(digest, {"status": "ok"})
+        assert cache.get("a") is not None
+        cache.put("d", {"status": "ok"})
+        assert len(cache) == 3 and cache.get("b") is None, "l'entrée la moins récemment utilisée est oubliée"
+        cache.save()
+        assert list(json.loads(path.read_text(encoding="utf-8"))) == ["c", "a", "d"]
+        assert len(ValidationCache(path, max_entries=2)) == 2
+
+        writers = [ValidationCache(path) for _ in range(8)]
+        for i, writer in enumerate(writers):
+            writer.put(f"w{i}", {"status": "ok"})
+        threads = [threading.Thread(target=writer.save) for writer in writers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert any(key.startswith("w") for key in json.loads(path.read_text(encoding="utf-8")))
+        assert not list(Path(tmp).glob("*.tmp")), "fichier temporaire propre à chaque écriture"
+    print("✅ Cache LRU borné, écritures atomiques sans collision")
+
+
+def test_scaffold_declared():
+    print("🧪 Test d'un squelette nu avec un plan minimal")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp) / "run"
+        scaffold = materialize_scaffold("fastapi", run_dir, "demo")
+        (run_dir / "plan.json").write_text(json.dumps({"files": ["app/models.py"]}), encoding="utf-8")
+        (run_dir / "app" / "models.py").write_text("VALUE = 1\n", encoding="utf-8")
+
+        report = validate_run_dir(run_dir, cache=ValidationCache(Path(tmp) / "cache.json"))
+        assert report["files"]["tests/conftest.py"]["status"] == "import_error", "sans squelette: app.main non déclaré"
+        report = validate_run_dir(run_dir, cache=ValidationCache(Path(tmp) / "cache.json"), scaffold_files=scaffold)
+        assert report["status"] == "ok", report["files"]
+    print("✅ Fichiers du squelette déclarés d'office")
+
+
+if __name__ == "__main__":
+    test_validation_ok_and_cached()
+    test_validation_errors()
+    test_validation_pool()
+    test_cache_lru_and_concurrent_saves()
+    test_scaffold_declared()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Test de l'exécution isolée des suites pytest générées"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from lunacore.verification import TestLimits, VerificationPool, shard_files, collect_test_files
+
+
+def _make_run(root: Path, name: str) -> Path:
+    run_dir = root / name
+    (run_dir / "tests").mkdir(parents=True)
+    (run_dir / "calc.py").write_text("def add(a, b):\n    return a + b\n", encoding="utf-8")
+    (run_dir / "tests" / "test_ok.py").write_text(
+        "from calc import add\n\ndef test_add():\n    assert add(1, 2) == 3\n\ndef test_add_neg():\n    assert add(-1, 1) == 0\n",
+        encoding="utf-8",
+    )
+    (run_dir / "tests" / "test_ko.py").write_text(
+        "from calc import add\n\ndef test_wrong():\n    assert add(2, 2) == 5\n", encoding="utf-8"
+    )
+    return run_dir
+
+
+def test_sharding():
+    print("🧪 Test de la répartition en shards")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = _make_run(Path(tmp), "run")
+        files = collect_test_files(run_dir)
+        assert len(files) == 2
+        shards = shard_files(files, 4)
+        assert len(shards) == 2
+        assert sorted(p for s in shards for p in s) == files
+    print("✅ Shards équilibrés")
+
+
+def test_verify_runs_concurrently():
+    print("🧪 Test de l'exécution de plusieurs runs en parallèle")
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = VerificationPool(max_workers=2)
+        futures = [pool.submit(_make_run(Path(tmp), f"run_{i}")) for i in range(3)]
+        for future in futures:
+            report = future.result(timeout=120)
+            assert report["status"] == "failed", report
+            assert report["passed"] == 2
+            assert report["failed"] == 1
+            assert report["failures"][0]["test"].endswith("test_wrong")
+        pool.shutdown()
+    print("✅ Rapports agrégés corrects")
+
+
+def test_wall_clock_limit():
+    print("🧪 Test de la limite de temps réel")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp) / "slow"
+        (run_dir / "tests").mkdir(parents=True)
+        (run_dir / "tests" / "test_slow.py").write_text(
+            "import time\n\ndef test_sleep():\n    time.sleep(30)\n", encoding="utf-8"
+        )
+        pool = VerificationPool(max_workers=1, limits=TestLimits(wall_seconds=3))
+        report = pool.verify(run_dir)
+        assert report["status"] == "timeout"
+        assert report["duration"] < 20
+        pool.shutdown()
+    print("✅ Shard interrompu à la limite")
+
+
+def test_child_sandbox():
+    print("🧪 Test de l'environnement des tests générés (HOME, session, rlimits)")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_dir = Path(tmp) / "sandboxed"
+        (run_dir / "tests").mkdir(parents=True)
+        (run_dir / "tests" / "test_env.py").write_text(
+            "import os, sys\n\n"
+            "def test_home():\n"
+            f"    assert os.environ['HOME'] != {os.path.expanduser('~')!r}\n"
+            "    assert os.path.isdir(os.environ['HOME']) and not os.listdir(os.environ['HOME'])\n\n"
+            "def test_session_and_limits():\n"
+            "    if sys.platform == 'win32':\n"
+            "        return\n"
+            "    import resource\n"
+            "    assert os.getsid(0) == os.getpid()\n"
+            "    assert resource.getrlimit(resource.RLIMIT_CPU) == (37, 37)\n",
+            encoding="utf-8",
+        )
+        pool = VerificationPool(max_workers=1, limits=TestLimits(cpu_seconds=37))
+        report = pool.verify(run_dir)
+        pool.shutdown()
+    assert report["status"] == "passed" and report["passed"] == 2, report
+    print("✅ HOME jetable, nouvelle session et rlimits appliqués sans preexec_fn")
+
+
+def test_missing_dependencies():
+    print("🧪 Test des dépendances absentes de l'interpréteur (conftest, collecte)")
+    pool = VerificationPool(max_workers=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Squelette fastapi/flask: le conftest importe le framework, pytest s'arrête sans rapport
+        conftest_run = _make_run(Path(tmp), "conftest")
+        (conftest_run / "tests" / "conftest.py").write_text(
+            "from framework_absent.testclient import TestClient\n", encoding="utf-8")
+        conftest_report = pool.verify(conftest_run)
+
+        # Module de tests qui importe une dépendance absente, et un module du projet manquant
+        collect_run = _make_run(Path(tmp), "collect")
+        (collect_run / "app").mkdir()
+        (collect_run / "tests" / "test_dep.py").write_text(
+            "import dependance_absente\n\ndef test_dep():\n    assert True\n", encoding="utf-8")
+        (collect_run / "tests" / "test_app.py").write_text(
+            "from app.models import User\n\ndef test_user():\n    assert User\n", encoding="utf-8")
+        collect_report = pool.verify(collect_run, shards=1)
+    pool.shutdown()
+
+    assert conftest_report["status"] == "missing_dependencies", conftest_report
+    assert conftest_report["missing_modules"] == ["framework_absent"] and conftest_report["failures"] == []
+    assert collect_report["status"] == "missing_dependencies"
+    assert collect_report["missing_modules"] == ["dependance_absente"], "app est un paquet du projet"
+    remaining = sorted(f["message"] + f["details"] for f in collect_report["failures"])
+    assert any("app.models" in text for text in remaining), "module du projet manquant: à réparer"
+    assert not any("dependance_absente" in text for text in remaining), "dépendance absente: rien à réparer"
+    print(f"✅ Dépendances absentes signalées: {conftest_report['missing_modules'] + collect_report['missing_modules']}")
+
+
+def test_no_tests():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert VerificationPool(max_workers=1).verify(Path(tmp))["status"] == "no_tests"
+
+
+if __name__ == "__main__":
+    test_sharding()
+    test_verify_runs_concurrently()
+    test_wall_clock_limit()
+    test_child_sandbox()
+    test_missing_dependencies()
+    test_no_tests()